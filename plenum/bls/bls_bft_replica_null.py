@@ -0,0 +1,44 @@
+from crypto.bls.bls_bft_replica import BlsBftReplica
+
+
+class BlsBftReplicaNull(BlsBftReplica):
+    """
+    BLS replica of backups which neither sign nor verify anything, since
+    multi-signatures of backups are never used
+    """
+
+    def __init__(self):
+        super().__init__(None, False)
+
+    def validate_pre_prepare(self, pre_prepare, sender):
+        pass
+
+    def validate_prepare(self, prepare, sender):
+        pass
+
+    def validate_commit(self, commit, sender, pre_prepare):
+        pass
+
+    def process_pre_prepare(self, pre_prepare, sender):
+        pass
+
+    def process_prepare(self, prepare, sender):
+        pass
+
+    def process_commit(self, commit, sender):
+        pass
+
+    def process_order(self, key, quorums, pre_prepare):
+        pass
+
+    def update_pre_prepare(self, pre_prepare_params, ledger_id):
+        return pre_prepare_params
+
+    def update_prepare(self, prepare_params, ledger_id):
+        return prepare_params
+
+    def update_commit(self, commit_params, pre_prepare):
+        return commit_params
+
+    def gc(self, key_3PC):
+        pass
@@ -1,9 +1,11 @@
-from collections import deque
 from typing import Any, Iterable, Dict
 
+from plenum.common.binary_batch import BINARY_BATCH_FEATURE, \
+    is_binary_batch, pack_binary_batch, unpack_binary_batch
 from plenum.common.util import z85_to_friendly
 from plenum.common.constants import BATCH, OP_FIELD_NAME
 from plenum.common.metrics_collector import NullMetricsCollector, MetricsName, measure_time
+from plenum.common.outbox import Outbox, OutboxLane, message_lane
 from plenum.common.prepare_batch import split_messages_on_batches
 from stp_core.common.constants import CONNECTION_PREFIX
 from stp_core.crypto.signer import Signer
@@ -13,9 +15,17 @@ from plenum.common.messages.node_messages import Batch
 from plenum.common.message_processor import MessageProcessor
 from stp_core.validators.message_length_validator import MessageLenValidator
 from stp_core.common.config.util import getConfig
+from stp_zmq.compression import COMPRESSION_FEATURE
 
 logger = getlogger()
 
+LANE_SIZE_METRICS = {
+    OutboxLane.CONSENSUS: MetricsName.OUTBOX_CONSENSUS_LANE_SIZE,
+    OutboxLane.VIEW_CHANGE: MetricsName.OUTBOX_VIEW_CHANGE_LANE_SIZE,
+    OutboxLane.PROPAGATE: MetricsName.OUTBOX_PROPAGATE_LANE_SIZE,
+    OutboxLane.CATCHUP: MetricsName.OUTBOX_CATCHUP_LANE_SIZE,
+}
+
 
 class Batched(MessageProcessor):
     """
@@ -28,30 +38,45 @@ class Batched(MessageProcessor):
         :param self: 'NodeStacked'
         :param config: 'stp config'
         """
-        self.outBoxes = {}  # type: Dict[int, deque]
+        self.outBoxes = {}  # type: Dict[int, Outbox]
         self.stp_config = config or getConfig()
         self.msg_len_val = MessageLenValidator(self.stp_config.MSG_LEN_LIMIT)
         self.metrics = metrics
+        # Binary batches are sent only to remotes which advertised support
+        # of them in JSON batches or sent binary batches themselves
+        self.binary_batches_enabled = self.stp_config.ENABLE_BINARY_BATCHES
+        self._binary_batch_remotes = set()
+        # Remotes which were sent a JSON batch advertising features of this
+        # stack, binary batches do not advertise them
+        self._advertised_remotes = set()
+        # Messages of lower lanes exceeding their share of the size limit
+        # are left for next flushes
+        self.outbox_flush_size = self.stp_config.OUTBOX_FLUSH_SIZE
+        self.outbox_lane_weights = self.stp_config.OUTBOX_LANE_WEIGHTS
 
-    def _enqueue(self, msg: Any, rid: int, signer: Signer) -> None:
+    def _enqueue(self, msg: Any, rid: int, signer: Signer,
+                 lane: OutboxLane = OutboxLane.PROPAGATE) -> None:
         """
         Enqueue the message into the remote's queue.
 
         :param msg: the message to enqueue
         :param rid: the id of the remote node
+        :param lane: the lane of the remote's queue
         """
         if rid not in self.outBoxes:
-            self.outBoxes[rid] = deque()
-        self.outBoxes[rid].append(msg)
+            self.outBoxes[rid] = Outbox()
+        self.outBoxes[rid].append(msg, lane)
 
-    def _enqueueIntoAllRemotes(self, msg: Any, signer: Signer) -> None:
+    def _enqueueIntoAllRemotes(self, msg: Any, signer: Signer,
+                               lane: OutboxLane = OutboxLane.PROPAGATE) -> None:
         """
         Enqueue the specified message into all the remotes in the nodestack.
 
         :param msg: the message to enqueue
+        :param lane: the lane of the remotes' queues
         """
         for rid in self.remotes.keys():
-            self._enqueue(msg, rid, signer)
+            self._enqueue(msg, rid, signer, lane)
 
     def send(self,
              msg: Any, *
@@ -78,13 +103,14 @@ class Batched(MessageProcessor):
         if err_msg is not None:
             return False, err_msg
 
+        lane = message_lane(msg)
         if rids:
             for r in rids:
                 for part in message_parts:
-                    self._enqueue(part, r, signer)
+                    self._enqueue(part, r, signer, lane)
         else:
             for part in message_parts:
-                self._enqueueIntoAllRemotes(part, signer)
+                self._enqueueIntoAllRemotes(part, signer, lane)
         return True, None
 
     def flushOutBoxes(self) -> None:
@@ -92,23 +118,39 @@ class Batched(MessageProcessor):
         Clear the outBoxes and transmit batched messages to remotes.
         """
         removedRemotes = []
-        for rid, msgs in self.outBoxes.items():
+        lane_sizes = [0] * len(OutboxLane)
+        # Broadcast messages are the same objects in outboxes of all remotes,
+        # so batches of the same messages are made once and sent to all of
+        # them. Messages are kept in values to keep their ids unique
+        made_batches = {}
+        for rid, outbox in self.outBoxes.items():
             try:
                 dest = self.remotes[rid].name
             except KeyError:
                 removedRemotes.append(rid)
                 continue
-            if msgs:
+            if outbox:
+                for lane, lane_msgs in enumerate(outbox.lanes):
+                    lane_sizes[lane] += len(lane_msgs)
+                msgs = outbox.drain(self.outbox_flush_size,
+                                    self.outbox_lane_weights)
                 if self._should_batch(msgs):
                     logger.trace(
                         "{} batching {} msgs to {} into fewer transmissions".
                         format(self, len(msgs), dest))
                     logger.trace("    messages: {}".format(msgs))
-                    batches = split_messages_on_batches(list(msgs),
-                                                        self._make_batch,
-                                                        self._test_batch_len,
-                                                        )
-                    msgs.clear()
+                    binary = rid in self._binary_batch_remotes and \
+                        rid in self._advertised_remotes
+                    key = (binary, tuple(id(m) for m in msgs))
+                    if key in made_batches:
+                        batches = made_batches[key][1]
+                    else:
+                        make_batch = self._make_binary_batch if binary else self._make_batch
+                        batches = split_messages_on_batches(msgs,
+                                                            make_batch,
+                                                            self._test_batch_len,
+                                                            )
+                        made_batches[key] = (msgs, batches)
                     if batches:
                         for batch, size in batches:
                             logger.trace("{} sending payload to {}: {}".format(
@@ -120,11 +162,12 @@ class Batched(MessageProcessor):
                                 rid,
                                 timeout=self.messageTimeout,
                                 serialized=True)
+                            if not binary and size > 1:
+                                self._advertised_remotes.add(rid)
                     else:
                         logger.error("{} cannot create batch(es) for {}".format(self, dest))
                 else:
-                    while msgs:
-                        msg = msgs.popleft()
+                    for msg in msgs:
                         logger.trace(
                             "{} sending msg {} to {}".format(self, msg, dest))
                         self.metrics.add_event(MetricsName.TRANSPORT_BATCH_SIZE, 1)
@@ -132,6 +175,10 @@ class Batched(MessageProcessor):
                         self.transmit(msg, rid, timeout=self.messageTimeout,
                                       serialized=True)
 
+        if any(lane_sizes):
+            for lane, size in enumerate(lane_sizes):
+                self.metrics.add_event(LANE_SIZE_METRICS[lane], size)
+
         for rid in removedRemotes:
             logger.warning("{}{} has removed rid {}"
                            .format(CONNECTION_PREFIX, self,
@@ -139,7 +186,7 @@ class Batched(MessageProcessor):
                            extra={"cli": False})
             msgs = self.outBoxes[rid]
             if msgs:
-                self.discard(msgs,
+                self.discard(list(msgs),
                              "{}rid {} no longer available"
                              .format(CONNECTION_PREFIX,
                                      z85_to_friendly(rid)),
@@ -148,12 +195,29 @@ class Batched(MessageProcessor):
 
     def _make_batch(self, msgs):
         if len(msgs) > 1:
-            batch = Batch(msgs, None)
+            features = self._supported_features()
+            if features:
+                batch = Batch(msgs, None, features)
+            else:
+                batch = Batch(msgs, None)
             serialized_batch = self.sign_and_serialize(batch)
         else:
             serialized_batch = msgs[0]
         return serialized_batch
 
+    def _supported_features(self):
+        features = []
+        if self.binary_batches_enabled:
+            features.append(BINARY_BATCH_FEATURE)
+        if self.compression_enabled:
+            features.append(COMPRESSION_FEATURE)
+        return features
+
+    def _make_binary_batch(self, msgs):
+        if len(msgs) > 1:
+            return pack_binary_batch(msgs)
+        return msgs[0]
+
     def _test_batch_len(self, batch_len):
         return self.msg_len_val.is_len_less_than_limit(batch_len)
 
@@ -166,12 +230,44 @@ class Batched(MessageProcessor):
                     r = self.handlePingPong(m, frm, ident)
                     if not r:
                         relevantMsgs.append(m)
+                features = msg.get(f.FEATURES.nm) or ()
+                self._update_binary_batch_support(
+                    frm, BINARY_BATCH_FEATURE in features)
+                self._update_compression_support(
+                    frm, COMPRESSION_FEATURE in features)
 
                 if not relevantMsgs:
                     return None
                 msg[f.MSGS.nm] = relevantMsgs
         return msg
 
+    def _decodeReceived(self, msg, ident):
+        if not is_binary_batch(msg):
+            return super()._decodeReceived(msg, ident)
+        msgs = unpack_binary_batch(msg)
+        remote = self.remotesByKeys.get(ident)
+        frm = remote.name if remote else ident
+        self._update_binary_batch_support(frm, True)
+        # Messages are left as bytes (or memoryviews) since they are parsed
+        # from them as well, only pings and pongs are compared as strings
+        return [str(m, 'utf-8') if m in self.healthMessages else m for m in msgs]
+
+    def handlePingPong(self, msg, frm, ident):
+        if msg == self.pingMessage:
+            # Remote might have been restarted with different version, so
+            # use JSON batches until it advertises binary batches again
+            self._update_binary_batch_support(frm, False)
+            self._advertised_remotes.discard(frm)
+        return super().handlePingPong(msg, frm, ident)
+
+    def _update_binary_batch_support(self, frm, supported):
+        if supported and self.binary_batches_enabled:
+            if frm not in self._binary_batch_remotes:
+                logger.debug("{} switching to binary batches for {}".format(self, frm))
+                self._binary_batch_remotes.add(frm)
+        else:
+            self._binary_batch_remotes.discard(frm)
+
     def prepare_for_sending(self, msg, signer,
                             message_splitter=lambda x: None):
         large_msg_parts = [msg]
@@ -0,0 +1,65 @@
+"""
+Binary framing of transport batches.
+
+A JSON `Batch` carries already serialized messages as JSON strings, so every
+message is escaped when the batch is serialized and parsed twice when it is
+received. A binary batch is a single ZMQ frame made of `BINARY_BATCH_PREFIX`
+followed by messages as they are, each prefixed with its length as 4 byte
+big-endian unsigned integer.
+
+Serialized JSON messages and ping/pong messages never start with a zero byte,
+so a binary batch is told apart from them by the first bytes only. Binary
+batches are sent only to peers which advertised `BINARY_BATCH_FEATURE`.
+"""
+
+import struct
+from typing import Sequence, List, Union
+
+from plenum.common.exceptions import InvalidBinaryBatchException
+
+BINARY_BATCH_PREFIX = b'\x00PB1'
+BINARY_BATCH_FEATURE = 'binary_batch'
+
+_LEN = struct.Struct('>I')
+_PREFIX_LEN = len(BINARY_BATCH_PREFIX)
+
+
+def is_binary_batch(data: Union[bytes, memoryview]) -> bool:
+    return data[:_PREFIX_LEN] == BINARY_BATCH_PREFIX
+
+
+def binary_batch_len(msgs: Sequence[bytes]) -> int:
+    return _PREFIX_LEN + _LEN.size * len(msgs) + sum(len(m) for m in msgs)
+
+
+def pack_binary_batch(msgs: Sequence[bytes]) -> bytes:
+    parts = [BINARY_BATCH_PREFIX]
+    for msg in msgs:
+        parts.append(_LEN.pack(len(msg)))
+        parts.append(msg)
+    return b''.join(parts)
+
+
+def unpack_binary_batch(data: Union[bytes, memoryview]) -> List[Union[bytes, memoryview]]:
+    """
+    Messages are slices of `data`, so they are memoryviews of it when `data`
+    is a memoryview
+    """
+    if not is_binary_batch(data):
+        raise InvalidBinaryBatchException('no binary batch prefix')
+    msgs = []
+    pos = _PREFIX_LEN
+    end = len(data)
+    while pos < end:
+        if end - pos < _LEN.size:
+            raise InvalidBinaryBatchException(
+                'truncated length of message at {}'.format(pos))
+        size, = _LEN.unpack_from(data, pos)
+        pos += _LEN.size
+        if size > end - pos:
+            raise InvalidBinaryBatchException(
+                'message at {} of length {} exceeds batch length {}'
+                .format(pos, size, end))
+        msgs.append(data[pos:pos + size])
+        pos += size
+    return msgs
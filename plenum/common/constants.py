@@ -20,10 +20,13 @@ REJECT = "REJECT"
 POOL_LEDGER_TXNS = "POOL_LEDGER_TXNS"
 
 PROPAGATE = "PROPAGATE"
+PROPAGATE_DIGEST = "PROPAGATE_DIGEST"
 
 PREPREPARE = "PREPREPARE"
 PREPARE = "PREPARE"
 COMMIT = "COMMIT"
+AGGREGATED_PREPARE = "AGGREGATED_PREPARE"
+AGGREGATED_COMMIT = "AGGREGATED_COMMIT"
 CHECKPOINT = "CHECKPOINT"
 CHECKPOINT_STATE = "CHECKPOINT_STATE"
 THREE_PC_STATE = "THREE_PC_STATE"
@@ -181,6 +184,11 @@ class PreVCStrategies(IntEnum):
     VC_START_MSG_STRATEGY = 1
 
 
+class BatchingObjective(IntEnum):
+    THROUGHPUT = 1
+    LATENCY = 2
+
+
 @unique
 class LedgerState(IntEnum):
     not_synced = 1  # Still gathering consistency proofs
@@ -220,6 +228,10 @@ ATTRIB_LABEL = 'attrib'
 
 VALID_LEDGER_IDS = (POOL_LEDGER_ID, DOMAIN_LEDGER_ID, CONFIG_LEDGER_ID)
 
+# State snapshot metadata
+STATE_SNAPSHOT_LEDGER_SIZE = 'ledger_size'
+STATE_SNAPSHOT_TXN_ROOT_HASH = 'txn_root_hash'
+
 CURRENT_PROTOCOL_VERSION = PlenumProtocolVersion.TXN_FORMAT_1_0_SUPPORT.value
 
 OPERATION_SCHEMA_IS_STRICT = False
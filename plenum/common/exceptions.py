@@ -291,6 +291,14 @@ class InvalidMessageExceedingSizeException(InvalidMessageException):
         super().__init__(ex_txt, *args, **kwargs)
 
 
+class InvalidBinaryBatchException(InvalidMessageException):
+    pass
+
+
+class InvalidCompressedMessageException(InvalidMessageException):
+    pass
+
+
 class RequestNackedException(Exception):
     pass
 
@@ -111,6 +111,11 @@ class MessageBase(Mapping, MessageValidator):
     def __getattr__(self, item):
         return self._fields[item]
 
+    def __reduce__(self):
+        # Message is validated again when unpickled since it may come from
+        # another process
+        return _message_from_fields, (self.__class__, dict(self._fields))
+
     def __getitem__(self, key):
         values = list(self._fields.values())
         if isinstance(key, slice):
@@ -173,3 +178,7 @@ class MessageBase(Mapping, MessageValidator):
 
     def __contains__(self, key):
         return key in self._fields
+
+
+def _message_from_fields(cls, fields):
+    return cls(**fields)
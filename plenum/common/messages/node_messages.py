@@ -7,7 +7,8 @@ from plenum.common.constants import NOMINATE, BATCH, REELECTION, PRIMARY, \
     REPLY, INSTANCE_CHANGE, LEDGER_STATUS, CONSISTENCY_PROOF, CATCHUP_REQ, \
     CATCHUP_REP, VIEW_CHANGE_DONE, CURRENT_STATE, \
     MESSAGE_REQUEST, MESSAGE_RESPONSE, OBSERVED_DATA, BATCH_COMMITTED, OPERATION_SCHEMA_IS_STRICT, \
-    BACKUP_INSTANCE_FAULTY, VIEW_CHANGE_START, PROPOSED_VIEW_NO, VIEW_CHANGE_CONTINUE
+    BACKUP_INSTANCE_FAULTY, VIEW_CHANGE_START, PROPOSED_VIEW_NO, VIEW_CHANGE_CONTINUE, \
+    AGGREGATED_PREPARE, AGGREGATED_COMMIT, PROPAGATE_DIGEST
 from plenum.common.messages.client_request import ClientMessageValidator
 from plenum.common.messages.fields import NonNegativeNumberField, IterableField, \
     SerializedValueField, SignatureField, TieAmongField, AnyValueField, TimestampField, \
@@ -38,6 +39,9 @@ class Batch(MessageBase):
     schema = (
         (f.MSGS.nm, IterableField(SerializedValueField())),
         (f.SIG.nm, SignatureField(max_length=SIGNATURE_FIELD_LIMIT)),
+        # Transport features supported by the sender
+        (f.FEATURES.nm, IterableField(LimitedLengthStringField(max_length=NAME_FIELD_LIMIT),
+                                      optional=True)),
     )
 
 
@@ -136,6 +140,18 @@ class Propagate(MessageBase):
     )
 
 
+class PropagateDigest(MessageBase):
+    """
+    PROPAGATE of a request the receiver is known to have, with the digest
+    of the request instead of the request
+    """
+    typename = PROPAGATE_DIGEST
+    schema = (
+        (f.DIGEST.nm, LimitedLengthStringField(max_length=DIGEST_FIELD_LIMIT)),
+        (f.SENDER_CLIENT.nm, LimitedLengthStringField(max_length=SENDER_CLIENT_FIELD_LIMIT, nullable=True)),
+    )
+
+
 class PrePrepare(MessageBase):
     schema = (
         (f.INST_ID.nm, NonNegativeNumberField()),
@@ -189,6 +205,57 @@ class Commit(MessageBase):
     )
 
 
+class AggregatedPrepare(MessageBase):
+    """
+    PREPAREs of batches with consecutive ppSeqNos starting from `ppSeqNo`,
+    one item of each list per batch
+    """
+    typename = AGGREGATED_PREPARE
+    schema = (
+        (f.INST_ID.nm, NonNegativeNumberField()),
+        (f.VIEW_NO.nm, NonNegativeNumberField()),
+        (f.PP_SEQ_NO.nm, NonNegativeNumberField()),
+        (f.PP_TIMES.nm, IterableField(TimestampField(), min_length=1)),
+        (f.DIGESTS.nm, IterableField(
+            LimitedLengthStringField(max_length=DIGEST_FIELD_LIMIT), min_length=1)),
+        (f.STATE_ROOTS.nm, IterableField(MerkleRootField(nullable=True), min_length=1)),
+        (f.TXN_ROOTS.nm, IterableField(MerkleRootField(nullable=True), min_length=1)),
+    )
+
+    def _validate_message(self, dct):
+        count = len(dct[f.DIGESTS.nm])
+        for field in (f.PP_TIMES.nm, f.STATE_ROOTS.nm, f.TXN_ROOTS.nm):
+            if len(dct[field]) != count:
+                self._raise_invalid_fields(
+                    field, dct[field],
+                    "should have as many items as {}".format(f.DIGESTS.nm))
+
+
+class AggregatedCommit(MessageBase):
+    """
+    COMMITs of batches with consecutive ppSeqNos starting from `ppSeqNo`,
+    one digest and, if BLS signatures are used, one signature per batch
+    """
+    typename = AGGREGATED_COMMIT
+    schema = (
+        (f.INST_ID.nm, NonNegativeNumberField()),
+        (f.VIEW_NO.nm, NonNegativeNumberField()),
+        (f.PP_SEQ_NO.nm, NonNegativeNumberField()),
+        (f.DIGESTS.nm, IterableField(
+            LimitedLengthStringField(max_length=DIGEST_FIELD_LIMIT), min_length=1)),
+        (f.BLS_SIGS.nm, IterableField(
+            LimitedLengthStringField(max_length=BLS_SIG_LIMIT, nullable=True),
+            optional=True)),
+    )
+
+    def _validate_message(self, dct):
+        if f.BLS_SIGS.nm in dct and \
+                len(dct[f.BLS_SIGS.nm]) != len(dct[f.DIGESTS.nm]):
+            self._raise_invalid_fields(
+                f.BLS_SIGS.nm, dct[f.BLS_SIGS.nm],
+                "should have as many items as {}".format(f.DIGESTS.nm))
+
+
 class Checkpoint(MessageBase):
     typename = CHECKPOINT
     schema = (
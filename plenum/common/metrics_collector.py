@@ -51,6 +51,12 @@ class MetricsName(IntEnum):
     CATCHUP_TXNS_SENT = 15
     # Number of txns received through catchup
     CATCHUP_TXNS_RECEIVED = 16
+    # Ratio of compressed to original length of outgoing node message
+    OUTGOING_NODE_MESSAGE_COMPRESSION_RATIO = 17
+    # Batch size and wait time limits tuned by adaptive 3PC batching on
+    # master instance
+    THREE_PC_BATCH_SIZE_LIMIT = 18
+    THREE_PC_BATCH_WAIT_LIMIT = 19
 
     # Average throughput measured by monitor on backup instances
     BACKUP_MONITOR_AVG_THROUGHPUT = 20
@@ -61,6 +67,12 @@ class MetricsName(IntEnum):
     # Average latency measured by monitor on master instance
     MONITOR_AVG_LATENCY = 23
 
+    # Number of messages waiting in outbox lanes of node stack on flush
+    OUTBOX_CONSENSUS_LANE_SIZE = 24
+    OUTBOX_VIEW_CHANGE_LANE_SIZE = 25
+    OUTBOX_PROPAGATE_LANE_SIZE = 26
+    OUTBOX_CATCHUP_LANE_SIZE = 27
+
     # Node incoming request queue size
     REQUEST_QUEUE_SIZE = 30
     FINALISED_REQUEST_QUEUE_SIZE = 31
@@ -164,6 +176,7 @@ class MetricsName(IntEnum):
     PROCESS_CONSISTENCY_PROOF_TIME = 3004
     PROCESS_CATCHUP_REQ_TIME = 3005
     PROCESS_CATCHUP_REP_TIME = 3006
+    PROCESS_PROPAGATE_DIGEST_TIME = 3007
     PROCESS_REQUEST_TIME = 3100
     SEND_PROPAGATE_TIME = 3500
     SEND_MESSAGE_REQ_TIME = 3501
@@ -175,6 +188,13 @@ class MetricsName(IntEnum):
     BLS_UPDATE_PREPREPARE_TIME = 4010
     BLS_UPDATE_COMMIT_TIME = 4012
 
+    # Read requests statistics
+    # 1 for state proof cache hit, 0 for miss, so average is a hit ratio
+    STATE_PROOF_CACHE_HIT = 5000
+    # Number of entries in state proof cache
+    STATE_PROOF_CACHE_SIZE = 5001
+    GENERATE_STATE_PROOF_TIME = 5002
+
     # Obsolete metrics
     DESERIALIZE_DURING_UNPACK_TIME = 206
 
@@ -0,0 +1,121 @@
+from collections import deque
+from enum import IntEnum, unique
+from typing import Any, List, Optional, Sequence
+
+from plenum.common.constants import OP_FIELD_NAME, PREPREPARE, PREPARE, \
+    COMMIT, CHECKPOINT, INSTANCE_CHANGE, BACKUP_INSTANCE_FAULTY, \
+    VIEW_CHANGE_DONE, CURRENT_STATE, NOMINATE, PRIMARY, REELECTION, \
+    LEDGER_STATUS, CONSISTENCY_PROOF, CATCHUP_REQ, CATCHUP_REP, \
+    MESSAGE_RESPONSE, OBSERVED_DATA, BATCH_COMMITTED, AGGREGATED_PREPARE, \
+    AGGREGATED_COMMIT
+
+
+@unique
+class OutboxLane(IntEnum):
+    """
+    Lanes of outgoing messages to a remote in order of their priority
+    """
+    CONSENSUS = 0
+    VIEW_CHANGE = 1
+    # Propagates and all messages not mentioned below
+    PROPAGATE = 2
+    CATCHUP = 3
+
+
+_LANES = {
+    PREPREPARE: OutboxLane.CONSENSUS,
+    PREPARE: OutboxLane.CONSENSUS,
+    COMMIT: OutboxLane.CONSENSUS,
+    AGGREGATED_PREPARE: OutboxLane.CONSENSUS,
+    AGGREGATED_COMMIT: OutboxLane.CONSENSUS,
+    CHECKPOINT: OutboxLane.CONSENSUS,
+
+    INSTANCE_CHANGE: OutboxLane.VIEW_CHANGE,
+    BACKUP_INSTANCE_FAULTY: OutboxLane.VIEW_CHANGE,
+    VIEW_CHANGE_DONE: OutboxLane.VIEW_CHANGE,
+    CURRENT_STATE: OutboxLane.VIEW_CHANGE,
+    NOMINATE: OutboxLane.VIEW_CHANGE,
+    PRIMARY: OutboxLane.VIEW_CHANGE,
+    REELECTION: OutboxLane.VIEW_CHANGE,
+
+    LEDGER_STATUS: OutboxLane.CATCHUP,
+    CONSISTENCY_PROOF: OutboxLane.CATCHUP,
+    CATCHUP_REQ: OutboxLane.CATCHUP,
+    CATCHUP_REP: OutboxLane.CATCHUP,
+    MESSAGE_RESPONSE: OutboxLane.CATCHUP,
+    OBSERVED_DATA: OutboxLane.CATCHUP,
+    BATCH_COMMITTED: OutboxLane.CATCHUP,
+}
+
+
+def message_lane(msg: Any) -> OutboxLane:
+    if isinstance(msg, (str, bytes)):
+        # Pings and pongs, they are tiny and tell that the remote is alive
+        return OutboxLane.CONSENSUS
+    if isinstance(msg, dict):
+        op = msg.get(OP_FIELD_NAME)
+    else:
+        op = getattr(msg, 'typename', None)
+    return _LANES.get(op, OutboxLane.PROPAGATE)
+
+
+class Outbox:
+    """
+    Serialized messages waiting to be sent to a remote, kept in a FIFO queue
+    per lane
+    """
+
+    def __init__(self):
+        self.lanes = tuple(deque() for _ in OutboxLane)
+
+    def append(self, msg: bytes, lane: OutboxLane = OutboxLane.PROPAGATE):
+        self.lanes[lane].append(msg)
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes)
+
+    def __iter__(self):
+        for lane in self.lanes:
+            yield from lane
+
+    def clear(self):
+        for lane in self.lanes:
+            lane.clear()
+
+    def drain(self, size_limit: Optional[int] = None,
+              weights: Sequence[int] = None) -> List[bytes]:
+        """
+        Takes messages to be sent in one flush, messages of higher lanes
+        first.
+
+        When total length of messages exceeds `size_limit`, every non-empty
+        lane first gets a share of the limit proportional to its weight and
+        at least one message, then the rest of the limit goes to lanes in
+        order of priority. Messages which did not fit stay in the outbox, so
+        bulk lanes neither starve nor fill the socket queue in front of
+        messages of higher lanes sent by the next flushes.
+        """
+        if size_limit is None or \
+                sum(len(m) for m in self) <= size_limit:
+            taken = list(self)
+            self.clear()
+            return taken
+
+        weights = weights or [1] * len(self.lanes)
+        total_weight = sum(w for lane, w in zip(self.lanes, weights) if lane)
+        taken = [[] for _ in self.lanes]
+        used = 0
+        for lane, weight, lane_taken in zip(self.lanes, weights, taken):
+            share = size_limit * weight // total_weight if total_weight else 0
+            lane_used = 0
+            while lane and (not lane_taken or lane_used + len(lane[0]) <= share):
+                msg = lane.popleft()
+                lane_taken.append(msg)
+                lane_used += len(msg)
+            used += lane_used
+        for lane, lane_taken in zip(self.lanes, taken):
+            while lane and used + len(lane[0]) <= size_limit:
+                msg = lane.popleft()
+                lane_taken.append(msg)
+                used += len(msg)
+        return [m for lane_taken in taken for m in lane_taken]
@@ -6,26 +6,84 @@ logger = getlogger()
 
 
 def split_messages_on_batches(msgs, make_batch_func, is_batch_len_under_limit):
+    """
+    Splits messages into batches, each of them having as many messages as
+    possible while being under the length limit.
+
+    Length of a serialized batch is supposed to grow with the number of
+    messages in it, so number of messages for each batch is searched for
+    starting from an estimate made from lengths of separately serialized
+    messages. This takes O(log n) batch serializations per batch instead of
+    serializing the batch after every appended message.
+
+    :return: list of (serialized batch, number of messages in it) or None
+    if some message is too long to be sent even in a batch of its own
+    """
+    msg_lens = []
+    for msg in msgs:
+        serialized_msg = make_batch_func([msg])
+        if not is_batch_len_under_limit(len(serialized_msg)):
+            logger.display('The message {}... is too long ({}). '
+                           'Batches were not created'.format(serialized_msg[:256], len(serialized_msg)))
+            return
+        msg_lens.append(len(serialized_msg))
+
+    if not msgs:
+        return [(make_batch_func([]), 0)]
 
     batches = []
-    while msgs:
-        batch = ''
-        msgs_for_batch = []
-        while msgs and is_batch_len_under_limit(len(batch)):
-            msg = msgs.pop(0)
-            serialized_msg = make_batch_func([msg])
-            if not is_batch_len_under_limit(len(serialized_msg)):
-                logger.display('The message {}... is too long ({}). '
-                               'Batches were not created'.format(serialized_msg[:256], len(serialized_msg)))
-                return
-            msgs_for_batch.append(msg)
-            batch = make_batch_func(msgs_for_batch)
-        """Need for limitation one batch size"""
-        if not is_batch_len_under_limit(len(batch)):
-            overload_msg = msgs_for_batch.pop()
-            batch = make_batch_func(msgs_for_batch)
-            msgs.insert(0, overload_msg)
-        batches.append((batch, len(msgs_for_batch)))
-    if len(batches) == 0:
-        batches = [(make_batch_func([]), 0)]
+    start = 0
+    # Ratio of a batch length to the sum of lengths of its messages
+    # serialized separately, learned from the previous batch
+    scale = 1.0
+    while start < len(msgs):
+        end = start + 1
+        msgs_len = msg_lens[start]
+        while end < len(msgs) and \
+                is_batch_len_under_limit(int((msgs_len + msg_lens[end]) * scale)):
+            msgs_len += msg_lens[end]
+            end += 1
+        batch, end = _make_largest_batch(msgs, start, end,
+                                         make_batch_func,
+                                         is_batch_len_under_limit)
+        scale = len(batch) / max(sum(msg_lens[start:end]), 1)
+        batches.append((batch, end - start))
+        start = end
     return batches
+
+
+def _make_largest_batch(msgs, start, end, make_batch_func,
+                        is_batch_len_under_limit):
+    # Returns the largest batch of messages starting from `start` which
+    # fits the limit and the index of the message after the batch
+    def make_batch(end):
+        batch = make_batch_func(msgs[start:end])
+        return batch if is_batch_len_under_limit(len(batch)) else None
+
+    batch = make_batch(end)
+    if batch is not None:
+        # The estimate fits, try to add more messages
+        fits, fits_batch, not_fits = end, batch, None
+        step = 1
+        while fits < len(msgs):
+            candidate = min(fits + step, len(msgs))
+            batch = make_batch(candidate)
+            if batch is None:
+                not_fits = candidate
+                break
+            fits, fits_batch = candidate, batch
+            step *= 2
+        if not_fits is None:
+            return fits_batch, fits
+    else:
+        # A single message always fits
+        fits, fits_batch, not_fits = start + 1, make_batch(start + 1), end
+
+    while not_fits - fits > 1:
+        middle = (fits + not_fits) // 2
+        batch = make_batch(middle)
+        if batch is None:
+            not_fits = middle
+        else:
+            fits, fits_batch = middle, batch
+    return fits_batch, fits
@@ -172,7 +172,8 @@ class NodeZStack(Batched, KITZStack):
                            seed=seed, sighex=sighex, config=config,
                            metrics=metrics,
                            mt_incoming_size=MetricsName.INCOMING_NODE_MESSAGE_SIZE,
-                           mt_outgoing_size=MetricsName.OUTGOING_NODE_MESSAGE_SIZE)
+                           mt_outgoing_size=MetricsName.OUTGOING_NODE_MESSAGE_SIZE,
+                           mt_outgoing_compression_ratio=MetricsName.OUTGOING_NODE_MESSAGE_COMPRESSION_RATIO)
         MessageProcessor.__init__(self, allowDictOnly=False)
         self.listenerQuota = config.NODE_TO_NODE_STACK_QUOTA
         self.listenerSize = config.NODE_TO_NODE_STACK_SIZE
@@ -41,6 +41,7 @@ class f:  # provides a namespace for reusable field constants
     IS_STABLE = Field('isStable', bool)
     MSGS = Field('messages', List[Mapping])
     SIG = Field('signature', Optional[str])
+    FEATURES = Field('features', List[str])
     PROTOCOL_VERSION = Field('protocolVersion', int)
     SUSP_CODE = Field('suspicionCode', int)
     ELECTION_DATA = Field('electionData', Any)
@@ -49,12 +50,16 @@ class f:  # provides a namespace for reusable field constants
     IS_SUCCESS = Field('isSuccess', Any)
     SENDER_CLIENT = Field('senderClient', str)
     PP_TIME = Field("ppTime", float)
+    PP_TIMES = Field("ppTimes", List[float])
     REQ_IDR = Field("reqIdr", List[str])
     DISCARDED = Field("discarded", int)
     STATE_ROOT = Field("stateRootHash", str)
+    STATE_ROOTS = Field("stateRootHashes", List[str])
     POOL_STATE_ROOT_HASH = Field("poolStateRootHash", str)
     TXN_ROOT = Field("txnRootHash", str)
+    TXN_ROOTS = Field("txnRootHashes", List[str])
     BLS_SIG = Field("blsSig", str)
+    BLS_SIGS = Field("blsSigs", List[str])
     BLS_MULTI_SIG = Field("blsMultiSig", str)
     BLS_MULTI_SIG_STATE_ROOT = Field("blsMultiSigStateRoot", str)
     MERKLE_ROOT = Field("merkleRoot", str)
@@ -2,7 +2,7 @@ import logging
 import sys
 
 from plenum.common.constants import ClientBootStrategy, HS_ROCKSDB, \
-    KeyValueStorageType, PreVCStrategies
+    KeyValueStorageType, PreVCStrategies, BatchingObjective
 from plenum.common.throughput_measurements import RevivalSpikeResistantEMAThroughputMeasurement
 from plenum.common.types import PLUGIN_TYPE_STATS_CONSUMER
 from plenum.common.average_strategies import MedianLowStrategy, MedianHighStrategy
@@ -36,6 +36,11 @@ poolStateDbName = 'pool_state'
 domainStateDbName = 'domain_state'
 configStateDbName = 'config_state'
 stateTsDbName = "state_ts_db"
+# Directory in node's data dir with state snapshots which are loaded
+# instead of replaying the whole ledger when state is empty and the pool
+# signed the state of the snapshot. Snapshots of a stopped node are written
+# by `export_state_snapshot` script
+stateSnapshotsDir = 'state_snapshots'
 
 stateSignatureDbName = 'state_signature'
 
@@ -252,9 +257,51 @@ Max3PCBatchSize = 1000
 # Max time to wait before creating a batch for 3 phase commit
 Max3PCBatchWait = 1
 
+# Tune wait time of 3 phase batches within `Max3PCBatchWait` and number of
+# queued requests for which a batch is sent without waiting within
+# `Max3PCBatchSize` from measured request arrival rate and ordering latency,
+# a batch still takes up to `Max3PCBatchSize` requests
+ADAPTIVE_3PC_BATCHING = False
+# THROUGHPUT batches requests arriving while a batch is ordered, LATENCY
+# keeps time from a request arrival to its ordering close to
+# `ADAPTIVE_3PC_BATCH_TARGET_LATENCY`
+ADAPTIVE_3PC_BATCH_OBJECTIVE = BatchingObjective.THROUGHPUT
+ADAPTIVE_3PC_BATCH_TARGET_LATENCY = 0.5  # in secs
+# Min time to wait before creating a batch with adaptive batching
+ADAPTIVE_3PC_MIN_BATCH_WAIT = 0.01  # in secs
+# Window of request arrival rate measurement, the limits are tuned once
+# per window
+ADAPTIVE_3PC_BATCH_WINDOW = 1  # in secs
+# Weight of the last measurement in averages of arrival rate and latency
+ADAPTIVE_3PC_BATCH_ALPHA = 0.3
+
+# Send PREPAREs and COMMITs of batches with consecutive ppSeqNos a replica
+# has in its outbox at once as a single AGGREGATED_PREPARE or
+# AGGREGATED_COMMIT. Every node of the pool has to understand them, so turn
+# on only once all nodes are upgraded.
+AGGREGATE_3PC_VOTES = False
+
 UPDATE_STATE_FRESHNESS = True
 STATE_FRESHNESS_UPDATE_INTERVAL = 300  # in secs
 
+# Pruning of state trie nodes which are not reachable from the last
+# `STATE_PRUNING_KEEP_ROOTS` committed state roots (0 to turn off, values
+# less than `LOG_SIZE` are increased to it).
+# Domain state roots are also kept for `STATE_PRUNING_KEEP_TIME` seconds so
+# that reads against roots from the timestamp store keep working.
+# Stale nodes are removed in batches of `STATE_PRUNING_GC_BATCH_SIZE`
+# every `STATE_PRUNING_GC_INTERVAL` seconds.
+# If pruning is turned on for a node which already has state, its databases
+# are migrated by the same periodic action: first the nodes reachable from
+# roots committed since the restart are marked and then all other nodes are
+# swept, `STATE_PRUNING_GC_BATCH_SIZE` nodes at a time. Roots committed
+# before the restart are not retained and stale nodes are removed only once
+# the migration is done, it is resumed after a restart.
+STATE_PRUNING_KEEP_ROOTS = 0
+STATE_PRUNING_KEEP_TIME = 24 * 60 * 60  # seconds
+STATE_PRUNING_GC_INTERVAL = 1  # seconds
+STATE_PRUNING_GC_BATCH_SIZE = 1000
+
 # Each node keeps a map of PrePrepare sequence numbers and the corresponding
 # txn seqnos that came out of it. Helps in servicing Consistency Proof Requests
 ProcessedBatchMapsToKeep = 1000
@@ -265,6 +312,9 @@ ProcessedBatchMapsToKeep = 1000
 MaxStateProofSize = 10
 # State proof timeout
 MaxStateProofTime = 3
+# Max number of (value, proof, multi-signature) entries cached for reads
+# against the committed state root (0 to turn off)
+STATE_PROOF_CACHE_SIZE = 1000
 
 # After ordering every `CHK_FREQ` batches, replica sends a CHECKPOINT
 CHK_FREQ = 100
@@ -366,6 +416,16 @@ VALIDATOR_INFO_UPGRADE_LOG_SIZE = 10
 REPLICAS_REMOVING_WITH_DEGRADATION = "quorum"
 REPLICAS_REMOVING_WITH_PRIMARY_DISCONNECTED = "local"
 
+# Keep 3PC batches of backup replicas as digests and request keys only,
+# without PRE-PREPARE, PREPARE and COMMIT messages
+DIGEST_ONLY_BACKUP_REPLICAS = False
+
+# Run every backup replica in a worker process of its own, exchanging
+# messages with the node over IPC queues
+BACKUP_REPLICAS_IN_PROCESSES = False
+# Seconds a backup replica worker waits for messages when it is idle
+BACKUP_REPLICA_WORKER_IDLE_TIMEOUT = 0.01
+
 # Number of seconds between GC statistics report in log (0 to turn off)
 GC_STATS_REPORT_INTERVAL = 0
 
@@ -377,6 +437,11 @@ EXTENDED_QUOTA_MULTIPLIER_BEFORE_VC = 10
 OUTDATED_REQS_CHECK_ENABLED = True
 OUTDATED_REQS_CHECK_INTERVAL = 600  # seconds
 PROPAGATES_PHASE_REQ_TIMEOUT = 36000  # seconds
+
+# Send a PROPAGATE_DIGEST with the request digest only instead of a PROPAGATE
+# to nodes which already sent a PROPAGATE for the request. Every node of the
+# pool has to understand them, so turn on only once all nodes are upgraded.
+DIGEST_ONLY_PROPAGATES = False
 ORDERING_PHASE_REQ_TIMEOUT = 72000  # seconds
 
 # Timeout factor after which an InstanceChange message are removed (0 to turn off)
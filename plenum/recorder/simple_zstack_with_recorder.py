@@ -29,6 +29,8 @@ class SimpleZStackWithRecorder(SimpleZStack):
     def _verifyAndAppend(self, msg, ident):
         if super()._verifyAndAppend(msg, ident):
             logger.trace('{} recording incoming {} from {}'.format(self, msg, ident))
+            if isinstance(msg, memoryview):
+                msg = msg.tobytes()
             self.recorder.add_incoming(msg, ident)
 
     def transmit(self, msg, uid, timeout=None, serialized=False):
@@ -0,0 +1,143 @@
+"""
+Backup replicas ordering on batch digests and request keys only.
+
+Backup replicas only feed the Monitor, yet a plain `Replica` keeps for them
+the same state as for the master: whole PRE-PREPAREs, PREPAREs and COMMITs,
+batches tracked for reverting and finalised requests looked up while
+creating and applying batches. `BackupReplica` keeps PRE-PREPAREs as
+`BatchRecord`s, voters of PREPAREs and COMMITs without the messages and no
+batches for reverting. It creates and checks batch digests from request
+keys, which are digests of the requests. Messages other replicas request
+from it are built again from the records.
+"""
+
+from typing import Optional
+
+from common.serializers.serialization import invalid_index_serializer
+from plenum.bls.bls_bft_replica_null import BlsBftReplicaNull
+from plenum.common.messages.node_messages import PrePrepare, Prepare, \
+    Commit, ThreePhaseKey
+from plenum.common.metrics_collector import MetricsCollector, \
+    NullMetricsCollector, MetricsName
+from plenum.common.request import ReqKey
+from plenum.server.models import Prepares, Commits, ThreePhaseVotes
+from plenum.server.replica import Replica, PP_APPLY_REJECT_WRONG, \
+    PP_SUB_SEQ_NO_WRONG, PP_NOT_FINAL, PP_APPLY_WRONG_DIGEST
+
+
+class BatchRecord:
+    """
+    PRE-PREPARE as a backup replica keeps it, with the fields needed to
+    prepare, commit and order its batch only
+    """
+
+    __slots__ = ('instId', 'viewNo', 'ppSeqNo', 'ppTime', 'reqIdr',
+                 'discarded', 'digest', 'ledgerId', 'stateRootHash',
+                 'txnRootHash')
+
+    def __init__(self, pre_prepare: PrePrepare):
+        for name in self.__slots__:
+            setattr(self, name, getattr(pre_prepare, name))
+
+    def to_pre_prepare(self) -> PrePrepare:
+        return PrePrepare(self.instId, self.viewNo, self.ppSeqNo,
+                          self.ppTime, self.reqIdr, self.discarded,
+                          self.digest, self.ledgerId, self.stateRootHash,
+                          self.txnRootHash, 0, True, None)
+
+    def __repr__(self):
+        return '{}(viewNo={}, ppSeqNo={}, digest={})'.format(
+            self.__class__.__name__, self.viewNo, self.ppSeqNo, self.digest)
+
+
+class VotersOnlyPrepares(Prepares):
+    def _new_vote_msg(self, msg):
+        return ThreePhaseVotes(voters=set(), msg=None)
+
+
+class VotersOnlyCommits(Commits):
+    def _new_vote_msg(self, msg):
+        return ThreePhaseVotes(voters=set(), msg=None)
+
+
+class BackupReplica(Replica):
+    """
+    Replica of a backup protocol instance keeping 3PC batches as digests
+    and request keys. It has no BLS replica since multi-signatures of
+    backups are never used.
+    """
+
+    def __init__(self, node, instId: int,
+                 config=None,
+                 metrics: MetricsCollector = NullMetricsCollector(),
+                 get_current_time=None):
+        super().__init__(node, instId, config=config, isMaster=False,
+                         bls_bft_replica=BlsBftReplicaNull(),
+                         metrics=metrics,
+                         get_current_time=get_current_time)
+        self.prepares = VotersOnlyPrepares()
+        self.commits = VotersOnlyCommits()
+
+    def trackBatches(self, pp: PrePrepare, prevStateRootHash):
+        # Batches are tracked to be reverted, which happens on master only
+        self.metrics.add_event(MetricsName.BACKUP_THREE_PC_BATCH_SIZE,
+                               len(pp.reqIdr))
+
+    def consume_req_queue_for_pre_prepare(self, ledger_id, tm,
+                                          view_no, pp_seq_no):
+        # Batch digest is made of request keys, so finalised requests are
+        # not needed. Backups do not validate requests, so nothing is
+        # rejected.
+        queue = self.requestQueues[ledger_id]
+        reqs = []
+        while len(reqs) < self.config.Max3PCBatchSize and queue:
+            key = queue.pop(0)
+            if key in self.requests:
+                reqs.append(ReqKey(key))
+            else:
+                self.logger.debug('{} found {} in its request queue but the '
+                                  'corresponding request was removed'.format(self, key))
+        return reqs, [], []
+
+    def sendPrePrepare(self, ppReq: PrePrepare):
+        super().sendPrePrepare(ppReq)
+        self.sentPrePrepares[ppReq.viewNo, ppReq.ppSeqNo] = BatchRecord(ppReq)
+
+    def _apply_pre_prepare(self, pre_prepare: PrePrepare, sender: str) -> Optional[int]:
+        # Backups do not validate requests, so a PRE-PREPARE discarding any
+        # of them is wrong
+        if invalid_index_serializer.deserialize(pre_prepare.discarded):
+            return PP_APPLY_REJECT_WRONG
+
+        if pre_prepare.sub_seq_no != 0:
+            return PP_SUB_SEQ_NO_WRONG
+
+        if not pre_prepare.final:
+            return PP_NOT_FINAL
+
+        digest = self.batchDigest([ReqKey(key) for key in pre_prepare.reqIdr])
+        if digest != pre_prepare.digest:
+            return PP_APPLY_WRONG_DIGEST
+        return None
+
+    def addToPrePrepares(self, pp: PrePrepare) -> None:
+        super().addToPrePrepares(BatchRecord(pp))
+
+    def get_sent_pre_prepare(self, viewNo, ppSeqNo):
+        record = self.sentPrePrepares.get((viewNo, ppSeqNo))
+        return record.to_pre_prepare() if record else None
+
+    def get_sent_prepare(self, viewNo, ppSeqNo):
+        record = self.getPrePrepare(viewNo, ppSeqNo)
+        if record is None or not self.prepares.hasPrepareFrom(
+                ThreePhaseKey(viewNo, ppSeqNo), self.name):
+            return None
+        return Prepare(self.instId, viewNo, ppSeqNo, record.ppTime,
+                       record.digest, record.stateRootHash,
+                       record.txnRootHash)
+
+    def get_sent_commit(self, viewNo, ppSeqNo):
+        if not self.commits.hasCommitFrom(ThreePhaseKey(viewNo, ppSeqNo),
+                                          self.name):
+            return None
+        return Commit(self.instId, viewNo, ppSeqNo)
@@ -1,4 +1,5 @@
 from binascii import hexlify
+from copy import deepcopy
 from hashlib import sha256
 
 from common.serializers.serialization import domain_state_serializer, \
@@ -8,11 +9,13 @@ from plenum.common.constants import TXN_TYPE, NYM, ROLE, STEWARD, TARGET_NYM, \
     VERKEY, TXN_TIME, ROOT_HASH, MULTI_SIGNATURE, PROOF_NODES, DATA, \
     STATE_PROOF
 from plenum.common.exceptions import UnauthorizedClientRequest
+from plenum.common.metrics_collector import MetricsCollector, NullMetricsCollector, MetricsName
 from plenum.common.plenum_protocol_version import PlenumProtocolVersion
 from plenum.common.request import Request
 from plenum.common.txn_util import reqToTxn, get_type, get_payload_data, get_seq_no, get_txn_time, get_from
 from plenum.common.types import f
 from plenum.server.ledger_req_handler import LedgerRequestHandler
+from plenum.server.state_proof_cache import StateProofCache, StateProofCacheEntry
 from stp_core.common.log import getlogger
 
 logger = getlogger()
@@ -22,11 +25,14 @@ class DomainRequestHandler(LedgerRequestHandler):
     stateSerializer = domain_state_serializer
     write_types = {NYM, }
 
-    def __init__(self, ledger, state, config, reqProcessors, bls_store, ts_store=None):
+    def __init__(self, ledger, state, config, reqProcessors, bls_store, ts_store=None,
+                 metrics: MetricsCollector = None):
         super().__init__(ledger, state, ts_store=ts_store)
         self.config = config
         self.reqProcessors = reqProcessors
         self.bls_store = bls_store
+        self.metrics = metrics if metrics is not None else NullMetricsCollector()
+        self.state_proof_cache = StateProofCache(config.STATE_PROOF_CACHE_SIZE)
 
     def doStaticValidation(self, request: Request):
         pass
@@ -176,11 +182,22 @@ class DomainRequestHandler(LedgerRequestHandler):
         :return: a state proof or None
         '''
         root_hash = head_hash if head_hash else self.state.committedHeadHash
-        encoded_root_hash = state_roots_serializer.serialize(bytes(root_hash))
 
         if not with_proof:
             return self.state.get_for_root_hash(root_hash, path), None
 
+        # Values and proofs are cached only for reads against the committed
+        # root, so the cache is reset each time the committed root changes
+        is_committed_root = bytes(root_hash) == bytes(self.state.committedHeadHash)
+        if is_committed_root:
+            cached = self.state_proof_cache.get(bytes(root_hash), path)
+            self.metrics.add_event(MetricsName.STATE_PROOF_CACHE_HIT, 1 if cached else 0)
+            if cached:
+                # Results embed value and proof and may be changed, so the
+                # cached ones are never handed out
+                return deepcopy(cached.value), deepcopy(cached.proof)
+
+        encoded_root_hash = state_roots_serializer.serialize(bytes(root_hash))
         multi_sig = self.bls_store.get(encoded_root_hash)
         if not multi_sig:
             # Just return the value and not proof
@@ -190,10 +207,11 @@ class DomainRequestHandler(LedgerRequestHandler):
                 return None, None
         else:
             try:
-                proof, value = self.state.generate_state_proof(key=path,
-                                                               root=self.state.get_head_by_hash(root_hash),
-                                                               serialize=True,
-                                                               get_value=True)
+                with self.metrics.measure_time(MetricsName.GENERATE_STATE_PROOF_TIME):
+                    proof, value = self.state.generate_state_proof(key=path,
+                                                                   root=self.state.get_head_by_hash(root_hash),
+                                                                   serialize=True,
+                                                                   get_value=True)
                 value = self.state.get_decoded(value) if value else value
                 encoded_proof = proof_nodes_serializer.serialize(proof)
                 proof = {
@@ -201,10 +219,18 @@ class DomainRequestHandler(LedgerRequestHandler):
                     MULTI_SIGNATURE: multi_sig.as_dict(),
                     PROOF_NODES: encoded_proof
                 }
-                return value, proof
             except KeyError:
                 return None, None
 
+            if is_committed_root:
+                self.state_proof_cache.put(bytes(root_hash), path,
+                                           StateProofCacheEntry(value=deepcopy(value),
+                                                                proof=deepcopy(proof),
+                                                                multi_sig=multi_sig))
+                self.metrics.add_event(MetricsName.STATE_PROOF_CACHE_SIZE,
+                                       len(self.state_proof_cache))
+            return value, proof
+
     @staticmethod
     def make_result(request, data, last_seq_no, update_time, proof):
         result = {**request.operation, **{
@@ -146,8 +146,8 @@ class PreprepareHandler(BaseHandler):
         return pp
 
     def requestor(self, params: Dict[str, Any]) -> Optional[PrePrepare]:
-        return self.node.replicas[params['inst_id']].sentPrePrepares.get((
-            params['view_no'], params['pp_seq_no']))
+        return self.node.replicas[params['inst_id']].get_sent_pre_prepare(
+            params['view_no'], params['pp_seq_no'])
 
     def processor(self, validated_msg: PrePrepare, params: Dict[str, Any], frm: str) -> None:
         inst_id = params['inst_id']
@@ -237,11 +237,19 @@ class PropagateHandler(BaseHandler):
 
     def requestor(self, params: Dict[str, Any]) -> Optional[Propagate]:
         req_key = params[f.DIGEST.nm]
-        if req_key in self.node.requests and self.node.requests[req_key].finalised:
-            sender_client = self.node.requestSender.get(req_key)
-            req = self.node.requests[req_key].finalised
-            return self.node.createPropagate(req, sender_client)
-        return None
+        state = self.node.requests.get(req_key)
+        if state is None:
+            return None
+        req = state.finalised
+        if req is None and self.node.config.DIGEST_ONLY_PROPAGATES and \
+                self.node.name in state.propagates:
+            # Nodes which got a PROPAGATE_DIGEST from this node fetch the
+            # request before it is finalised
+            req = state.request
+        if req is None:
+            return None
+        sender_client = self.node.requestSender.get(req_key)
+        return self.node.createPropagate(req, sender_client)
 
     def processor(self, validated_msg: Propagate, params: Dict[str, Any], frm: str) -> None:
         self.node.processPropagate(validated_msg, frm)
@@ -20,8 +20,11 @@ from plenum.common.metrics_collector import KvStoreMetricsCollector, NullMetrics
 from plenum.server.backup_instance_faulty_processor import BackupInstanceFaultyProcessor
 from plenum.server.inconsistency_watchers import NetworkInconsistencyWatcher
 from plenum.server.last_sent_pp_store_helper import LastSentPpStoreHelper
-from plenum.server.quota_control import StaticQuotaControl, RequestQueueQuotaControl
+from plenum.server.quota_control import StaticQuotaControl, RequestQueueQuotaControl, \
+    AdaptiveQuotaControl
 from state.pruning_state import PruningState
+from state.snapshot import StateSnapshotError, read_state_snapshot_header, \
+    import_state_snapshot, export_state_snapshot
 from state.state import State
 from storage.helper import initKeyValueStorage, initHashStore, initKeyValueStorageIntKeys
 from storage.state_ts_store import StateTsDbStorage
@@ -38,13 +41,15 @@ from ledger.hash_stores.hash_store import HashStore
 from plenum.common.config_util import getConfig
 from plenum.common.constants import POOL_LEDGER_ID, DOMAIN_LEDGER_ID, \
     CLIENT_BLACKLISTER_SUFFIX, CONFIG_LEDGER_ID, \
+    STATE_SNAPSHOT_LEDGER_SIZE, STATE_SNAPSHOT_TXN_ROOT_HASH, \
     NODE_BLACKLISTER_SUFFIX, NODE_PRIMARY_STORAGE_SUFFIX, \
     TXN_TYPE, LEDGER_STATUS, \
     CLIENT_STACK_SUFFIX, PRIMARY_SELECTION_PREFIX, VIEW_CHANGE_PREFIX, \
     OP_FIELD_NAME, CATCH_UP_PREFIX, NYM, \
     GET_TXN, DATA, VERKEY, \
     TARGET_NYM, ROLE, STEWARD, TRUSTEE, ALIAS, \
-    NODE_IP, BLS_PREFIX, NodeHooks, LedgerState, CURRENT_PROTOCOL_VERSION
+    NODE_IP, BLS_PREFIX, NodeHooks, LedgerState, CURRENT_PROTOCOL_VERSION, \
+    PROPAGATE
 from plenum.common.exceptions import SuspiciousNode, SuspiciousClient, \
     MissingNodeOp, InvalidNodeOp, InvalidNodeMsg, InvalidClientMsgType, \
     InvalidClientRequest, BaseExc, \
@@ -61,7 +66,8 @@ from plenum.common.messages.node_messages import Nomination, Batch, Reelection,
     Propagate, PrePrepare, Prepare, Commit, Checkpoint, Reply, InstanceChange, LedgerStatus, \
     ConsistencyProof, CatchupReq, CatchupRep, ViewChangeDone, \
     CurrentState, MessageReq, MessageRep, ThreePhaseType, BatchCommitted, \
-    ObservedData, FutureViewChangeDone, BackupInstanceFaulty
+    ObservedData, FutureViewChangeDone, BackupInstanceFaulty, \
+    AggregatedPrepare, AggregatedCommit, PropagateDigest
 from plenum.common.motor import Motor
 from plenum.common.plugin_helper import loadPlugins
 from plenum.common.request import Request, SafeRequest
@@ -83,6 +89,7 @@ from plenum.persistence.req_id_to_txn import ReqIdrToTxn
 from plenum.persistence.storage import Storage, initStorage
 from plenum.bls.bls_bft_factory import create_default_bls_bft_factory
 from plenum.bls.bls_crypto_factory import create_default_bls_crypto_factory
+from plenum.bls.bls_store import BlsStore
 from plenum.recorder.recorder import add_start_time, add_stop_time
 
 from plenum.client.wallet import Wallet
@@ -411,6 +418,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         if config.GC_STATS_REPORT_INTERVAL > 0:
             self.startRepeating(self.report_gc_stats, config.GC_STATS_REPORT_INTERVAL)
 
+        if config.STATE_PRUNING_KEEP_ROOTS > 0:
+            self.startRepeating(self.collect_state_garbage, config.STATE_PRUNING_GC_INTERVAL)
+
         self.white_list_init()
 
         # Map of request identifier, request id to client name. Used for
@@ -426,7 +436,15 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         client_quota = Quota(count=config.CLIENT_TO_NODE_STACK_QUOTA,
                              size=config.CLIENT_TO_NODE_STACK_SIZE)
 
-        if config.ENABLE_DYNAMIC_QUOTAS:
+        if config.ENABLE_ADAPTIVE_QUOTAS:
+            self.quota_control = AdaptiveQuotaControl(node_quota=node_quota,
+                                                      client_quota=client_quota,
+                                                      latency_budget=config.ADAPTIVE_QUOTA_LATENCY_BUDGET,
+                                                      max_replica_inbox_size=config.ADAPTIVE_QUOTA_MAX_REPLICA_INBOX_SIZE,
+                                                      max_request_queue_size=config.MAX_REQUEST_QUEUE_SIZE,
+                                                      min_ratio=config.ADAPTIVE_QUOTA_MIN_RATIO,
+                                                      max_ratio=config.ADAPTIVE_QUOTA_MAX_RATIO)
+        elif config.ENABLE_DYNAMIC_QUOTAS:
             self.quota_control = RequestQueueQuotaControl(max_request_queue_size=config.MAX_REQUEST_QUEUE_SIZE,
                                                           max_node_quota=node_quota,
                                                           max_client_quota=client_quota)
@@ -559,6 +577,10 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             Prepare,
             Checkpoint,
             Commit,
+            AggregatedPrepare,
+            AggregatedCommit,
+            # Carries no request, the request is known already
+            PropagateDigest,
             InstanceChange,
             LedgerStatus,
             ConsistencyProof,
@@ -575,6 +597,7 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         # CurrentState
         self.nodeMsgRouter = Router(
             (Propagate, self.processPropagate),
+            (PropagateDigest, self.process_propagate_digest),
             (InstanceChange, self.sendToViewChanger),
             (ViewChangeDone, self.sendToViewChanger),
             (MessageReq, self.process_message_req),
@@ -582,6 +605,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             (PrePrepare, self.sendToReplica),
             (Prepare, self.sendToReplica),
             (Commit, self.sendToReplica),
+            (AggregatedPrepare, self.sendToReplica),
+            (AggregatedCommit, self.sendToReplica),
             (Checkpoint, self.sendToReplica),
             (LedgerStatus, self.ledgerManager.processLedgerStatus),
             (ConsistencyProof, self.ledgerManager.processConsistencyProof),
@@ -650,13 +675,22 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
                       ensureDurability=self.config.EnsureLedgerDurability)
 
     # STATES
+    @property
+    def state_pruning_keep_roots(self):
+        # Nodes written for uncommitted batches are considered stale after this
+        # number of commits, so it can't be less than number of batches in flight
+        if self.config.STATE_PRUNING_KEEP_ROOTS <= 0:
+            return 0
+        return max(self.config.STATE_PRUNING_KEEP_ROOTS, self.config.LOG_SIZE)
+
     def init_pool_state(self):
         return PruningState(
             initKeyValueStorage(
                 self.config.poolStateStorage,
                 self.dataLocation,
                 self.config.poolStateDbName,
-                db_config=self.config.db_state_config)
+                db_config=self.config.db_state_config),
+            keep_roots=self.state_pruning_keep_roots
         )
 
     def init_domain_state(self):
@@ -665,7 +699,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
                 self.config.domainStateStorage,
                 self.dataLocation,
                 self.config.domainStateDbName,
-                db_config=self.config.db_state_config)
+                db_config=self.config.db_state_config),
+            keep_roots=self.state_pruning_keep_roots,
+            keep_time=self.config.STATE_PRUNING_KEEP_TIME
         )
 
     def init_config_state(self):
@@ -674,7 +710,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
                 self.config.configStateStorage,
                 self.dataLocation,
                 self.config.configStateDbName,
-                db_config=self.config.db_state_config)
+                db_config=self.config.db_state_config),
+            keep_roots=self.state_pruning_keep_roots
         )
 
     # REQ_HANDLERS
@@ -689,7 +726,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
                                     self.config,
                                     self.reqProcessors,
                                     self.bls_bft.bls_store,
-                                    self.getStateTsDbStorage())
+                                    self.getStateTsDbStorage(),
+                                    metrics=self.metrics)
 
     def init_config_req_handler(self):
         return ConfigReqHandler(self.configLedger,
@@ -734,20 +772,105 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         return committed_txns
 
     # STATES INIT
-    def init_state_from_ledger(self, state: State, ledger: Ledger, reqHandler):
+    def init_state_from_ledger(self, state: State, ledger: Ledger, reqHandler,
+                               snapshot_path: str = None,
+                               bls_store: BlsStore = None):
         """
-        If the trie is empty then initialize it by applying
-        txns from ledger.
+        If the trie is empty then initialize it by loading the state snapshot
+        from `snapshot_path` if there is one and its state is signed by the
+        pool in `bls_store`, and applying txns from ledger which are not
+        covered by the snapshot.
         """
         if state.isEmpty:
             logger.info('{} found state to be empty, recreating from '
                         'ledger'.format(self))
-            for seq_no, txn in ledger.getAllTxn():
+            snapshot_size = self._load_state_snapshot(state, ledger,
+                                                      snapshot_path, bls_store)
+            for seq_no, txn in ledger.getAllTxn(frm=snapshot_size + 1):
                 txn = self.update_txn_with_extra_data(txn)
                 reqHandler.updateState([txn, ], isCommitted=True)
                 state.commit(rootHash=state.headHash)
 
+    def _load_state_snapshot(self, state: PruningState, ledger: Ledger,
+                             snapshot_path: Optional[str],
+                             bls_store: Optional[BlsStore]) -> int:
+        """
+        Loads the state snapshot if it was made for a prefix of the ledger
+        and the pool signed its state root together with the root of
+        that prefix
+
+        :return: number of ledger txns covered by the loaded snapshot
+        """
+        if snapshot_path is None or not os.path.isfile(snapshot_path):
+            return 0
+        if bls_store is None:
+            logger.info('{} does not load state snapshot {} since there are '
+                        'no multi-signatures to check it against'
+                        .format(self, snapshot_path))
+            return 0
+        try:
+            with open(snapshot_path, 'rb') as f:
+                header = read_state_snapshot_header(f)
+                ledger_size = header.meta.get(STATE_SNAPSHOT_LEDGER_SIZE)
+                if not isinstance(ledger_size, int) or \
+                        not 0 < ledger_size <= ledger.size:
+                    raise StateSnapshotError('snapshot ledger size {} does not '
+                                             'fit ledger size {}'
+                                             .format(ledger_size, ledger.size))
+                txn_root_hash = ledger.hashToStr(ledger.tree.merkle_tree_hash(0, ledger_size))
+                if header.meta.get(STATE_SNAPSHOT_TXN_ROOT_HASH) != txn_root_hash:
+                    raise StateSnapshotError('snapshot was made for other txns')
+                multi_sig = bls_store.get(
+                    state_roots_serializer.serialize(header.root_hash))
+                if multi_sig is None or \
+                        multi_sig.value.txn_root_hash != txn_root_hash:
+                    raise StateSnapshotError('snapshot state root is not signed '
+                                             'by the pool for these txns')
+                import_state_snapshot(state, f, header=header)
+        except (OSError, StateSnapshotError) as ex:
+            logger.warning('{} could not load state snapshot {}: {}'
+                           .format(self, snapshot_path, ex))
+            return 0
+        logger.info('{} loaded state snapshot {} for {} txns'
+                    .format(self, snapshot_path, ledger_size))
+        return ledger_size
+
+    def export_state_snapshot(self, ledger_id: int,
+                              snapshot_path: str = None) -> str:
+        """
+        Writes snapshot of the committed state of the given ledger, by default
+        into the place where it is loaded from when the state is empty.
+        Snapshots are loaded only if the pool signed their state, so
+        `StateSnapshotError` is raised if the committed state is not signed.
+
+        :return: path of the written snapshot
+        """
+        state = self.getState(ledger_id)
+        ledger = self.getLedger(ledger_id)
+        multi_sig = self.bls_bft.bls_store.get(
+            state_roots_serializer.serialize(bytes(state.committedHeadHash)))
+        if multi_sig is None or multi_sig.value.txn_root_hash != ledger.root_hash:
+            raise StateSnapshotError('committed state of ledger {} is not signed '
+                                     'by the pool'.format(ledger_id))
+        snapshot_path = snapshot_path or self._state_snapshot_path(ledger_id)
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        meta = {STATE_SNAPSHOT_LEDGER_SIZE: ledger.size,
+                STATE_SNAPSHOT_TXN_ROOT_HASH: ledger.root_hash}
+        tmp_path = snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            leaves = export_state_snapshot(state, f, meta=meta)
+        os.replace(tmp_path, snapshot_path)
+        logger.info('{} exported {} state entries of ledger {} to {}'
+                    .format(self, leaves, ledger_id, snapshot_path))
+        return snapshot_path
+
+    def _state_snapshot_path(self, ledger_id: int) -> str:
+        return os.path.join(self.dataLocation, self.config.stateSnapshotsDir,
+                            '{}.snapshot'.format(ledger_id))
+
     def upload_pool_state(self):
+        # Pool state is initialized before BLS, which needs it, so there are
+        # no multi-signatures to trust its snapshot, it is replayed instead
         self.init_state_from_ledger(self.states[POOL_LEDGER_ID],
                                     self.poolLedger, self.get_req_handler(POOL_LEDGER_ID))
         logger.info(
@@ -757,7 +880,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
     def upload_domain_state(self):
         self.init_state_from_ledger(self.states[DOMAIN_LEDGER_ID],
-                                    self.domainLedger, self.get_req_handler(DOMAIN_LEDGER_ID))
+                                    self.domainLedger, self.get_req_handler(DOMAIN_LEDGER_ID),
+                                    snapshot_path=self._state_snapshot_path(DOMAIN_LEDGER_ID),
+                                    bls_store=self.bls_bft.bls_store)
         logger.info(
             "{} initialized domain state: state root {}".format(
                 self, state_roots_serializer.serialize(
@@ -765,7 +890,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
     def upload_config_state(self):
         self.init_state_from_ledger(self.states[CONFIG_LEDGER_ID],
-                                    self.configLedger, self.get_req_handler(CONFIG_LEDGER_ID))
+                                    self.configLedger, self.get_req_handler(CONFIG_LEDGER_ID),
+                                    snapshot_path=self._state_snapshot_path(CONFIG_LEDGER_ID),
+                                    bls_store=self.bls_bft.bls_store)
         logger.info(
             "{} initialized config state: state root {}".format(
                 self, state_roots_serializer.serialize(
@@ -1295,6 +1422,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.nodestack.stop()
         self.clientstack.stop()
 
+        self.replicas.stop_remote_replicas()
+
         self.closeAllKVStores()
 
         self._info_tool.stop()
@@ -1344,12 +1473,16 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         """
         c = 0
 
+        looper_run_time = 0
         if self.last_prod_started:
-            self.metrics.add_event(MetricsName.LOOPER_RUN_TIME_SPENT, time.perf_counter() - self.last_prod_started)
+            looper_run_time = time.perf_counter() - self.last_prod_started
+            self.metrics.add_event(MetricsName.LOOPER_RUN_TIME_SPENT, looper_run_time)
         self.last_prod_started = time.perf_counter()
 
         self.quota_control.update_state({
-            'request_queue_size': len(self.monitor.requestTracker.unordered())}
+            'request_queue_size': len(self.monitor.requestTracker.unordered()),
+            'looper_run_time': looper_run_time,
+            'replica_inbox_size': self.replicas.sum_inbox_len}
         )
 
         if self.status is not Status.stopped:
@@ -1374,6 +1507,12 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
         return c
 
+    def sockets_to_poll(self):
+        if self.status is Status.stopped:
+            return []
+        return self.nodestack.sockets_to_poll() + \
+            self.clientstack.sockets_to_poll()
+
     @async_measure_time(MetricsName.SERVICE_REPLICAS_TIME)
     async def serviceReplicas(self, limit) -> int:
         """
@@ -1671,7 +1810,7 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         if isinstance(msg, (InstanceChange, ViewChangeDone)):
             self.sendToViewChanger(msg, frm)
             return True
-        elif isinstance(msg, ThreePhaseType):
+        elif isinstance(msg, ThreePhaseType + (AggregatedPrepare, AggregatedCommit)):
             self.sendToReplica(msg, frm)
             return True
         else:
@@ -1727,7 +1866,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         num_processed = 0
         for message in self.replicas.get_output(limit):
             num_processed += 1
-            if isinstance(message, (PrePrepare, Prepare, Commit, Checkpoint)):
+            if isinstance(message, (PrePrepare, Prepare, Commit, Checkpoint,
+                                    AggregatedPrepare, AggregatedCommit)):
                 self.send(message)
             elif isinstance(message, Ordered):
                 self.try_processing_ordered(message)
@@ -2639,16 +2779,45 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
                      format(self.name, msg))
 
         request = TxnUtilConfig.client_request_class(**msg.request)
+        self._process_propagated_request(request, msg.senderClient, frm)
+
+    @measure_time(MetricsName.PROCESS_PROPAGATE_DIGEST_TIME)
+    def process_propagate_digest(self, msg: PropagateDigest, frm):
+        """
+        Process a PROPAGATE_DIGEST as a PROPAGATE of the request with the
+        digest. The request is requested from the sender if this node does
+        not have it.
+
+        :param msg: the PROPAGATE_DIGEST
+        :param frm: the name of the node which sent this `msg`
+        """
+        logger.debug("{} received propagated request digest: {}".
+                     format(self.name, msg))
 
-        clientName = msg.senderClient
+        state = self.requests.get(msg.digest)
+        if state is not None:
+            self._process_propagated_request(state.request, msg.senderClient, frm)
+            return
+
+        ledger_id, seq_no = self.seqNoDB.get(msg.digest)
+        if ledger_id is not None and seq_no is not None:
+            logger.debug("{} ignoring propagated request digest {} "
+                         "since it has been already ordered"
+                         .format(self.name, msg))
+            return
 
+        logger.debug("{} requesting PROPAGATE for {} from {} since it does "
+                     "not have the request".format(self.name, msg.digest, frm))
+        self.request_msg(PROPAGATE, {f.DIGEST.nm: msg.digest}, [frm])
+
+    def _process_propagated_request(self, request: Request, clientName, frm):
         if not self.isProcessingReq(request.key):
             ledger_id, seq_no = self.seqNoDB.get(request.key)
             if ledger_id is not None and seq_no is not None:
                 self._clean_req_from_verified(request)
                 logger.debug("{} ignoring propagated request {} "
                              "since it has been already ordered"
-                             .format(self.name, msg))
+                             .format(self.name, request.key))
                 return
 
             self.startedProcessingReq(request.key, clientName)
@@ -2837,6 +3006,15 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         obj_tree.report_top_collections()
         obj_tree.cleanup()
 
+    def collect_state_garbage(self):
+        for ledger_id, state in self.states.items():
+            if not isinstance(state, PruningState):
+                continue
+            removed = state.collect_garbage(self.config.STATE_PRUNING_GC_BATCH_SIZE)
+            if removed:
+                logger.debug("{} removed {} stale trie nodes from state of ledger {}".
+                             format(self, removed, ledger_id))
+
     def flush_metrics(self):
         # Flush accumulated should always be done to avoid numeric overflow in accumulators
         self.metrics.flush_accumulated()
@@ -2964,12 +3142,14 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.metrics.add_event(MetricsName.REPLICA_REPEATING_ACTIONS_MASTER, len(self.master_replica.repeatingActions))
         self.metrics.add_event(MetricsName.REPLICA_SCHEDULED_MASTER, len(self.master_replica.scheduled))
 
+        # Backup replicas in worker processes are not measured here
+        local_backups = [r for r in self.replicas.local_replicas if r is not self.master_replica]
+
         def sum_for_backups(field):
-            return sum(len(getattr(r, field)) for r in self.replicas._replicas.values() if r is not self.master_replica)
+            return sum(len(getattr(r, field)) for r in local_backups)
 
         def sum_for_values_for_backups(field):
-            return sum(sum_for_values(getattr(r, field))
-                       for r in self.replicas._replicas.values() if r is not self.master_replica)
+            return sum(sum_for_values(getattr(r, field)) for r in local_backups)
 
         self.metrics.add_event(MetricsName.REPLICA_OUTBOX_BACKUP, sum_for_backups('outBox'))
         self.metrics.add_event(MetricsName.REPLICA_INBOX_BACKUP, sum_for_backups('inBox'))
@@ -2993,7 +3173,7 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.metrics.add_event(MetricsName.REPLICA_STASHED_RECVD_CHECKPOINTS_BACKUP,
                                sum_for_values_for_backups('stashedRecvdCheckpoints'))
         self.metrics.add_event(MetricsName.REPLICA_STASHING_WHILE_OUTSIDE_WATERMARKS_BACKUP,
-                               sum(r.stasher.num_stashed_watermarks for r in self.replicas.values()))
+                               sum(r.stasher.num_stashed_watermarks for r in self.replicas.local_replicas))
         self.metrics.add_event(MetricsName.REPLICA_REQUEST_QUEUES_BACKUP,
                                sum_for_values_for_backups('requestQueues'))
         self.metrics.add_event(MetricsName.REPLICA_BATCHES_BACKUP, sum_for_backups('batches'))
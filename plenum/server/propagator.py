@@ -1,12 +1,12 @@
 import time
 
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict
 
 from typing import Union
 
 from orderedset import OrderedSet
 from plenum.common.constants import PROPAGATE, THREE_PC_PREFIX
-from plenum.common.messages.node_messages import Propagate
+from plenum.common.messages.node_messages import Propagate, PropagateDigest
 from plenum.common.metrics_collector import MetricsCollector, NullMetricsCollector, MetricsName
 from plenum.common.request import Request, ReqKey
 from plenum.common.types import f
@@ -21,6 +21,10 @@ class ReqState:
     Object to store the state of the request.
     """
 
+    __slots__ = ('request', 'forwarded', 'forwardedTo', 'propagates',
+                 'digest_votes', 'digest_requests', 'finalised', 'executed',
+                 'added_ts', 'finalised_ts', 'unordered_by_replicas_num')
+
     def __init__(self, request: Request):
         self.request = request
         self.forwarded = False
@@ -28,21 +32,35 @@ class ReqState:
         # been forwarded to, helps in garbage collection
         self.forwardedTo = 0
         self.propagates = {}
+        # Number of senders of PROPAGATEs of each digest and the last
+        # request propagated with it
+        self.digest_votes = {}
+        self.digest_requests = {}
         self.finalised = None
         self.executed = False
         self.added_ts = time.perf_counter()
         self.finalised_ts = None
         self.unordered_by_replicas_num = 0
 
-    def req_with_acceptable_quorum(self, quorum: Quorum):
-        digests = defaultdict(set)
+    def add_propagate(self, req: Request, sender: str):
+        old = self.propagates.get(sender)
+        self.propagates[sender] = req
         # this is workaround because we are getting a propagate from
         # somebody with non-str (byte) name
-        for sender, req in filter(lambda x: isinstance(
-                x[0], str), self.propagates.items()):
-            digests[req.digest].add(sender)
-            if quorum.is_reached(len(digests[req.digest])):
-                return req
+        if not isinstance(sender, str):
+            return
+        digest = req.digest
+        if old is not None:
+            if old.digest == digest:
+                return
+            self.digest_votes[old.digest] -= 1
+        self.digest_votes[digest] = self.digest_votes.get(digest, 0) + 1
+        self.digest_requests[digest] = req
+
+    def req_with_acceptable_quorum(self, quorum: Quorum):
+        for digest, votes in self.digest_votes.items():
+            if quorum.is_reached(votes):
+                return self.digest_requests[digest]
 
     def set_finalised(self, req):
         # TODO: make it much explicitly and simpler
@@ -112,7 +130,7 @@ class Requests(OrderedDict):
         :param sender: the name of the node sending the msg
         """
         data = self.add(req)
-        data.propagates[sender] = req
+        data.add_propagate(req, sender)
 
     def votes(self, req) -> int:
         """
@@ -198,7 +216,9 @@ class Propagator:
     # noinspection PyUnresolvedReferences
     def propagate(self, request: Request, clientName):
         """
-        Broadcast a PROPAGATE to all other nodes
+        Broadcast a PROPAGATE to all other nodes. With
+        `DIGEST_ONLY_PROPAGATES` nodes which already sent a PROPAGATE for
+        the request get a PROPAGATE_DIGEST instead.
 
         :param request: the REQUEST to propagate
         """
@@ -210,7 +230,23 @@ class Propagator:
                 propagate = self.createPropagate(request, clientName)
                 logger.debug("{} propagating request {} from client {}".format(self, request.key, clientName),
                              extra={"cli": True, "tags": ["node-propagate"]})
-                self.send(propagate)
+                having_request = self._nodes_having_request(request)
+                if not having_request:
+                    self.send(propagate)
+                    return
+                self.sendToNodes(PropagateDigest(request.digest, propagate.senderClient),
+                                 having_request)
+                others = [name for name in self.nodeReg
+                          if name != self.name and name not in having_request]
+                if others:
+                    self.sendToNodes(propagate, others)
+
+    # noinspection PyUnresolvedReferences
+    def _nodes_having_request(self, request: Request):
+        if not self.config.DIGEST_ONLY_PROPAGATES:
+            return []
+        return [sender for sender in self.requests[request.key].propagates
+                if isinstance(sender, str) and sender != self.name]
 
     @staticmethod
     def createPropagate(
@@ -75,3 +75,79 @@ class RequestQueueQuotaControl(QuotaControl):
     @property
     def client_quota(self) -> Quota:
         return Quota(count=0, size=0) if self._request_queue_overflow else self._max_client_quota
+
+
+class AdaptiveQuotaControl(QuotaControl):
+    """
+    Scales base quotas to keep time of a looper run within a latency budget.
+
+    Quotas are increased additively while looper runs fit the budget, so
+    bursts are taken with quotas above the base ones, and decreased
+    multiplicatively when they do not. Client quota is decreased first and
+    is not increased while many requests are not ordered yet. Node quota is
+    decreased only when replicas can't keep up with node messages received
+    already, so consensus is not starved by client messages. No client
+    messages are received while request queue is full.
+    """
+
+    def __init__(self,
+                 node_quota: Quota,
+                 client_quota: Quota,
+                 latency_budget: float,
+                 max_replica_inbox_size: int,
+                 max_request_queue_size: int,
+                 min_ratio: float = 0.1,
+                 max_ratio: float = 4.0,
+                 increase_step: float = 0.1,
+                 decrease_factor: float = 0.5):
+        self._base_node_quota = node_quota
+        self._base_client_quota = client_quota
+        self._latency_budget = latency_budget
+        self._max_replica_inbox_size = max_replica_inbox_size
+        self._max_request_queue_size = max_request_queue_size
+        self._min_ratio = min_ratio
+        self._max_ratio = max_ratio
+        self._increase_step = increase_step
+        self._decrease_factor = decrease_factor
+        self._node_ratio = 1.0
+        self._client_ratio = 1.0
+        self._request_queue_overflow = False
+
+    def update_state(self, state: dict):
+        run_time = state.get('looper_run_time', 0)
+        replicas_overloaded = \
+            state.get('replica_inbox_size', 0) >= self._max_replica_inbox_size
+        request_queue_size = state.get('request_queue_size', 0)
+        self._request_queue_overflow = request_queue_size >= self._max_request_queue_size
+        requests_pending = request_queue_size >= self._max_request_queue_size // 2
+
+        if run_time > self._latency_budget or replicas_overloaded:
+            self._client_ratio = self._decrease(self._client_ratio)
+        elif not requests_pending:
+            self._client_ratio = self._increase(self._client_ratio)
+
+        if replicas_overloaded:
+            self._node_ratio = self._decrease(self._node_ratio)
+        elif run_time <= self._latency_budget:
+            self._node_ratio = self._increase(self._node_ratio)
+
+    @property
+    def node_quota(self) -> Quota:
+        return self._scale(self._base_node_quota, self._node_ratio)
+
+    @property
+    def client_quota(self) -> Quota:
+        if self._request_queue_overflow:
+            return Quota(count=0, size=0)
+        return self._scale(self._base_client_quota, self._client_ratio)
+
+    def _increase(self, ratio: float) -> float:
+        return min(ratio + self._increase_step, self._max_ratio)
+
+    def _decrease(self, ratio: float) -> float:
+        return max(ratio * self._decrease_factor, self._min_ratio)
+
+    @staticmethod
+    def _scale(quota: Quota, ratio: float) -> Quota:
+        return Quota(count=max(int(quota.count * ratio), 1),
+                     size=max(int(quota.size * ratio), 1))
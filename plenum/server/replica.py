@@ -1,5 +1,7 @@
 import time
+from bisect import bisect_right
 from collections import deque, OrderedDict, defaultdict
+from heapq import heappush, heappop
 from enum import unique, IntEnum
 from hashlib import sha256
 from typing import List, Dict, Optional, Any, Set, Tuple, Callable
@@ -25,7 +27,8 @@ from plenum.common.hook_manager import HookManager
 from plenum.common.message_processor import MessageProcessor
 from plenum.common.messages.message_base import MessageBase
 from plenum.common.messages.node_messages import Reject, Ordered, \
-    PrePrepare, Prepare, Commit, Checkpoint, CheckpointState, ThreePhaseMsg, ThreePhaseKey
+    PrePrepare, Prepare, Commit, Checkpoint, CheckpointState, ThreePhaseMsg, ThreePhaseKey, \
+    AggregatedPrepare, AggregatedCommit
 from plenum.common.metrics_collector import NullMetricsCollector, MetricsCollector, MetricsName
 from plenum.common.request import Request, ReqKey
 from plenum.common.types import f
@@ -34,13 +37,14 @@ from plenum.common.util import updateNamedTuple, compare_3PC_keys, max_3PC_key,
 from plenum.config import CHK_FREQ
 from plenum.server.has_action_queue import HasActionQueue
 from plenum.server.models import Commits, Prepares
+from plenum.server.replica_batch_controller import BatchController
 from plenum.server.replica_freshness_checker import FreshnessChecker
 from plenum.server.replica_stasher import ReplicaStasher
 from plenum.server.replica_validator import ReplicaValidator
 from plenum.server.replica_validator_enums import DISCARD, PROCESS, STASH_VIEW, STASH_WATERMARKS, STASH_CATCH_UP
 from plenum.server.router import Router
 from plenum.server.suspicion_codes import Suspicions
-from sortedcontainers import SortedList
+from sortedcontainers import SortedList, SortedSet
 from stp_core.common.log import getlogger
 
 import plenum.server.node
@@ -97,61 +101,51 @@ class Replica3PRouter(Router):
 
 
 class IntervalList:
+    """
+    Set of integers kept as sorted disjoint intervals which do not touch each
+    other, `_starts` and `_ends` hold their first and last items
+    """
+
     def __init__(self):
-        self._intervals = []
+        self._starts = []
+        self._ends = []
+        self._len = 0
 
     def __len__(self):
-        return sum(i[1] - i[0] + 1 for i in self._intervals)
+        return self._len
 
     def __eq__(self, other):
         if not isinstance(other, IntervalList):
             return False
-        return self._intervals == other._intervals
+        return self._starts == other._starts and self._ends == other._ends
 
     def __contains__(self, item):
-        return any(i[0] <= item <= i[1] for i in self._intervals)
+        idx = bisect_right(self._starts, item) - 1
+        return idx >= 0 and item <= self._ends[idx]
 
     def add(self, item):
-        if len(self._intervals) == 0:
-            self._intervals.append([item, item])
-            return
-
-        if item < self._intervals[0][0] - 1:
-            self._intervals.insert(0, [item, item])
-            return
-
-        if item == self._intervals[0][0] - 1:
-            self._intervals[0][0] -= 1
+        # Index of the last interval starting not after the item
+        idx = bisect_right(self._starts, item) - 1
+        if idx >= 0 and item <= self._ends[idx]:
             return
 
-        if self._intervals[0][0] <= item <= self._intervals[0][1]:
-            return
-
-        for prev, next in zip(self._intervals, self._intervals[1:]):
-            if item == prev[1] + 1:
-                prev[1] += 1
-                if prev[1] == next[0] - 1:
-                    prev[1] = next[1]
-                    self._intervals.remove(next)
-                return
-
-            if prev[1] + 1 < item < next[0] - 1:
-                idx = self._intervals.index(next)
-                self._intervals.insert(idx, [item, item])
-                return
-
-            if item == next[0] - 1:
-                next[0] -= 1
-                return
-
-            if next[0] <= item <= next[1]:
-                return
-
-        if item == self._intervals[-1][1] + 1:
-            self._intervals[-1][1] += 1
-            return
-
-        self._intervals.append([item, item])
+        self._len += 1
+        next_idx = idx + 1
+        extends_prev = idx >= 0 and self._ends[idx] == item - 1
+        extends_next = next_idx < len(self._starts) and \
+            self._starts[next_idx] == item + 1
+
+        if extends_prev and extends_next:
+            self._ends[idx] = self._ends[next_idx]
+            del self._starts[next_idx]
+            del self._ends[next_idx]
+        elif extends_prev:
+            self._ends[idx] = item
+        elif extends_next:
+            self._starts[next_idx] = item
+        else:
+            self._starts.insert(next_idx, item)
+            self._ends.insert(next_idx, item)
 
 
 class OrderedTracker:
@@ -168,7 +162,8 @@ class OrderedTracker:
 
     def __contains__(self, item):
         view_no, pp_seq_no = item
-        return pp_seq_no in self._batches[view_no]
+        batches = self._batches.get(view_no)
+        return batches is not None and pp_seq_no in batches
 
     def add(self, view_no, pp_seq_no):
         self._batches[view_no].add(pp_seq_no)
@@ -242,6 +237,8 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             (PrePrepare, self.process_three_phase_msg),
             (Prepare, self.process_three_phase_msg),
             (Commit, self.process_three_phase_msg),
+            (AggregatedPrepare, self.process_aggregated_prepare),
+            (AggregatedCommit, self.process_aggregated_commit),
             (Checkpoint, self.process_checkpoint),
         )
 
@@ -341,6 +338,12 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         # (viewNo, ppSeqNo).
         self.ordered = OrderedTracker()
 
+        # 3PC keys of PRE-PREPAREs, PREPAREs and COMMITs which might be not
+        # ordered yet. Keys which are ordered or have no 3PC messages any
+        # more are removed when they are the lowest ones, so the lowest
+        # unordered key is found in amortized O(log n)
+        self._unordered_3pc_keys = SortedSet()
+
         # Dictionary to keep track of the which replica was primary during each
         # view. Key is the view no and value is the name of the primary
         # replica during that view
@@ -351,6 +354,13 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         # viewNo and value a map of pre-prepare sequence number to commit
         # type: Dict[int,Dict[int,Commit]]
         self.stashed_out_of_order_commits = {}
+        # Min-heap of 3PC keys of stashed out of order commits, keys of
+        # commits which were removed from `stashed_out_of_order_commits`
+        # otherwise are dropped when they reach the top
+        self._stashed_out_of_order_commit_keys = []  # type: List[Tuple[int, int]]
+        # Whether last ordered 3PC key changed since stashed out of order
+        # commits were processed
+        self._last_ordered_changed = False
 
         self.checkpoints = SortedDict(lambda k: k[1])
 
@@ -385,6 +395,19 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         # TODO: Need to have a timer for each ledger
         self.lastBatchCreated = self.get_current_time()
 
+        # Tunes limits of 3PC batches when adaptive 3PC batching is on
+        self._batch_controller = None  # type: Optional[BatchController]
+        if self.config.ADAPTIVE_3PC_BATCHING:
+            self._batch_controller = BatchController(
+                objective=self.config.ADAPTIVE_3PC_BATCH_OBJECTIVE,
+                max_batch_size=self.config.Max3PCBatchSize,
+                max_batch_wait=self.config.Max3PCBatchWait,
+                min_batch_wait=self.config.ADAPTIVE_3PC_MIN_BATCH_WAIT,
+                target_latency=self.config.ADAPTIVE_3PC_BATCH_TARGET_LATENCY,
+                window=self.config.ADAPTIVE_3PC_BATCH_WINDOW,
+                alpha=self.config.ADAPTIVE_3PC_BATCH_ALPHA,
+                initial_time=self.lastBatchCreated)
+
         # self.lastOrderedPPSeqNo = 0
         # Three phase key for the last ordered batch
         self._last_ordered_3pc = (0, 0)
@@ -482,6 +505,7 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
     @last_ordered_3pc.setter
     def last_ordered_3pc(self, key3PC):
         self._last_ordered_3pc = key3PC
+        self._last_ordered_changed = True
         self.logger.info('{} set last ordered as {}'.format(
             self, self._last_ordered_3pc))
 
@@ -792,7 +816,33 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         self.batches[(pp.viewNo, pp.ppSeqNo)] = [pp.ledgerId, pp.discarded,
                                                  pp.ppTime, prevStateRootHash, len(pp.reqIdr)]
 
+    @property
+    def full_3pc_batch_size(self) -> int:
+        # Number of queued requests for which a batch is sent without
+        # waiting, a batch takes up to `Max3PCBatchSize` requests anyway
+        if self._batch_controller is not None:
+            return self._batch_controller.batch_size
+        return self.config.Max3PCBatchSize
+
+    @property
+    def max_3pc_batch_wait(self) -> float:
+        if self._batch_controller is not None:
+            return self._batch_controller.batch_wait
+        return self.config.Max3PCBatchWait
+
+    def _update_3pc_batch_limits(self):
+        if not self._batch_controller.update(self.get_current_time()):
+            return
+        if self.isMaster:
+            self.metrics.add_event(MetricsName.THREE_PC_BATCH_SIZE_LIMIT,
+                                   self._batch_controller.batch_size)
+            self.metrics.add_event(MetricsName.THREE_PC_BATCH_WAIT_LIMIT,
+                                   self._batch_controller.batch_wait)
+
     def send_3pc_batch(self):
+        if self._batch_controller is not None:
+            self._update_3pc_batch_limits()
+
         sent_batches = set()
 
         # 1. send 3PC batches with requests for every ledger
@@ -814,8 +864,8 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             if len(q) == 0:
                 continue
 
-            queue_full = len(q) >= self.config.Max3PCBatchSize
-            timeout = self.lastBatchCreated + self.config.Max3PCBatchWait < self.get_current_time()
+            queue_full = len(q) >= self.full_3pc_batch_size
+            timeout = self.lastBatchCreated + self.max_3pc_batch_wait < self.get_current_time()
             if not queue_full and not timeout:
                 continue
 
@@ -847,6 +897,9 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         oldStateRootHash = self.stateRootHash(ledger_id, to_str=False)
         pre_prepare = self.create_3pc_batch(ledger_id)
         self.sendPrePrepare(pre_prepare)
+        if self._batch_controller is not None:
+            self._batch_controller.on_batch_created(
+                (pre_prepare.viewNo, pre_prepare.ppSeqNo), self.get_current_time())
         if not self.isMaster:
             self.node.last_sent_pp_store_helper.store_last_sent_pp_seq_no(
                 self.instId, pre_prepare.ppSeqNo)
@@ -964,6 +1017,7 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
                           MetricsName.BACKUP_SEND_PREPREPARE_TIME)
     def sendPrePrepare(self, ppReq: PrePrepare):
         self.sentPrePrepares[ppReq.viewNo, ppReq.ppSeqNo] = ppReq
+        self._add_unordered_3pc_key((ppReq.viewNo, ppReq.ppSeqNo))
         self.send(ppReq, TPCStat.PrePrepareSent)
 
     def readyFor3PC(self, key: ReqKey):
@@ -976,6 +1030,8 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             return
         queue = self.requestQueues[self.node.ledger_id_for_request(fin_req)]
         queue.add(key.digest)
+        if self._batch_controller is not None:
+            self._batch_controller.on_request()
         if not self.hasPrimary and len(queue) >= self.HAS_NO_PRIMARY_WARN_THRESCHOLD:
             self.logger.warning('{} is getting requests but still does not have '
                                 'a primary so the replica will not process the request '
@@ -996,6 +1052,10 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         r += self.send_3pc_batch() if (self.isPrimary and
                                        self.node.isParticipating) else 0
         r += self._serviceActions()
+        if self._last_ordered_changed:
+            self.process_stashed_out_of_order_commits()
+        if self.config.AGGREGATE_3PC_VOTES:
+            self._aggregate_3pc_votes()
         return r
         # Messages that can be processed right now needs to be added back to the
         # queue. They might be able to be processed later
@@ -1024,6 +1084,102 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
                               "the reason: {}".format(self, msg, reason))
             self.stasher.stash((msg, sender), result)
 
+    def process_aggregated_prepare(self, msg: AggregatedPrepare, sender: str):
+        """
+        Process an AGGREGATED_PREPARE as the PREPAREs of each of its batches
+
+        :param msg: the AGGREGATED_PREPARE
+        :param sender: name of the node that sent this message
+        """
+        for i, digest in enumerate(msg.digests):
+            prepare = Prepare(msg.instId, msg.viewNo, msg.ppSeqNo + i,
+                              msg.ppTimes[i], digest, msg.stateRootHashes[i],
+                              msg.txnRootHashes[i])
+            self.process_three_phase_msg(prepare, sender)
+
+    def process_aggregated_commit(self, msg: AggregatedCommit, sender: str):
+        """
+        Process an AGGREGATED_COMMIT as the COMMITs of each of its batches.
+        A COMMIT is dropped if the digest it was sent for differs from the
+        digest of the PRE-PREPARE of the replica.
+
+        :param msg: the AGGREGATED_COMMIT
+        :param sender: name of the node that sent this message
+        """
+        bls_sigs = msg.blsSigs if f.BLS_SIGS.nm in msg else None
+        for i, digest in enumerate(msg.digests):
+            pp_seq_no = msg.ppSeqNo + i
+            pre_prepare = self.getPrePrepare(msg.viewNo, pp_seq_no)
+            if pre_prepare is not None and pre_prepare.digest != digest:
+                self.logger.warning("{} dropping COMMIT{} from {} since it was sent for digest {} instead of {}".
+                                    format(self, (msg.viewNo, pp_seq_no), sender, digest, pre_prepare.digest))
+                continue
+            params = [msg.instId, msg.viewNo, pp_seq_no]
+            if bls_sigs and bls_sigs[i] is not None:
+                params.append(bls_sigs[i])
+            self.process_three_phase_msg(Commit(*params), sender)
+
+    def _aggregate_3pc_votes(self):
+        """
+        Replace PREPAREs and COMMITs of batches with consecutive ppSeqNos in
+        the outbox with aggregated messages, put where the first of them was.
+        Votes are not moved ahead of other messages, so a run of votes ends
+        at any message which is not aggregated.
+        """
+        if sum(1 for msg in self.outBox if isinstance(msg, (Prepare, Commit))) < 2:
+            return
+
+        items = []
+        # Last run of votes of each type and view
+        runs = {}
+        for msg in self.outBox:
+            if self._can_aggregate(msg):
+                key = (type(msg), msg.viewNo)
+                run = runs.get(key)
+                if run is not None and run[-1].ppSeqNo + 1 == msg.ppSeqNo:
+                    run.append(msg)
+                    continue
+                run = runs[key] = [msg]
+                items.append(run)
+            else:
+                runs.clear()
+                items.append(msg)
+
+        self.outBox.clear()
+        for item in items:
+            if not isinstance(item, list):
+                self.outBox.append(item)
+            elif len(item) == 1:
+                self.outBox.append(item[0])
+            elif isinstance(item[0], Prepare):
+                self.outBox.append(self._aggregated_prepare(item))
+            else:
+                self.outBox.append(self._aggregated_commit(item))
+
+    def _can_aggregate(self, msg) -> bool:
+        if not isinstance(msg, (Prepare, Commit)) or f.PLUGIN_FIELDS.nm in msg:
+            return False
+        # Aggregated COMMITs carry digests of the batches
+        return isinstance(msg, Prepare) or \
+            self.getPrePrepare(msg.viewNo, msg.ppSeqNo) is not None
+
+    def _aggregated_prepare(self, prepares: List[Prepare]) -> AggregatedPrepare:
+        first = prepares[0]
+        return AggregatedPrepare(first.instId, first.viewNo, first.ppSeqNo,
+                                 [p.ppTime for p in prepares],
+                                 [p.digest for p in prepares],
+                                 [p.stateRootHash for p in prepares],
+                                 [p.txnRootHash for p in prepares])
+
+    def _aggregated_commit(self, commits: List[Commit]) -> AggregatedCommit:
+        first = commits[0]
+        params = [first.instId, first.viewNo, first.ppSeqNo,
+                  [self.getPrePrepare(c.viewNo, c.ppSeqNo).digest for c in commits]]
+        bls_sigs = [c.blsSig if f.BLS_SIG.nm in c else None for c in commits]
+        if any(sig is not None for sig in bls_sigs):
+            params.append(bls_sigs)
+        return AggregatedCommit(*params)
+
     def _process_valid_preprepare(self, pre_prepare, sender):
         # TODO: rename to apply_pre_prepare
         if not self.node.isParticipating:
@@ -1464,6 +1620,7 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         """
         key = (pp.viewNo, pp.ppSeqNo)
         self.prePrepares[key] = pp
+        self._add_unordered_3pc_key(key)
         self.lastPrePrepareSeqNo = pp.ppSeqNo
         self.last_accepted_pre_prepare_time = pp.ppTime
         self.dequeue_prepares(*key)
@@ -1569,6 +1726,7 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         self._bls_bft_replica.process_prepare(prepare, sender)
 
         self.prepares.addVote(prepare, sender)
+        self._add_unordered_3pc_key((prepare.viewNo, prepare.ppSeqNo))
         self.dequeue_commits(prepare.viewNo, prepare.ppSeqNo)
         self.tryCommit(prepare)
 
@@ -1580,6 +1738,9 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             return self.prePrepares[key]
         return None
 
+    def get_sent_pre_prepare(self, viewNo, ppSeqNo):
+        return self.sentPrePrepares.get((viewNo, ppSeqNo))
+
     def get_sent_prepare(self, viewNo, ppSeqNo):
         key = (viewNo, ppSeqNo)
         if key in self.prepares:
@@ -1688,6 +1849,7 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         self._bls_bft_replica.process_commit(commit, sender)
 
         self.commits.addVote(commit, sender)
+        self._add_unordered_3pc_key((commit.viewNo, commit.ppSeqNo))
         self.tryOrder(commit)
 
     def canOrder(self, commit: Commit) -> Tuple[bool, Optional[str]]:
@@ -1717,8 +1879,10 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             viewNo, ppSeqNo = commit.viewNo, commit.ppSeqNo
             if viewNo not in self.stashed_out_of_order_commits:
                 self.stashed_out_of_order_commits[viewNo] = {}
+            if ppSeqNo not in self.stashed_out_of_order_commits[viewNo]:
+                heappush(self._stashed_out_of_order_commit_keys,
+                         (viewNo, ppSeqNo))
             self.stashed_out_of_order_commits[viewNo][ppSeqNo] = commit
-            self.startRepeating(self.process_stashed_out_of_order_commits, 1)
             return False, "stashing {} since out of order". \
                 format(commit)
 
@@ -1728,78 +1892,78 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         """
         Return True if all previous COMMITs have been ordered
         """
-        # TODO: This method does a lot of work, choose correct data
-        # structures to make it efficient.
-
         viewNo, ppSeqNo = commit.viewNo, commit.ppSeqNo
 
         if self.last_ordered_3pc == (viewNo, ppSeqNo - 1):
             # Last ordered was in same view as this COMMIT
             return True
 
-        # if some PREPAREs/COMMITs were completely missed in the same view
-        toCheck = set()
-        toCheck.update(set(self.sentPrePrepares.keys()))
-        toCheck.update(set(self.prePrepares.keys()))
-        toCheck.update(set(self.prepares.keys()))
-        toCheck.update(set(self.commits.keys()))
-        for (v, p) in toCheck:
-            if v < viewNo and (v, p) not in self.ordered:
-                # Have commits from previous view that are unordered.
-                return False
-            if v == viewNo and p < ppSeqNo and (v, p) not in self.ordered:
-                # If unordered commits are found with lower ppSeqNo then this
-                # cannot be ordered.
-                return False
-
-        return True
+        # Unordered 3PC messages from previous views or with lower ppSeqNo
+        # in the same view mean that this COMMIT cannot be ordered yet
+        lowest = self._lowest_unordered_3pc_key()
+        return lowest is None or lowest >= (viewNo, ppSeqNo)
+
+    def _add_unordered_3pc_key(self, key: Tuple[int, int]):
+        if key not in self.ordered:
+            self._unordered_3pc_keys.add(tuple(key))
+
+    def _lowest_unordered_3pc_key(self) -> Optional[Tuple[int, int]]:
+        keys = self._unordered_3pc_keys
+        while keys:
+            key = keys[0]
+            if key not in self.ordered and (key in self.sentPrePrepares or
+                                            key in self.prePrepares or
+                                            key in self.prepares or
+                                            key in self.commits):
+                return key
+            keys.pop(0)
+        return None
 
     def process_stashed_out_of_order_commits(self):
-        # This method is called periodically to check for any commits that
-        # were stashed due to lack of commits before them and orders them if it
-        # can
+        # This method is called after last ordered 3PC key changed to order
+        # commits that were stashed due to lack of commits before them.
+        # Stashed commits are looked at in order of their 3PC keys, so it
+        # stops at the first one which still cannot be ordered
+        self._last_ordered_changed = False
+        keys = self._stashed_out_of_order_commit_keys
+        if not keys:
+            return
         self.logger.debug('{} trying to order from out of order commits. '
                           'Len(stashed_out_of_order_commits) == {}'
-                          .format(self, len(self.stashed_out_of_order_commits)))
-        if self.last_ordered_3pc:
+                          .format(self, len(keys)))
+        if not self.last_ordered_3pc:
+            self.logger.debug('{} last_ordered_3pc if False. '
+                              'Len(stashed_out_of_order_commits) == {}'
+                              .format(self, len(keys)))
+            return
+
+        while keys:
+            v, p = keys[0]
+            commit = self.stashed_out_of_order_commits.get(v, {}).get(p)
             lastOrdered = self.last_ordered_3pc
-            vToRemove = set()
-            for v in self.stashed_out_of_order_commits:
+            if commit is not None:
                 if v < lastOrdered[0]:
                     self.logger.debug(
-                        "{} found commits {} from previous view {}"
-                        " that were not ordered but last ordered"
-                        " is {}".format(
-                            self, self.stashed_out_of_order_commits[v], v, lastOrdered))
-                    vToRemove.add(v)
-                    continue
-                pToRemove = set()
-                for p, commit in self.stashed_out_of_order_commits[v].items():
-                    if (v, p) in self.ordered or\
-                            self.has_already_ordered(*(commit.viewNo, commit.ppSeqNo)):
-                        pToRemove.add(p)
-                        continue
-                    if (v == lastOrdered[0] and lastOrdered == (v, p - 1)) or \
-                            (v > lastOrdered[0] and self.isLowestCommitInView(commit)):
-                        self.logger.debug("{} ordering stashed commit {}".format(self, commit))
-                        if self.tryOrder(commit):
-                            lastOrdered = (v, p)
-                            pToRemove.add(p)
-
-                for p in pToRemove:
-                    del self.stashed_out_of_order_commits[v][p]
-                if not self.stashed_out_of_order_commits[v]:
-                    vToRemove.add(v)
-
-            for v in vToRemove:
-                del self.stashed_out_of_order_commits[v]
-
-            if not self.stashed_out_of_order_commits:
-                self.stopRepeating(self.process_stashed_out_of_order_commits)
-        else:
-            self.logger.debug('{} last_ordered_3pc if False. '
-                              'Len(stashed_out_of_order_commits) == {}'
-                              .format(self, len(self.stashed_out_of_order_commits)))
+                        "{} found commit {} from previous view {}"
+                        " that was not ordered but last ordered"
+                        " is {}".format(self, commit, v, lastOrdered))
+                elif (v, p) not in self.ordered and \
+                        not self.has_already_ordered(v, p):
+                    if not ((v == lastOrdered[0] and lastOrdered == (v, p - 1)) or
+                            (v > lastOrdered[0] and self.isLowestCommitInView(commit))):
+                        break
+                    self.logger.debug("{} ordering stashed commit {}".format(self, commit))
+                    if not self.tryOrder(commit):
+                        break
+                self._remove_stashed_out_of_order_commit(v, p)
+            heappop(keys)
+        self._last_ordered_changed = False
+
+    def _remove_stashed_out_of_order_commit(self, view_no, pp_seq_no):
+        commits = self.stashed_out_of_order_commits[view_no]
+        del commits[pp_seq_no]
+        if not commits:
+            del self.stashed_out_of_order_commits[view_no]
 
     def isLowestCommitInView(self, commit):
         view_no = commit.viewNo
@@ -1843,6 +2007,8 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
                                                  ts=self.get_current_time())
 
         self.addToOrdered(*key)
+        if self._batch_controller is not None:
+            self._batch_controller.on_batch_ordered(key, self.get_current_time())
         invalid_indices = invalid_index_serializer.deserialize(pp.discarded)
         invalid_reqIdr = []
         valid_reqIdr = []
@@ -1985,8 +2151,17 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             # watermarks
             self._caught_up_till_3pc((self.viewNo, stashed_checkpoint_ends[-1]))
 
+    def _checkpoint_end(self, pp_seq_no):
+        return math.ceil(pp_seq_no / self.config.CHK_FREQ) * self.config.CHK_FREQ
+
+    def _checkpoints_ending_at(self, end):
+        # Checkpoints are sorted by their ends which are multiples of
+        # CHK_FREQ, so the ones a batch belongs to are found by the end
+        # instead of scanning all checkpoints
+        return self.checkpoints.irange_key(end, end)
+
     def addToCheckpoint(self, ppSeqNo, digest, ledger_id, view_no):
-        for (s, e) in self.checkpoints.keys():
+        for (s, e) in self._checkpoints_ending_at(self._checkpoint_end(ppSeqNo)):
             if s <= ppSeqNo <= e:
                 state = self.checkpoints[s, e]  # type: CheckpointState
                 state.digests.append(digest)
@@ -1994,7 +2169,7 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
                 self.checkpoints[s, e] = state
                 break
         else:
-            s, e = ppSeqNo, math.ceil(ppSeqNo / self.config.CHK_FREQ) * self.config.CHK_FREQ
+            s, e = ppSeqNo, self._checkpoint_end(ppSeqNo)
             self.logger.debug("{} adding new checkpoint state for {}".format(self, (s, e)))
             state = CheckpointState(ppSeqNo, [digest, ], None, {}, False)
             self.checkpoints[s, e] = state
@@ -2025,20 +2200,18 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
         self.send(Checkpoint(self.instId, view_no, s, e, state.digest))
 
     def markCheckPointStable(self, seqNo):
-        previousCheckpoints = []
-        for (s, e), state in self.checkpoints.items():
-            if e == seqNo:
-                # TODO CheckpointState/Checkpoint is not a namedtuple anymore
-                # 1. check if updateNamedTuple works for the new message type
-                # 2. choose another name
-                state = updateNamedTuple(state, isStable=True)
-                self.checkpoints[s, e] = state
-                break
-            else:
-                previousCheckpoints.append((s, e))
+        for (s, e) in self._checkpoints_ending_at(seqNo):
+            # TODO CheckpointState/Checkpoint is not a namedtuple anymore
+            # 1. check if updateNamedTuple works for the new message type
+            # 2. choose another name
+            state = updateNamedTuple(self.checkpoints[s, e], isStable=True)
+            self.checkpoints[s, e] = state
+            break
         else:
             self.logger.debug("{} could not find {} in checkpoints".format(self, seqNo))
             return
+        previousCheckpoints = list(self.checkpoints.irange_key(
+            max_key=seqNo, inclusive=(True, False)))
         self.h = seqNo
         for k in previousCheckpoints:
             self.logger.trace("{} removing previous checkpoint {}".format(self, k))
@@ -2137,17 +2310,19 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
     def _gc(self, till3PCKey):
         self.logger.info("{} cleaning up till {}".format(self, till3PCKey))
         tpcKeys = set()
-        reqKeys = set()
-        for key3PC, pp in self.sentPrePrepares.items():
-            if compare_3PC_keys(till3PCKey, key3PC) <= 0:
-                tpcKeys.add(key3PC)
-                for reqKey in pp.reqIdr:
-                    reqKeys.add(reqKey)
-        for key3PC, pp in self.prePrepares.items():
-            if compare_3PC_keys(till3PCKey, key3PC) <= 0:
+        # Request keys with ledgers of their PRE-PREPAREs, which are the
+        # ledgers of request queues the requests were taken from
+        reqKeys = {}
+        for pre_prepares in (self.sentPrePrepares, self.prePrepares):
+            if not pre_prepares:
+                continue
+            # PRE-PREPAREs are sorted by 3PC key, so only ones to be cleaned
+            # are visited
+            for key3PC in list(pre_prepares.irange(maximum=tuple(till3PCKey))):
+                pp = pre_prepares.pop(key3PC)
                 tpcKeys.add(key3PC)
                 for reqKey in pp.reqIdr:
-                    reqKeys.add(reqKey)
+                    reqKeys[reqKey] = pp.ledgerId
 
         self.logger.trace("{} found {} 3-phase keys to clean".
                           format(self, len(tpcKeys)))
@@ -2155,8 +2330,6 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
                           format(self, len(reqKeys)))
 
         to_clean_up = (
-            self.sentPrePrepares,
-            self.prePrepares,
             self.prepares,
             self.commits,
             self.batches,
@@ -2165,15 +2338,21 @@ class Replica(HasActionQueue, MessageProcessor, HookManager):
             self.requested_commits,
             self.pre_prepares_stashed_for_incorrect_time,
         )
-        for request_key in tpcKeys:
-            for coll in to_clean_up:
-                coll.pop(request_key, None)
+        for coll in to_clean_up:
+            if not coll:
+                continue
+            if len(coll) <= len(tpcKeys):
+                for key3PC in [k for k in coll if k in tpcKeys]:
+                    del coll[key3PC]
+            else:
+                for key3PC in tpcKeys:
+                    coll.pop(key3PC, None)
 
-        for request_key in reqKeys:
+        for request_key, ledger_id in reqKeys.items():
             self.requests.free(request_key)
-            for ledger_id, keys in self.requestQueues.items():
-                if request_key in keys:
-                    self.discard_req_key(ledger_id, request_key)
+            keys = self.requestQueues.get(ledger_id)
+            if keys is not None and request_key in keys:
+                self.discard_req_key(ledger_id, request_key)
             self.logger.trace('{} freed request {} from previous checkpoints'
                               .format(self, request_key))
 
@@ -0,0 +1,106 @@
+import math
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from plenum.common.constants import BatchingObjective
+from plenum.common.util import compare_3PC_keys
+
+
+class BatchController:
+    """
+    Tunes size and wait time limits of 3PC batches created by a primary.
+
+    Arrival rate of requests is measured over windows of `window` seconds
+    and ordering latency as time from creating a batch to ordering it, both
+    averaged exponentially with `alpha`. For `BatchingObjective.THROUGHPUT`
+    a batch takes the requests arriving while a batch is ordered, so
+    batches grow with load instead of being sent half empty. For
+    `BatchingObjective.LATENCY` requests wait for a batch for the time
+    `target_latency` leaves after ordering, and a batch is sent as soon as
+    the requests expected in that time arrive. Either way light traffic
+    does not wait for requests which are not coming.
+
+    The tuned size only triggers sending a batch, a batch still takes up to
+    `max_batch_size` queued requests, so a burst following light traffic
+    is not split into tiny batches.
+    """
+
+    def __init__(self,
+                 objective: BatchingObjective,
+                 max_batch_size: int,
+                 max_batch_wait: float,
+                 min_batch_wait: float,
+                 target_latency: float,
+                 window: float,
+                 alpha: float,
+                 initial_time: float):
+        self.objective = objective
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.min_batch_wait = min_batch_wait
+        self.target_latency = target_latency
+        self.window = window
+        self.alpha = alpha
+
+        self.batch_size = max_batch_size
+        self.batch_wait = max_batch_wait
+
+        self.arrival_rate = None  # type: Optional[float]
+        self.latency = None  # type: Optional[float]
+        self._window_start = initial_time
+        self._arrivals = 0
+        # Creation times of batches not ordered yet in order of creation
+        self._created = OrderedDict()  # type: OrderedDict[Tuple[int, int], float]
+
+    def on_request(self):
+        self._arrivals += 1
+
+    def on_batch_created(self, key: Tuple[int, int], ts: float):
+        self._created[key] = ts
+
+    def on_batch_ordered(self, key: Tuple[int, int], ts: float):
+        # Batches created before the ordered one and not ordered yet were
+        # discarded by a view change
+        while self._created:
+            created_key = next(iter(self._created))
+            if compare_3PC_keys(created_key, key) < 0:
+                # The ordered batch was not created by this replica
+                return
+            created = self._created.pop(created_key)
+            if created_key == key:
+                self.latency = self._average(self.latency, ts - created)
+                return
+
+    def update(self, ts: float) -> bool:
+        """
+        Finishes the arrival rate measurement window if it is over and tunes
+        the limits
+
+        :return: whether the limits were tuned
+        """
+        elapsed = ts - self._window_start
+        if elapsed < self.window:
+            return False
+        self.arrival_rate = self._average(self.arrival_rate,
+                                          self._arrivals / elapsed)
+        self._window_start = ts
+        self._arrivals = 0
+        self._tune()
+        return True
+
+    def _tune(self):
+        if self.objective == BatchingObjective.THROUGHPUT:
+            if self.latency is None:
+                return
+            wait = self.latency
+        else:
+            wait = self.target_latency - (self.latency or 0)
+        self.batch_wait = min(max(wait, self.min_batch_wait),
+                              self.max_batch_wait)
+        size = math.ceil(self.arrival_rate * self.batch_wait)
+        self.batch_size = min(max(size, 1), self.max_batch_size)
+
+    def _average(self, average: Optional[float], value: float) -> float:
+        if average is None:
+            return value
+        return self.alpha * value + (1 - self.alpha) * average
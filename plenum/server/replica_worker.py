@@ -0,0 +1,593 @@
+"""
+Hosting of backup replicas in worker processes.
+
+Backup replicas only feed the Monitor, but all of them process 3PC messages
+in the event loop of the node. With `BACKUP_REPLICAS_IN_PROCESSES` each
+backup replica runs in a worker process of its own while the node keeps a
+`RemoteReplica` in its place. The `RemoteReplica` passes the replica its
+inbox messages, finalised requests, state of the node and calls made by the
+node over one queue, and takes messages the replica sends to the node and
+its state from another one. Both sides put lists of commands to the queues,
+a list per cycle, so the queues are not crossed for every message.
+
+In the worker the replica is a plain `Replica` running against `WorkerNode`,
+which holds the last state sent by the node and passes calls the replica
+makes to the node back to it. Backup replicas in workers differ from ones
+in the node process in that they:
+
+- neither sign nor verify BLS signatures, since BLS keys and pool state stay
+  in the node process and multi-signatures of backups are never used;
+- know that a request was already ordered only when the node tells them so
+  during view change, rather than by looking at the sequence number store;
+- do not take time of the last ordered batch from the timestamp store, so
+  the first PRE-PREPARE they create may be older than it;
+- do not answer MESSAGE_REQUESTs for their 3PC messages;
+- are not included in replica metrics of the node.
+"""
+
+import multiprocessing
+import pickle
+import sys
+import traceback
+from collections import deque, OrderedDict
+from queue import Empty
+from typing import Optional, List, Tuple, Any
+
+from plenum.bls.bls_bft_replica_null import BlsBftReplicaNull
+from plenum.common.exceptions import SuspiciousNode
+from plenum.common.messages.node_messages import Ordered
+from plenum.common.request import ReqKey
+from plenum.common.util import compare_3PC_keys, get_utc_epoch
+from plenum.server.propagator import Requests
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+# Commands sent to a worker
+MSG = 'msg'
+REQUEST = 'request'
+NODE_STATE = 'node_state'
+SEQ_NOS = 'seq_nos'
+SET = 'set'
+CALL = 'call'
+STOP = 'stop'
+
+# Commands sent by a worker, besides MSG
+REPLICA_STATE = 'replica_state'
+NODE_CALL = 'node_call'
+ERROR = 'error'
+
+# Calls the node makes on a backup replica which are passed to the worker
+FORWARDED_CALLS = (
+    'on_view_change_start',
+    'on_view_change_done',
+    'on_propagate_primary_done',
+    'on_catch_up_finished',
+    'primaryChanged',
+    'register_ledger',
+    'update_watermark_from_3pc',
+    'process_requested_pre_prepare',
+    'process_requested_prepare',
+    'process_requested_commit',
+)
+
+
+def _replica_class(digest_only: bool = False):
+    # Replica modules can be imported only after the node one, which is not
+    # imported yet when a worker process starts
+    import plenum.server.node
+    if digest_only:
+        from plenum.server.backup_replica import BackupReplica
+        return BackupReplica
+    from plenum.server.replica import Replica
+    return Replica
+
+
+def _node_state(node) -> dict:
+    return {
+        'viewNo': node.viewNo,
+        'f': node.f,
+        'quorums': node.quorums,
+        'ledger_ids': list(node.ledger_ids),
+        'isParticipating': node.isParticipating,
+        'is_synced': node.is_synced,
+        'view_change_in_progress': node.view_change_in_progress,
+        'connecteds': set(node.nodestack.connecteds),
+        'master_last_ordered_3pc': node.master_replica.last_ordered_3pc,
+    }
+
+
+def _replica_state(replica) -> dict:
+    return {
+        'last_ordered_3pc': replica.last_ordered_3pc,
+        'lastPrePrepareSeqNo': replica.lastPrePrepareSeqNo,
+        'h': replica.h,
+        'H': replica.H,
+    }
+
+
+def _config_values(config) -> dict:
+    """
+    Settings of the node which can be passed to a worker
+    """
+    values = {}
+    for name in dir(config):
+        if name.startswith('_'):
+            continue
+        value = getattr(config, name)
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        values[name] = value
+    return values
+
+
+class _Config:
+    def __init__(self, values: dict):
+        self.__dict__.update(values)
+
+
+class WorkerRequests(Requests):
+    """
+    Finalised requests of the replica in a worker. The replica is the only
+    one here, so a request is dropped once the replica frees it, and the
+    node is told about requests which the replica ordered or freed.
+    """
+
+    def __init__(self, node_calls: List):
+        super().__init__()
+        self._node_calls = node_calls
+        self.ledger_ids = {}
+
+    def add_finalised(self, request, ledger_id):
+        self.add(request)
+        self.set_finalised(request)
+        self.ledger_ids[request.key] = ledger_id
+
+    def ordered_by_replica(self, request_key):
+        if request_key in self:
+            self._node_calls.append(('ordered_by_replica', (request_key,)))
+
+    def free(self, request_key):
+        if self.pop(request_key, None) is not None:
+            self.ledger_ids.pop(request_key, None)
+            self._node_calls.append(('free', (request_key,)))
+
+
+class _SeqNoDB:
+    def __init__(self):
+        self.seq_nos = {}
+
+    def get(self, key):
+        return self.seq_nos.get(key, (None, None))
+
+
+class _ReqHandler:
+    ts_store = None
+
+
+class _ReqHandlers:
+    @staticmethod
+    def get(ledger_id):
+        return _ReqHandler()
+
+
+class _NodeStack:
+    def __init__(self):
+        self.connecteds = set()
+
+
+class _MasterReplica:
+    def __init__(self):
+        self.last_ordered_3pc = (0, 0)
+
+
+class WorkerNode:
+    """
+    Stands for the node in a worker process, holding the last state the
+    node sent and collecting calls to be made on the node
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.viewNo = 0
+        self.f = 0
+        self.quorums = None
+        self.ledger_ids = []
+        self.isParticipating = False
+        self.is_synced = False
+        self.view_change_in_progress = False
+        self.nodestack = _NodeStack()
+        self.master_replica = _MasterReplica()
+        self.seqNoDB = _SeqNoDB()
+        self.ledger_to_req_handler = _ReqHandlers()
+        self.calls = []
+        self.requests = WorkerRequests(self.calls)
+        self.last_sent_pp_store_helper = self
+
+    def update_state(self, state: dict):
+        self.nodestack.connecteds = state.pop('connecteds')
+        self.master_replica.last_ordered_3pc = \
+            state.pop('master_last_ordered_3pc')
+        self.__dict__.update(state)
+
+    @staticmethod
+    def utc_epoch() -> int:
+        return get_utc_epoch()
+
+    def ledger_id_for_request(self, request):
+        return self.requests.ledger_ids[request.key]
+
+    def request_propagates(self, req_keys):
+        self.calls.append(('request_propagates', (list(req_keys),)))
+
+    def request_msg(self, typ, params, frm=None):
+        self.calls.append(('request_msg', (typ, params, frm)))
+
+    def reportSuspiciousNodeEx(self, ex: SuspiciousNode):
+        self.calls.append(('reportSuspiciousNode',
+                           (ex.node, ex.reason, ex.code, ex.offendingMsg)))
+
+    def store_last_sent_pp_seq_no(self, inst_id, pp_seq_no):
+        self.calls.append(('store_last_sent_pp_seq_no', (inst_id, pp_seq_no)))
+
+
+class ReplicaWorker:
+    """
+    Runs a backup replica in a worker process until the node stops it
+    """
+
+    def __init__(self, node_name: str, inst_id: int, config_values: dict,
+                 node_state: dict, commands, results, idle_timeout: float):
+        self._commands = commands
+        self._results = results
+        self._idle_timeout = idle_timeout
+        self._last_command_no = 0
+        self._last_state = None
+        self.node = WorkerNode(node_name)
+        self.node.update_state(node_state)
+        config = _Config(config_values)
+        if config.DIGEST_ONLY_BACKUP_REPLICAS:
+            self.replica = _replica_class(digest_only=True)(
+                self.node, inst_id, config=config)
+        else:
+            self.replica = _replica_class()(
+                self.node, inst_id, config=config,
+                isMaster=False, bls_bft_replica=BlsBftReplicaNull())
+
+    def run(self):
+        try:
+            self._run()
+        except Exception:
+            # The node removes the replica once the worker is gone, so the
+            # error is passed to the node to be logged there as well
+            logger.exception('{} failed'.format(self.replica))
+            self._results.put([(ERROR, traceback.format_exc())])
+
+    def _run(self):
+        while True:
+            try:
+                commands = self._commands.get(timeout=self._idle_timeout)
+            except Empty:
+                commands = []
+            while True:
+                if not self._process(commands):
+                    return
+                try:
+                    commands = self._commands.get_nowait()
+                except Empty:
+                    break
+            self.replica.serviceQueues()
+            self._send_results()
+
+    def _process(self, commands) -> bool:
+        for command in commands:
+            self._last_command_no += 1
+            kind = command[0]
+            if kind == MSG:
+                self.replica.inBox.append(command[1])
+            elif kind == REQUEST:
+                self.node.requests.add_finalised(command[1], command[2])
+            elif kind == NODE_STATE:
+                self.node.update_state(command[1])
+            elif kind == SEQ_NOS:
+                self.node.seqNoDB.seq_nos = command[1]
+            elif kind == SET:
+                setattr(self.replica, command[1], command[2])
+            elif kind == CALL:
+                getattr(self.replica, command[1])(*command[2], **command[3])
+            elif kind == STOP:
+                return False
+            else:
+                logger.warning('{} got unknown command {}'
+                               .format(self.replica, command))
+        return True
+
+    def _send_results(self):
+        results = []
+        outbox = self.replica.outBox
+        while outbox:
+            results.append((MSG, outbox.popleft()))
+        results.extend((NODE_CALL, name, args)
+                       for name, args in self.node.calls)
+        self.node.calls.clear()
+        state = _replica_state(self.replica)
+        if state != self._last_state:
+            self._last_state = state
+            results.append((REPLICA_STATE, self._last_command_no, state))
+        if results:
+            self._results.put(results)
+
+
+def run_replica_worker(*args):
+    ReplicaWorker(*args).run()
+
+
+class RemoteReplica:
+    """
+    Takes place of a backup replica running in a worker process in the
+    node. Calls of the node changing the replica are passed to the worker,
+    while state the node reads is mirrored from the worker.
+
+    Once the worker process is gone nothing is passed to it anymore and
+    the replica is `failed`, so that the node removes it.
+    """
+
+    isMaster = False
+
+    def __init__(self, node, instId: int, config):
+        self.node = node
+        self.instId = instId
+        self.config = config
+        self.name = _replica_class().generateName(node.name, instId)
+        self.inBox = deque()
+        self.outBox = deque()
+        self.primaryNames = OrderedDict()
+        self._primaryName = None
+        self._last_ordered_3pc = (0, 0)
+        self._lastPrePrepareSeqNo = 0
+        self.h = 0
+        self.H = sys.maxsize
+        # Keys of requests forwarded to the replica and not freed by it
+        self._req_keys = set()
+        self._commands = []
+        self._command_no = 0
+        # Numbers of the last commands setting attributes of the replica
+        self._set_command_nos = {}
+        self._last_node_state = _node_state(node)
+        self._failed = False
+
+        ctx = multiprocessing.get_context('spawn')
+        self._to_worker = ctx.Queue()
+        self._from_worker = ctx.Queue()
+        self._process = ctx.Process(
+            target=run_replica_worker,
+            args=(node.name, instId, _config_values(config),
+                  dict(self._last_node_state), self._to_worker, self._from_worker,
+                  config.BACKUP_REPLICA_WORKER_IDLE_TIMEOUT),
+            name='{}-worker'.format(self.name),
+            daemon=True)
+        self._process.start()
+        logger.info('{} started worker process {}'
+                    .format(self, self._process.pid))
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def failed(self) -> bool:
+        if not self._failed and not self._process.is_alive():
+            self._failed = True
+            logger.error('{} worker process {} exited with code {}, '
+                         'the replica is to be removed'
+                         .format(self, self._process.pid, self._process.exitcode))
+        return self._failed
+
+    @property
+    def requests(self):
+        return self.node.requests
+
+    @property
+    def viewNo(self):
+        return self.node.viewNo
+
+    @property
+    def isPrimary(self):
+        return self._primaryName == self.name \
+            if self._primaryName is not None else None
+
+    @property
+    def hasPrimary(self):
+        return self._primaryName is not None
+
+    @property
+    def primaryName(self):
+        return self._primaryName
+
+    @primaryName.setter
+    def primaryName(self, value: Optional[str]):
+        self.primaryNames[self.viewNo] = value
+        self._primaryName = value
+        self._set('primaryName', value)
+
+    @property
+    def last_ordered_3pc(self) -> Tuple[int, int]:
+        return self._last_ordered_3pc
+
+    @last_ordered_3pc.setter
+    def last_ordered_3pc(self, key3PC):
+        self._last_ordered_3pc = key3PC
+        self._set('last_ordered_3pc', key3PC)
+
+    @property
+    def lastPrePrepareSeqNo(self):
+        return self._lastPrePrepareSeqNo
+
+    @lastPrePrepareSeqNo.setter
+    def lastPrePrepareSeqNo(self, n):
+        self._lastPrePrepareSeqNo = n
+        self._set('lastPrePrepareSeqNo', n)
+
+    def __getattr__(self, name):
+        if name in FORWARDED_CALLS:
+            return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+        raise AttributeError("'{}' object has no attribute '{}'"
+                             .format(type(self).__name__, name))
+
+    @property
+    def sentPrePrepares(self) -> dict:
+        # 3PC messages sent by the replica are kept in the worker
+        return {}
+
+    def get_sent_pre_prepare(self, view_no, pp_seq_no):
+        return None
+
+    def get_sent_prepare(self, view_no, pp_seq_no):
+        return None
+
+    def get_sent_commit(self, view_no, pp_seq_no):
+        return None
+
+    def primaryChanged(self, primaryName):
+        self.primaryName = primaryName
+        self._call('primaryChanged', primaryName)
+
+    def clear_requests_and_fix_last_ordered(self):
+        # Worker knows nothing about requests ordered by the master, so it is
+        # told sequence numbers of requests which the node has
+        seq_nos = {}
+        for key in self._req_keys:
+            ledger_id, seq_no = self.node.seqNoDB.get(key)
+            if seq_no is not None:
+                seq_nos[key] = (ledger_id, seq_no)
+        self._add_command(SEQ_NOS, seq_nos)
+        self._call('clear_requests_and_fix_last_ordered')
+
+    def serviceQueues(self, limit=None) -> int:
+        if self.failed:
+            # Results the worker sent before exiting are still taken
+            self.inBox.clear()
+            return self._receive()
+        count = 0
+        while self.inBox:
+            msg = self.inBox.popleft()
+            if isinstance(msg, ReqKey):
+                self._forward_request(msg)
+            self._add_command(MSG, msg)
+            count += 1
+        self._send_commands()
+        return count + self._receive()
+
+    def _remove_ordered_from_queue(self, last_caught_up_3PC=None) -> List[Ordered]:
+        self._receive()
+        removed = []
+        kept = deque()
+        for msg in self.outBox:
+            if isinstance(msg, Ordered) and \
+                    (not last_caught_up_3PC or
+                     compare_3PC_keys((msg.viewNo, msg.ppSeqNo), last_caught_up_3PC) >= 0):
+                removed.append(msg)
+            else:
+                kept.append(msg)
+        self.outBox = kept
+        return removed
+
+    def stop(self) -> set:
+        """
+        Stops the worker and returns keys of requests which were forwarded
+        to the replica and not freed by it
+        """
+        self._add_command(STOP)
+        self._send_commands()
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        logger.info('{} stopped worker process {}'
+                    .format(self, self._process.pid))
+        req_keys, self._req_keys = self._req_keys, set()
+        return req_keys
+
+    def _forward_request(self, req_key: ReqKey):
+        state = self.node.requests.get(req_key.digest)
+        if state is None or not state.finalised:
+            return
+        request = state.finalised
+        self._req_keys.add(request.key)
+        self._add_command(REQUEST, request,
+                          self.node.ledger_id_for_request(request))
+
+    def _set(self, name: str, value: Any):
+        self._add_command(SET, name, value)
+        self._set_command_nos[name] = self._command_no
+        self._send_commands()
+
+    def _call(self, name: str, *args, **kwargs):
+        self._add_command(CALL, name, args, kwargs)
+        self._send_commands()
+
+    def _add_command(self, *command):
+        if command[0] != NODE_STATE:
+            # Worker has to see the node as it was when the command was made
+            self._sync_node_state()
+        self._commands.append(command)
+        self._command_no += 1
+
+    def _sync_node_state(self):
+        state = _node_state(self.node)
+        if state != self._last_node_state:
+            self._last_node_state = state
+            self._add_command(NODE_STATE, dict(state))
+
+    def _send_commands(self):
+        if self.failed:
+            self._commands = []
+            return
+        self._sync_node_state()
+        if self._commands:
+            self._to_worker.put(self._commands)
+            self._commands = []
+
+    def _receive(self) -> int:
+        count = 0
+        while True:
+            try:
+                results = self._from_worker.get_nowait()
+            except Empty:
+                return count
+            for result in results:
+                count += 1
+                kind = result[0]
+                if kind == MSG:
+                    self.outBox.append(result[1])
+                elif kind == NODE_CALL:
+                    self._do_node_call(result[1], result[2])
+                elif kind == REPLICA_STATE:
+                    self._update_state(result[1], result[2])
+                elif kind == ERROR:
+                    logger.error('{} worker process failed: {}'
+                                 .format(self, result[1]))
+
+    def _update_state(self, command_no: int, state: dict):
+        # Values the node set after the worker took the state are newer
+        # than the ones in it
+        def take(name):
+            return self._set_command_nos.get(name, 0) <= command_no
+
+        if take('last_ordered_3pc'):
+            self._last_ordered_3pc = state['last_ordered_3pc']
+        if take('lastPrePrepareSeqNo'):
+            self._lastPrePrepareSeqNo = state['lastPrePrepareSeqNo']
+        self.h = state['h']
+        self.H = state['H']
+
+    def _do_node_call(self, name: str, args: tuple):
+        if name == 'ordered_by_replica':
+            self.node.requests.ordered_by_replica(*args)
+        elif name == 'free':
+            self._req_keys.discard(args[0])
+            self.node.requests.free(*args)
+        elif name == 'store_last_sent_pp_seq_no':
+            self.node.last_sent_pp_store_helper.store_last_sent_pp_seq_no(*args)
+        else:
+            getattr(self.node, name)(*args)
@@ -1,5 +1,5 @@
 from collections import deque
-from typing import Generator
+from typing import Generator, List
 
 from common.exceptions import PlenumTypeError
 from crypto.bls.bls_bft import BlsBft
@@ -10,7 +10,9 @@ from plenum.common.metrics_collector import MetricsCollector, NullMetricsCollect
 from plenum.common.request import ReqKey
 from plenum.common.util import SortedDict
 from plenum.server.monitor import Monitor
+from plenum.server.backup_replica import BackupReplica
 from plenum.server.replica import Replica
+from plenum.server.replica_worker import RemoteReplica
 from stp_core.common.log import getlogger
 
 logger = getlogger()
@@ -20,6 +22,7 @@ MASTER_REPLICA_INDEX = 0
 
 class Replicas:
     _replica_class = Replica
+    _backup_replica_class = BackupReplica
 
     def __init__(self, node, monitor: Monitor, config=None, metrics: MetricsCollector = NullMetricsCollector()):
         # passing full node because Replica requires it
@@ -29,13 +32,24 @@ class Replicas:
         self._config = config
         self._replicas = SortedDict()  # type: SortedDict[int, Replica]
         self._messages_to_replicas = dict()  # type: Dict[deque]
+        self._backup_replicas_in_processes = \
+            config is not None and config.BACKUP_REPLICAS_IN_PROCESSES
+        self._digest_only_backup_replicas = \
+            config is not None and config.DIGEST_ONLY_BACKUP_REPLICAS
         self.register_monitor_handler()
 
     def add_replica(self, instance_id) -> int:
         is_master = instance_id == 0
         description = "master" if is_master else "backup"
-        bls_bft = self._create_bls_bft_replica(is_master)
-        replica = self._new_replica(instance_id, is_master, bls_bft)
+        if not is_master and self._backup_replicas_in_processes:
+            replica = RemoteReplica(self._node, instance_id, self._config)
+            description = "backup in worker process"
+        elif not is_master and self._digest_only_backup_replicas:
+            replica = self._new_backup_replica(instance_id)
+            description = "digest-only backup"
+        else:
+            bls_bft = self._create_bls_bft_replica(is_master)
+            replica = self._new_replica(instance_id, is_master, bls_bft)
         self._replicas[instance_id] = replica
         self._messages_to_replicas[instance_id] = deque()
         self._monitor.addInstance(instance_id)
@@ -57,15 +71,18 @@ class Replicas:
         for msg in replica.inBox:
             if isinstance(msg, ReqKey):
                 req_keys.add(msg.digest)
-        for req_queue in replica.requestQueues.values():
-            for req_key in req_queue:
-                req_keys.add(req_key)
-        for pp in replica.sentPrePrepares.values():
-            for req_key in pp.reqIdr:
-                req_keys.add(req_key)
-        for pp in replica.prePrepares.values():
-            for req_key in pp.reqIdr:
-                req_keys.add(req_key)
+        if isinstance(replica, RemoteReplica):
+            req_keys.update(replica.stop())
+        else:
+            for req_queue in replica.requestQueues.values():
+                for req_key in req_queue:
+                    req_keys.add(req_key)
+            for pp in replica.sentPrePrepares.values():
+                for req_key in pp.reqIdr:
+                    req_keys.add(req_key)
+            for pp in replica.prePrepares.values():
+                for req_key in pp.reqIdr:
+                    req_keys.add(req_key)
 
         for req_key in req_keys:
             if req_key in replica.requests:
@@ -95,8 +112,17 @@ class Replicas:
     def service_inboxes(self, limit: int = None):
         number_of_processed_messages = \
             sum(replica.serviceQueues(limit) for replica in self._replicas.values())
+        self._remove_failed_remote_replicas()
         return number_of_processed_messages
 
+    def _remove_failed_remote_replicas(self):
+        if not self._backup_replicas_in_processes:
+            return
+        failed = [inst_id for inst_id, replica in self._replicas.items()
+                  if isinstance(replica, RemoteReplica) and replica.failed]
+        for inst_id in failed:
+            self.remove_replica(inst_id)
+
     def pass_message(self, message, instance_id=None):
         if instance_id is not None:
             if instance_id not in self._replicas.keys():
@@ -138,11 +164,31 @@ class Replicas:
         """
         return self._replica_class(self._node, instance_id, self._config, is_master, bls_bft, self._metrics)
 
+    def _new_backup_replica(self, instance_id: int) -> BackupReplica:
+        """
+        Create a new digest-only backup replica.
+        """
+        return self._backup_replica_class(self._node, instance_id,
+                                          self._config, self._metrics)
+
     def _create_bls_bft_replica(self, is_master):
         bls_factory = create_default_bls_bft_factory(self._node)
         bls_bft_replica = bls_factory.create_bls_bft_replica(is_master)
         return bls_bft_replica
 
+    def stop_remote_replicas(self):
+        for replica in self._replicas.values():
+            if isinstance(replica, RemoteReplica):
+                replica.stop()
+
+    @property
+    def local_replicas(self) -> List[Replica]:
+        """
+        Replicas running in the node process
+        """
+        return [r for r in self._replicas.values()
+                if not isinstance(r, RemoteReplica)]
+
     @property
     def num_replicas(self):
         return len(self._replicas)
@@ -113,11 +113,8 @@ class NodeHandler(WriteRequestHandler):
         return self.state_serializer.deserialize(data)
 
     def get_all_node_data_for_root_hash(self, root_hash):
-        leaves = self.state.get_all_leaves_for_root_hash(root_hash)
-        raw_node_data = leaves.values()
-        nodes = list(map(lambda x: self.state_serializer.deserialize(
-            self.state.get_decoded(x)), raw_node_data))
-        return nodes
+        for _, data in self.state.iter_leaves_for_root_hash(root_hash):
+            yield self.state_serializer.deserialize(data)
 
     def _is_steward(self, nym, is_committed: bool = True):
         domain_state = self.database_manager.get_database(DOMAIN_LEDGER_ID).state
@@ -128,8 +128,5 @@ class WriteRequestManager(RequestManager):
         return self.state_serializer.deserialize(data)
 
     def get_all_node_data_for_root_hash(self, root_hash):
-        leaves = self.pool_state.get_all_leaves_for_root_hash(root_hash)
-        raw_node_data = leaves.values()
-        nodes = list(map(lambda x: self.state_serializer.deserialize(
-            self.pool_state.get_decoded(x)), raw_node_data))
-        return nodes
+        for _, data in self.pool_state.iter_leaves_for_root_hash(root_hash):
+            yield self.state_serializer.deserialize(data)
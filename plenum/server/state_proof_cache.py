@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Any
+
+from crypto.bls.bls_multi_signature import MultiSignature
+
+StateProofCacheEntry = NamedTuple("StateProofCacheEntry", [
+    ("value", Optional[Any]),
+    ("proof", dict),
+    ("multi_sig", MultiSignature)])
+
+
+class StateProofCache:
+    """
+    LRU cache of state values together with their state proofs and
+    BLS multi-signatures for reads against the committed state root.
+
+    Both value and proof for a given (root_hash, key) pair never change since
+    the trie is content addressed, so the only thing the cache needs to care
+    about is a change of the committed root: entries are kept only for the
+    most recently seen root and are dropped as soon as a different root
+    is used.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._root_hash = None
+        self._entries = OrderedDict()
+
+    @property
+    def root_hash(self):
+        return self._root_hash
+
+    def get(self, root_hash, key) -> Optional[StateProofCacheEntry]:
+        if root_hash != self._root_hash:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, root_hash, key, entry: StateProofCacheEntry):
+        if self._max_size <= 0:
+            return
+        if root_hash != self._root_hash:
+            self.clear()
+            self._root_hash = root_hash
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self._root_hash = None
+
+    def __len__(self):
+        return len(self._entries)
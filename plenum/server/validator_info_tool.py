@@ -14,6 +14,7 @@ import datetime
 from ledger.genesis_txn.genesis_txn_file_util import genesis_txn_path
 from plenum.common.config_util import getConfig
 from storage.kv_store_rocksdb_int_keys import KeyValueStorageRocksdbIntKeys
+from plenum.server.replica_worker import RemoteReplica
 from stp_core.common.constants import ZMQ_NETWORK_PROTOCOL
 from stp_core.common.log import getlogger
 from pympler import muppy, summary, asizeof
@@ -425,10 +426,11 @@ class ValidatorNodeInfoTool:
             replica_stat["Primary"] = self._prepare_for_json(replica.primaryName)
             replica_stat["Watermarks"] = "{}:{}".format(replica.h, replica.H)
             replica_stat["Last_ordered_3PC"] = self._prepare_for_json(replica.last_ordered_3pc)
-            stashed_txns = {}
-            stashed_txns["Stashed_checkpoints"] = self._prepare_for_json(len(replica.stashedRecvdCheckpoints))
-            stashed_txns["Stashed_PrePrepare"] = self._prepare_for_json(len(replica.prePreparesPendingPrevPP))
-            replica_stat["Stashed_txns"] = stashed_txns
+            if not isinstance(replica, RemoteReplica):
+                stashed_txns = {}
+                stashed_txns["Stashed_checkpoints"] = self._prepare_for_json(len(replica.stashedRecvdCheckpoints))
+                stashed_txns["Stashed_PrePrepare"] = self._prepare_for_json(len(replica.prePreparesPendingPrevPP))
+                replica_stat["Stashed_txns"] = stashed_txns
             res[replica.name] = self._prepare_for_json(replica_stat)
         return res
 
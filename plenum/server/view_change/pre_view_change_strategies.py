@@ -4,7 +4,7 @@ from functools import partial
 
 from plenum.common.constants import VIEW_CHANGE_START, PreVCStrategies, VIEW_CHANGE_CONTINUE
 from plenum.common.messages.node_messages import ViewChangeStartMessage, ViewChangeContinueMessage, PrePrepare, Prepare, \
-    Commit, Ordered
+    Commit, Ordered, AggregatedPrepare, AggregatedCommit
 from stp_zmq.zstack import Quota
 from stp_core.common.log import getlogger
 
@@ -64,7 +64,8 @@ class VCStartMsgStrategy(PreViewChangeStrategy):
     async def _process_node_inbox_3PC(node):
         current_view_no = node.viewNo
         stashed_not_3PC = deque()
-        types_3PC = (PrePrepare, Prepare, Commit, Ordered)
+        types_3PC = (PrePrepare, Prepare, Commit, Ordered,
+                     AggregatedPrepare, AggregatedCommit)
         while node.nodeInBox:
             m = node.nodeInBox.popleft()
             if len(m) == 2 and isinstance(m[0], types_3PC) and \
@@ -0,0 +1,158 @@
+import pytest
+
+from plenum.bls.bls_bft_replica_null import BlsBftReplicaNull
+from plenum.common.constants import BatchingObjective, DOMAIN_LEDGER_ID
+from plenum.common.messages.node_messages import PrePrepare
+from plenum.common.request import ReqKey
+from plenum.server.replica import Replica
+from plenum.server.replica_batch_controller import BatchController
+from plenum.test.helper import MockTimestamp
+from plenum.test.replica.helper import fake_node, add_request
+
+MAX_BATCH_SIZE = 100
+MAX_BATCH_WAIT = 1
+MIN_BATCH_WAIT = 0.01
+TARGET_LATENCY = 0.5
+WINDOW = 1
+
+
+def batch_controller(objective):
+    return BatchController(objective=objective,
+                           max_batch_size=MAX_BATCH_SIZE,
+                           max_batch_wait=MAX_BATCH_WAIT,
+                           min_batch_wait=MIN_BATCH_WAIT,
+                           target_latency=TARGET_LATENCY,
+                           window=WINDOW,
+                           alpha=1,
+                           initial_time=0)
+
+
+def receive_requests(controller, count):
+    for _ in range(count):
+        controller.on_request()
+
+
+def test_limits_are_not_tuned_within_window():
+    controller = batch_controller(BatchingObjective.LATENCY)
+    receive_requests(controller, 10)
+
+    assert not controller.update(WINDOW / 2)
+    assert controller.batch_size == MAX_BATCH_SIZE
+    assert controller.batch_wait == MAX_BATCH_WAIT
+
+
+def test_light_traffic_is_not_kept_waiting_for_latency():
+    controller = batch_controller(BatchingObjective.LATENCY)
+    receive_requests(controller, 2)
+
+    assert controller.update(WINDOW)
+    assert controller.arrival_rate == 2
+    assert controller.batch_wait == TARGET_LATENCY
+    assert controller.batch_size == 1
+
+
+def test_batch_wait_leaves_target_latency_after_ordering():
+    controller = batch_controller(BatchingObjective.LATENCY)
+    controller.on_batch_created((0, 1), 0)
+    controller.on_batch_ordered((0, 1), 0.2)
+    receive_requests(controller, 50)
+
+    controller.update(WINDOW)
+    assert controller.latency == 0.2
+    assert controller.batch_wait == pytest.approx(TARGET_LATENCY - 0.2)
+    assert controller.batch_size == 15
+
+    controller.on_batch_created((0, 2), WINDOW)
+    controller.on_batch_ordered((0, 2), WINDOW + 2)
+    controller.update(2 * WINDOW)
+    assert controller.batch_wait == MIN_BATCH_WAIT
+
+
+def test_batches_grow_with_load_for_throughput():
+    controller = batch_controller(BatchingObjective.THROUGHPUT)
+    receive_requests(controller, 50)
+
+    # Limits are not tuned until ordering latency is known
+    controller.update(WINDOW)
+    assert controller.batch_size == MAX_BATCH_SIZE
+
+    controller.on_batch_created((0, 1), WINDOW)
+    controller.on_batch_ordered((0, 1), WINDOW + 0.5)
+    receive_requests(controller, 50)
+    controller.update(2 * WINDOW)
+    assert controller.batch_wait == 0.5
+    assert controller.batch_size == 25
+
+    receive_requests(controller, 1000)
+    controller.update(3 * WINDOW)
+    assert controller.batch_size == MAX_BATCH_SIZE
+
+
+def test_latency_is_measured_for_batches_created_by_controller_replica():
+    controller = batch_controller(BatchingObjective.THROUGHPUT)
+    controller.on_batch_created((0, 1), 0)
+    controller.on_batch_created((0, 2), 1)
+    controller.on_batch_created((1, 1), 2)
+
+    # Batch which was not created by the replica
+    controller.on_batch_ordered((0, 0), 3)
+    assert controller.latency is None
+
+    # Batch (0, 1) was discarded
+    controller.on_batch_ordered((0, 2), 3)
+    assert controller.latency == 2
+
+    controller.on_batch_ordered((1, 1), 3)
+    assert controller.latency == 1
+
+
+@pytest.fixture
+def adaptive_tconf(tconf):
+    old = (tconf.ADAPTIVE_3PC_BATCHING, tconf.ADAPTIVE_3PC_BATCH_OBJECTIVE)
+    tconf.ADAPTIVE_3PC_BATCHING = True
+    tconf.ADAPTIVE_3PC_BATCH_OBJECTIVE = BatchingObjective.LATENCY
+    yield tconf
+    tconf.ADAPTIVE_3PC_BATCHING, tconf.ADAPTIVE_3PC_BATCH_OBJECTIVE = old
+
+
+def test_primary_sends_batch_of_light_traffic_without_waiting(adaptive_tconf):
+    timestamp = MockTimestamp(0)
+    primary = Replica(fake_node('Alpha'), 1, config=adaptive_tconf,
+                      bls_bft_replica=BlsBftReplicaNull(),
+                      get_current_time=timestamp)
+    primary.primaryName = primary.name
+
+    primary.readyFor3PC(ReqKey(add_request(primary.node).key))
+    timestamp.value = adaptive_tconf.ADAPTIVE_3PC_BATCH_WINDOW
+    primary.send_3pc_batch()
+    assert len([m for m in primary.outBox if isinstance(m, PrePrepare)]) == 1
+    assert primary.full_3pc_batch_size == 1
+
+    # Next batch is sent once a request arrives
+    primary.readyFor3PC(ReqKey(add_request(primary.node).key))
+    primary.send_3pc_batch()
+    assert len([m for m in primary.outBox if isinstance(m, PrePrepare)]) == 2
+    assert not primary.requestQueues[DOMAIN_LEDGER_ID]
+
+
+def test_burst_after_light_traffic_is_not_split_into_tiny_batches(adaptive_tconf):
+    timestamp = MockTimestamp(0)
+    primary = Replica(fake_node('Alpha'), 1, config=adaptive_tconf,
+                      bls_bft_replica=BlsBftReplicaNull(),
+                      get_current_time=timestamp)
+    primary.primaryName = primary.name
+
+    primary.readyFor3PC(ReqKey(add_request(primary.node).key))
+    timestamp.value = adaptive_tconf.ADAPTIVE_3PC_BATCH_WINDOW
+    primary.send_3pc_batch()
+    assert primary.full_3pc_batch_size == 1
+
+    burst = 10
+    for _ in range(burst):
+        primary.readyFor3PC(ReqKey(add_request(primary.node).key))
+    primary.send_3pc_batch()
+
+    pre_prepares = [m for m in primary.outBox if isinstance(m, PrePrepare)]
+    assert len(pre_prepares) == 2
+    assert len(pre_prepares[-1].reqIdr) == burst
+    assert not primary.requestQueues[DOMAIN_LEDGER_ID]
@@ -0,0 +1,40 @@
+import pytest
+
+from plenum.common.binary_batch import pack_binary_batch, \
+    unpack_binary_batch, is_binary_batch, binary_batch_len, BINARY_BATCH_PREFIX
+from plenum.common.exceptions import InvalidBinaryBatchException
+from stp_zmq.zstack import ZStack
+
+
+@pytest.mark.parametrize('msgs', [
+    [],
+    [b''],
+    [b'pi', b'po'],
+    [b'{"op": "PREPARE", "digest": "\\"escaped\\""}', b'\x00\xff' * 300],
+])
+def test_pack_unpack(msgs):
+    batch = pack_binary_batch(msgs)
+    assert is_binary_batch(batch)
+    assert len(batch) == binary_batch_len(msgs)
+    assert unpack_binary_batch(batch) == msgs
+
+
+@pytest.mark.parametrize('msg', [
+    ZStack.serializeMsg({'op': 'PREPARE'}),
+    ZStack.serializeMsg('some message'),
+    ZStack.pingMessage.encode(),
+    b'',
+])
+def test_other_messages_are_not_binary_batches(msg):
+    assert not is_binary_batch(msg)
+
+
+@pytest.mark.parametrize('batch', [
+    b'{"op": "BATCH"}',
+    BINARY_BATCH_PREFIX + b'\x00\x00',
+    BINARY_BATCH_PREFIX + b'\x00\x00\x00\x05abcd',
+    pack_binary_batch([b'abc', b'def'])[:-1],
+])
+def test_unpack_malformed_batch(batch):
+    with pytest.raises(InvalidBinaryBatchException):
+        unpack_binary_batch(batch)
@@ -0,0 +1,73 @@
+import pytest
+
+from plenum.common.messages.node_messages import CatchupRep, InstanceChange
+from plenum.common.outbox import Outbox, OutboxLane, message_lane
+from plenum.common.constants import OP_FIELD_NAME, COMMIT, PREPARE, \
+    PROPAGATE, MESSAGE_RESPONSE
+
+
+@pytest.mark.parametrize('msg, lane', [
+    ('pi', OutboxLane.CONSENSUS),
+    ({OP_FIELD_NAME: COMMIT}, OutboxLane.CONSENSUS),
+    ({OP_FIELD_NAME: PREPARE}, OutboxLane.CONSENSUS),
+    (InstanceChange(1, 25), OutboxLane.VIEW_CHANGE),
+    ({OP_FIELD_NAME: PROPAGATE}, OutboxLane.PROPAGATE),
+    ({OP_FIELD_NAME: 'UNKNOWN'}, OutboxLane.PROPAGATE),
+    (CatchupRep(1, {}, []), OutboxLane.CATCHUP),
+    ({OP_FIELD_NAME: MESSAGE_RESPONSE}, OutboxLane.CATCHUP),
+])
+def test_message_lane(msg, lane):
+    assert message_lane(msg) == lane
+
+
+def fill(outbox, lane, count, size=10):
+    msgs = [(bytes([lane]) + b'%d' % i).ljust(size, b'-') for i in range(count)]
+    for msg in msgs:
+        outbox.append(msg, lane)
+    return msgs
+
+
+def test_drain_higher_lanes_first():
+    outbox = Outbox()
+    catchup = fill(outbox, OutboxLane.CATCHUP, 2)
+    propagate = fill(outbox, OutboxLane.PROPAGATE, 2)
+    consensus = fill(outbox, OutboxLane.CONSENSUS, 2)
+
+    assert len(outbox) == 6
+    assert outbox.drain(size_limit=1000, weights=(8, 4, 2, 1)) == \
+        consensus + propagate + catchup
+    assert not outbox
+
+
+def test_drain_without_limit():
+    outbox = Outbox()
+    catchup = fill(outbox, OutboxLane.CATCHUP, 100)
+    consensus = fill(outbox, OutboxLane.CONSENSUS, 100)
+    assert outbox.drain() == consensus + catchup
+    assert not outbox
+
+
+def test_drain_shares_limit_by_weights():
+    outbox = Outbox()
+    consensus = fill(outbox, OutboxLane.CONSENSUS, 100)
+    view_change = fill(outbox, OutboxLane.VIEW_CHANGE, 100)
+    catchup = fill(outbox, OutboxLane.CATCHUP, 100)
+
+    # Non-empty lanes get 8/13, 4/13 and 1/13 of the limit, the rest goes
+    # to lanes in order of priority
+    msgs = outbox.drain(size_limit=200, weights=(8, 4, 2, 1))
+    assert msgs == consensus[:13] + view_change[:6] + catchup[:1]
+    assert len(outbox) == 280
+
+    # Remaining messages are drained in the same order
+    msgs = outbox.drain(size_limit=10000, weights=(8, 4, 2, 1))
+    assert msgs == consensus[13:] + view_change[6:] + catchup[1:]
+
+
+def test_drain_takes_message_from_every_lane():
+    outbox = Outbox()
+    consensus = fill(outbox, OutboxLane.CONSENSUS, 10, size=100)
+    catchup = fill(outbox, OutboxLane.CATCHUP, 10, size=100)
+
+    msgs = outbox.drain(size_limit=150, weights=(8, 4, 2, 1))
+    assert msgs == consensus[:1] + catchup[:1]
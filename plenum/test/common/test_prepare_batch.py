@@ -35,7 +35,6 @@ def test_total_len_excesses_limit_two_batches():
     assert len(split_ut(msgs)) == 2
 
 
-
 def test_small_msgs_with_one_huge_more_than_one_batch():
     msgs = [b'1', b'1', b'1', b'1' * MAX_ONE_MSG_LEN, b'1']
     assert len(split_ut(msgs)) == 3
@@ -90,3 +89,33 @@ def test_batch_size_limitations():
     for r in res:
         batch, length = r
         assert len(batch) <= msg_limit
+
+
+def test_batches_are_as_large_as_possible():
+    msg_limit = 200
+    msgs = [{1: randomString(i % 17 + 1)} for i in range(300)]
+    res = split_messages_on_batches(list(msgs), json.dumps, lambda l: l <= msg_limit)
+
+    assert sum(size for _, size in res) == len(msgs)
+    start = 0
+    for batch, size in res:
+        assert batch == json.dumps(msgs[start:start + size])
+        assert len(batch) <= msg_limit
+        if start + size < len(msgs):
+            assert len(json.dumps(msgs[start:start + size + 1])) > msg_limit
+        start += size
+
+
+def test_split_messages_on_batches_is_not_quadratic():
+    calls = []
+
+    def make_batch(msgs):
+        calls.append(len(msgs))
+        return make_batch_func(msgs)
+
+    msgs = [b'1'] * 10000
+    res = split_messages_on_batches(msgs, make_batch,
+                                    lambda l: l <= 10 * LEN_LIMIT_BYTES)
+    assert sum(size for _, size in res) == len(msgs)
+    # Every message is serialized once alone and a few times in its batch
+    assert sum(calls) < 5 * len(msgs)
@@ -11,7 +11,10 @@ def message_size_limit():
 
 @pytest.fixture()
 def batched(message_size_limit):
-    b = Batched(FakeSomething(MSG_LEN_LIMIT=message_size_limit))
+    b = Batched(FakeSomething(MSG_LEN_LIMIT=message_size_limit,
+                              ENABLE_BINARY_BATCHES=False,
+                              OUTBOX_FLUSH_SIZE=None,
+                              OUTBOX_LANE_WEIGHTS=None))
     b.sign_and_serialize = lambda msg, signer: msg
     return b
 
@@ -0,0 +1,28 @@
+import pytest
+from plenum.common.messages.node_messages import AggregatedCommit
+from collections import OrderedDict
+from plenum.common.messages.fields import NonNegativeNumberField, \
+    IterableField
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("instId", NonNegativeNumberField),
+    ("viewNo", NonNegativeNumberField),
+    ("ppSeqNo", NonNegativeNumberField),
+    ("digests", IterableField),
+    ("blsSigs", IterableField),
+])
+
+
+def test_hash_expected_type():
+    assert AggregatedCommit.typename == "AGGREGATED_COMMIT"
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(AggregatedCommit.schema).keys()
+    assert list(actual_field_names) == list(EXPECTED_ORDERED_FIELDS.keys())
+
+
+def test_has_expected_validators():
+    schema = dict(AggregatedCommit.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
@@ -0,0 +1,30 @@
+import pytest
+from plenum.common.messages.node_messages import AggregatedPrepare
+from collections import OrderedDict
+from plenum.common.messages.fields import NonNegativeNumberField, \
+    IterableField
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("instId", NonNegativeNumberField),
+    ("viewNo", NonNegativeNumberField),
+    ("ppSeqNo", NonNegativeNumberField),
+    ("ppTimes", IterableField),
+    ("digests", IterableField),
+    ("stateRootHashes", IterableField),
+    ("txnRootHashes", IterableField),
+])
+
+
+def test_hash_expected_type():
+    assert AggregatedPrepare.typename == "AGGREGATED_PREPARE"
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(AggregatedPrepare.schema).keys()
+    assert list(actual_field_names) == list(EXPECTED_ORDERED_FIELDS.keys())
+
+
+def test_has_expected_validators():
+    schema = dict(AggregatedPrepare.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
@@ -7,8 +7,8 @@ from plenum.common.messages.node_messages import Batch
 
 EXPECTED_ORDERED_FIELDS = OrderedDict([
     ("messages", IterableField),
-    ("signature", SignatureField)
-
+    ("signature", SignatureField),
+    ("features", IterableField),
 ])
 
 
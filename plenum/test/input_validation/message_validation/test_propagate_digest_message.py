@@ -0,0 +1,23 @@
+from collections import OrderedDict
+from plenum.common.messages.fields import LimitedLengthStringField
+from plenum.common.messages.node_messages import PropagateDigest
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("digest", LimitedLengthStringField),
+    ("senderClient", LimitedLengthStringField),
+])
+
+
+def test_hash_expected_type():
+    assert PropagateDigest.typename == "PROPAGATE_DIGEST"
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(PropagateDigest.schema).keys()
+    assert list(actual_field_names) == list(EXPECTED_ORDERED_FIELDS.keys())
+
+
+def test_has_expected_validators():
+    schema = dict(PropagateDigest.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
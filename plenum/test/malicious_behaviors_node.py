@@ -99,6 +99,7 @@ def sendDuplicate3PhaseMsg(
         logger.debug("EVIL: Sending duplicate pre-prepare message: {}".
                      format(ppReq))
         self.sentPrePrepares[self.viewNo, self.lastPrePrepareSeqNo] = ppReq
+        self._add_unordered_3pc_key((self.viewNo, self.lastPrePrepareSeqNo))
         sendDup(self, ppReq, TPCStat.PrePrepareSent, count)
 
     def evilSendPrepare(self, ppReq: PrePrepare):
@@ -171,6 +172,7 @@ def send3PhaseMsgWithIncorrectDigest(node: TestNode, msgType: ThreePhaseMsg,
                      format(ppReq))
         ppReq = updateNamedTuple(ppReq, digest=ppReq.digest + 'random')
         self.sentPrePrepares[self.viewNo, self.lastPrePrepareSeqNo] = ppReq
+        self._add_unordered_3pc_key((self.viewNo, self.lastPrePrepareSeqNo))
         self.send(ppReq, TPCStat.PrePrepareSent)
 
     def evilSendPrepare(self, ppReq):
@@ -42,6 +42,16 @@ def test_kv_store_metrics_config(looper, txnPoolNodeSet, tdir, tconf, sdk_pool_h
             MetricsName.CATCHUP_TXNS_SENT,
             MetricsName.CATCHUP_TXNS_RECEIVED,
 
+            # No messages large enough to be compressed are sent in this test
+            MetricsName.OUTGOING_NODE_MESSAGE_COMPRESSION_RATIO,
+
+            # Adaptive 3PC batching is off in this test
+            MetricsName.THREE_PC_BATCH_SIZE_LIMIT,
+            MetricsName.THREE_PC_BATCH_WAIT_LIMIT,
+
+            # Digest-only propagates are off in this test
+            MetricsName.PROCESS_PROPAGATE_DIGEST_TIME,
+
             MetricsName.GC_UNCOLLECTABLE_OBJECTS,
             MetricsName.GC_GEN2_COLLECTED_OBJECTS,
 
@@ -55,6 +65,11 @@ def test_kv_store_metrics_config(looper, txnPoolNodeSet, tdir, tconf, sdk_pool_h
             MetricsName.NODE_CHECK_NODE_REQUEST_SPIKE,
             MetricsName.NODE_SEND_REJECT_TIME,
 
+            # No read requests with state proofs are sent in this test
+            MetricsName.STATE_PROOF_CACHE_HIT,
+            MetricsName.STATE_PROOF_CACHE_SIZE,
+            MetricsName.GENERATE_STATE_PROOF_TIME,
+
             # Obsolete metrics
             MetricsName.DESERIALIZE_DURING_UNPACK_TIME,
 
@@ -1,12 +1,15 @@
 import pytest
 
-from plenum.server.quota_control import QuotaControl, StaticQuotaControl, RequestQueueQuotaControl
+from plenum.server.quota_control import QuotaControl, StaticQuotaControl, RequestQueueQuotaControl, \
+    AdaptiveQuotaControl
 from stp_zmq.zstack import Quota
 
 MAX_REQUEST_QUEUE_SIZE = 1000
 MAX_NODE_QUOTA = Quota(count=100, size=1024 * 1024)
 MAX_CLIENT_QUOTA = Quota(count=100, size=1024 * 1024)
 ZERO_QUOTA = Quota(count=0, size=0)
+LATENCY_BUDGET = 0.1
+MAX_REPLICA_INBOX_SIZE = 5000
 
 
 @pytest.fixture()
@@ -21,6 +24,29 @@ def request_queue_qc():
                                     max_client_quota=MAX_CLIENT_QUOTA)
 
 
+@pytest.fixture()
+def adaptive_qc():
+    return AdaptiveQuotaControl(node_quota=MAX_NODE_QUOTA,
+                                client_quota=MAX_CLIENT_QUOTA,
+                                latency_budget=LATENCY_BUDGET,
+                                max_replica_inbox_size=MAX_REPLICA_INBOX_SIZE,
+                                max_request_queue_size=MAX_REQUEST_QUEUE_SIZE,
+                                min_ratio=0.1,
+                                max_ratio=4.0)
+
+
+def scaled(quota, ratio):
+    return Quota(count=int(quota.count * ratio), size=int(quota.size * ratio))
+
+
+def fast_run(**kwargs):
+    return dict(looper_run_time=LATENCY_BUDGET / 2, **kwargs)
+
+
+def slow_run(**kwargs):
+    return dict(looper_run_time=LATENCY_BUDGET * 2, **kwargs)
+
+
 def test_static_quota_control_gives_maximum_quotas_initially(static_qc):
     assert static_qc.node_quota == MAX_NODE_QUOTA
     assert static_qc.client_quota == MAX_CLIENT_QUOTA
@@ -54,3 +80,57 @@ def test_request_queue_quota_control_restores_client_quotas_when_request_queue_s
     request_queue_qc.update_state({'request_queue_size': MAX_REQUEST_QUEUE_SIZE - 1})
     assert request_queue_qc.node_quota == MAX_NODE_QUOTA
     assert request_queue_qc.client_quota == MAX_CLIENT_QUOTA
+
+
+def test_adaptive_quota_control_gives_base_quotas_initially(adaptive_qc):
+    assert adaptive_qc.node_quota == MAX_NODE_QUOTA
+    assert adaptive_qc.client_quota == MAX_CLIENT_QUOTA
+
+
+def test_adaptive_quota_control_increases_quotas_while_within_latency_budget(adaptive_qc):
+    for _ in range(10):
+        adaptive_qc.update_state(fast_run())
+    assert adaptive_qc.node_quota == scaled(MAX_NODE_QUOTA, 2)
+    assert adaptive_qc.client_quota == scaled(MAX_CLIENT_QUOTA, 2)
+
+    for _ in range(100):
+        adaptive_qc.update_state(fast_run())
+    assert adaptive_qc.node_quota == scaled(MAX_NODE_QUOTA, 4)
+    assert adaptive_qc.client_quota == scaled(MAX_CLIENT_QUOTA, 4)
+
+
+def test_adaptive_quota_control_decreases_client_quota_when_over_latency_budget(adaptive_qc):
+    adaptive_qc.update_state(slow_run())
+    assert adaptive_qc.node_quota == MAX_NODE_QUOTA
+    assert adaptive_qc.client_quota == scaled(MAX_CLIENT_QUOTA, 0.5)
+
+    for _ in range(10):
+        adaptive_qc.update_state(slow_run())
+    assert adaptive_qc.node_quota == MAX_NODE_QUOTA
+    assert adaptive_qc.client_quota == scaled(MAX_CLIENT_QUOTA, 0.1)
+
+    adaptive_qc.update_state(fast_run())
+    assert adaptive_qc.client_quota == scaled(MAX_CLIENT_QUOTA, 0.2)
+
+
+def test_adaptive_quota_control_decreases_node_quota_when_replicas_are_overloaded(adaptive_qc):
+    adaptive_qc.update_state(fast_run(replica_inbox_size=MAX_REPLICA_INBOX_SIZE))
+    assert adaptive_qc.node_quota == scaled(MAX_NODE_QUOTA, 0.5)
+    assert adaptive_qc.client_quota == scaled(MAX_CLIENT_QUOTA, 0.5)
+
+    adaptive_qc.update_state(fast_run(replica_inbox_size=MAX_REPLICA_INBOX_SIZE - 1))
+    assert adaptive_qc.node_quota == scaled(MAX_NODE_QUOTA, 0.6)
+
+
+def test_adaptive_quota_control_does_not_increase_client_quota_with_many_unordered_requests(adaptive_qc):
+    adaptive_qc.update_state(fast_run(request_queue_size=MAX_REQUEST_QUEUE_SIZE // 2))
+    assert adaptive_qc.node_quota == scaled(MAX_NODE_QUOTA, 1.1)
+    assert adaptive_qc.client_quota == MAX_CLIENT_QUOTA
+
+
+def test_adaptive_quota_control_gives_no_quota_for_client_when_queue_size_reaches_limit(adaptive_qc):
+    adaptive_qc.update_state(fast_run(request_queue_size=MAX_REQUEST_QUEUE_SIZE))
+    assert adaptive_qc.client_quota == ZERO_QUOTA
+
+    adaptive_qc.update_state(fast_run(request_queue_size=MAX_REQUEST_QUEUE_SIZE - 1))
+    assert adaptive_qc.client_quota == MAX_CLIENT_QUOTA
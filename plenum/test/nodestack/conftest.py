@@ -0,0 +1,45 @@
+from copy import copy
+
+import pytest
+
+from plenum.common.stacks import nodeStackClass
+from plenum.test.nodestack.helper import exchange
+from stp_core.network.auth_mode import AuthMode
+from stp_core.network.port_dispenser import genHa
+from stp_core.test.helper import Printer, connectStack
+from stp_zmq.test.helper import genKeys
+
+
+@pytest.fixture()
+def registry():
+    return {
+        'Alpha': genHa(),
+        'Beta': genHa(),
+    }
+
+
+@pytest.fixture(scope="function")
+def stacks(tdir, registry, looper):
+    genKeys(tdir, registry.keys())
+    stacks = []
+    for name, ha in registry.items():
+        printer = Printer(name)
+        stackParams = dict(name=name, ha=ha, basedirpath=tdir,
+                           auth_mode=AuthMode.RESTRICTED.value)
+        reg = copy(registry)
+        reg.pop(name)
+        stack = nodeStackClass(stackParams, printer.print, reg)
+        stack.printer = printer
+        stack.start()
+        stacks.append(stack)
+
+    for a in stacks:
+        for b in stacks:
+            if a is not b:
+                connectStack(a, b)
+    looper.runFor(1)
+    exchange(looper, *stacks)
+    exchange(looper, *stacks)
+    yield stacks
+    for stack in stacks:
+        stack.stop()
@@ -0,0 +1,38 @@
+from plenum.common.constants import OP_FIELD_NAME, BATCH
+from plenum.common.types import f
+
+
+def exchange(looper, *stacks):
+    for stack in stacks:
+        stack.flushOutBoxes()
+    looper.runFor(0.5)
+    for stack in stacks:
+        looper.run(stack.service())
+
+
+def send_msgs(sender, receiver, count):
+    for i in range(count):
+        sender.send({'op': 'TEST', 'data': 'msg "{}"'.format(i)}, receiver.name)
+
+
+def received_msgs(stack):
+    msgs = []
+    for m, _ in stack.printer.printeds:
+        if m[OP_FIELD_NAME] == BATCH:
+            msgs.extend(stack.deserializeMsg(i) for i in m[f.MSGS.nm])
+        else:
+            msgs.append(m)
+    stack.printer.reset()
+    return msgs
+
+
+def sent_payloads(stack):
+    payloads = []
+    transmit = stack.transmit
+
+    def patched_transmit(msg, uid, timeout=None, serialized=False):
+        payloads.append(msg)
+        return transmit(msg, uid, timeout=timeout, serialized=serialized)
+
+    stack.transmit = patched_transmit
+    return payloads
@@ -0,0 +1,95 @@
+from plenum.common.binary_batch import is_binary_batch, BINARY_BATCH_FEATURE
+from plenum.common.constants import OP_FIELD_NAME, BATCH
+from plenum.common.types import f
+from plenum.test.nodestack.helper import exchange, send_msgs, \
+    received_msgs, sent_payloads
+
+
+def test_binary_batches_are_negotiated(looper, stacks):
+    a, b = stacks
+    a_payloads = sent_payloads(a)
+    b_payloads = sent_payloads(b)
+
+    # JSON batch advertises support of binary batches
+    send_msgs(a, b, 3)
+    exchange(looper, a)
+    exchange(looper, b)
+    assert len(a_payloads) == 1
+    batch = a.deserializeMsg(a_payloads[0])
+    assert batch[OP_FIELD_NAME] == BATCH
+    assert BINARY_BATCH_FEATURE in batch[f.FEATURES.nm]
+    assert received_msgs(b) == [{'op': 'TEST', 'data': 'msg "{}"'.format(i)}
+                                for i in range(3)]
+
+    # Receiver of the advertisement advertises its own features before
+    # switching to binary batches
+    for i in range(2):
+        send_msgs(b, a, 3)
+        exchange(looper, b)
+        exchange(looper, a)
+        assert received_msgs(a) == [{'op': 'TEST', 'data': 'msg "{}"'.format(i)}
+                                    for i in range(3)]
+    assert len(b_payloads) == 2
+    assert BINARY_BATCH_FEATURE in b.deserializeMsg(b_payloads[0])[f.FEATURES.nm]
+    assert is_binary_batch(b_payloads[1])
+
+    # Remote which advertised binary batches is sent binary batches
+    send_msgs(a, b, 3)
+    exchange(looper, a)
+    exchange(looper, b)
+    assert len(a_payloads) == 2
+    assert is_binary_batch(a_payloads[1])
+    assert len(received_msgs(b)) == 3
+
+
+def test_ping_resets_to_json_batches(looper, stacks):
+    a, b = stacks
+    send_msgs(a, b, 2)
+    exchange(looper, a, b)
+    assert a.name in b._binary_batch_remotes
+
+    # Remote may have been restarted without support of binary batches
+    a.sendPingPong(b.name)
+    exchange(looper, a)
+    exchange(looper, b)
+    assert a.name not in b._binary_batch_remotes
+
+
+def test_no_binary_batches_to_remote_not_supporting_them(looper, stacks):
+    a, b = stacks
+    a.binary_batches_enabled = False
+    b_payloads = sent_payloads(b)
+
+    send_msgs(a, b, 2)
+    send_msgs(b, a, 2)
+    exchange(looper, a, b)
+    send_msgs(b, a, 2)
+    exchange(looper, a, b)
+
+    assert all(not is_binary_batch(p) for p in b_payloads)
+    batch = b.deserializeMsg(b_payloads[-1])
+    assert batch[OP_FIELD_NAME] == BATCH
+    assert len(received_msgs(a)) == 4
+    assert len(received_msgs(b)) == 2
+
+
+def test_binary_batches_with_zero_copy_receive(looper, stacks):
+    a, b = stacks
+    for stack in stacks:
+        stack.zero_copy_receive = True
+    b_payloads = sent_payloads(b)
+
+    send_msgs(a, b, 3)
+    send_msgs(b, a, 3)
+    exchange(looper, a, b)
+    assert len(received_msgs(a)) == 3
+    assert len(received_msgs(b)) == 3
+
+    send_msgs(b, a, 3)
+    b.sendPingPong(a.name, is_ping=False)
+    exchange(looper, b)
+    exchange(looper, a)
+
+    assert is_binary_batch(b_payloads[-1])
+    assert received_msgs(a) == [{'op': 'TEST', 'data': 'msg "{}"'.format(i)}
+                                for i in range(3)]
@@ -0,0 +1,63 @@
+import pytest
+
+from plenum.common.binary_batch import is_binary_batch
+from plenum.test.nodestack.helper import exchange, received_msgs, \
+    sent_payloads
+from stp_core.network.port_dispenser import genHa
+
+
+@pytest.fixture()
+def registry():
+    return {
+        'Alpha': genHa(),
+        'Beta': genHa(),
+        'Gamma': genHa(),
+    }
+
+
+def broadcast_msgs(sender, count):
+    for i in range(count):
+        sender.send({'op': 'TEST', 'data': i})
+
+
+def test_broadcast_batch_is_made_once(looper, stacks):
+    a, b, c = stacks
+    payloads = sent_payloads(a)
+    made_batches = []
+    make_batch = a._make_batch
+
+    def patched_make_batch(msgs):
+        if len(msgs) > 1:
+            made_batches.append(msgs)
+        return make_batch(msgs)
+
+    a._make_batch = patched_make_batch
+
+    broadcast_msgs(a, 3)
+    exchange(looper, *stacks)
+
+    assert len(payloads) == 2
+    assert payloads[0] is payloads[1]
+    assert len(made_batches) == 1
+    for stack in (b, c):
+        assert [m['data'] for m in received_msgs(stack)] == [0, 1, 2]
+
+
+def test_broadcast_batch_is_made_per_batch_kind(looper, stacks):
+    a, b, c = stacks
+    # Remotes advertise binary batches to the sender
+    for stack in (a, b, c):
+        broadcast_msgs(stack, 2)
+    exchange(looper, *stacks)
+    for stack in stacks:
+        received_msgs(stack)
+    a._binary_batch_remotes.discard(c.name)
+
+    payloads = sent_payloads(a)
+    broadcast_msgs(a, 3)
+    exchange(looper, *stacks)
+
+    assert len(payloads) == 2
+    assert sum(is_binary_batch(p) for p in payloads) == 1
+    for stack in (b, c):
+        assert [m['data'] for m in received_msgs(stack)] == [0, 1, 2]
@@ -0,0 +1,109 @@
+from plenum.common.binary_batch import is_binary_batch
+from plenum.common.constants import OP_FIELD_NAME, BATCH
+from plenum.common.types import f
+from plenum.test.nodestack.helper import exchange, send_msgs, \
+    received_msgs
+from stp_zmq.compression import is_compressed, decompress, \
+    COMPRESSION_FEATURE
+
+
+def sent_payloads(stack):
+    # Messages as they are sent by sockets, that is compressed or not
+    payloads = []
+    compress_to_send = stack._compressToSend
+
+    def patched_compress_to_send(msg, uid):
+        payload = compress_to_send(msg, uid)
+        payloads.append(payload)
+        return payload
+
+    stack._compressToSend = patched_compress_to_send
+    return payloads
+
+
+def send_large_msg(sender, receiver):
+    sender.send({'op': 'TEST', 'data': ['some repetitive data'] * 1000},
+                receiver.name)
+
+
+def test_large_messages_are_compressed_after_negotiation(looper, stacks):
+    a, b = stacks
+    a_payloads = sent_payloads(a)
+    b_payloads = sent_payloads(b)
+
+    # Nothing is compressed before the remote advertises compression
+    send_large_msg(a, b)
+    send_msgs(a, b, 2)
+    exchange(looper, a)
+    exchange(looper, b)
+    assert not any(is_compressed(p) for p in a_payloads)
+    batch = a.deserializeMsg(a_payloads[-1])
+    assert batch[OP_FIELD_NAME] == BATCH
+    assert COMPRESSION_FEATURE in batch[f.FEATURES.nm]
+    assert len(received_msgs(b)) == 3
+
+    # Receiver of the advertisement compresses large messages only
+    send_large_msg(b, a)
+    exchange(looper, b)
+    exchange(looper, a)
+    send_msgs(b, a, 1)
+    exchange(looper, b)
+    exchange(looper, a)
+    assert is_compressed(b_payloads[0])
+    assert len(b_payloads[0]) < b.config.MSG_COMPRESSION_THRESHOLD
+    assert not is_compressed(b_payloads[1])
+    msgs = received_msgs(a)
+    assert msgs[0] == {'op': 'TEST', 'data': ['some repetitive data'] * 1000}
+    assert len(msgs) == 2
+
+    # Receiver of a compressed message compresses as well
+    assert b.name in a._compressing_remotes
+    send_large_msg(a, b)
+    exchange(looper, a)
+    exchange(looper, b)
+    assert is_compressed(a_payloads[-1])
+    assert len(received_msgs(b)) == 1
+
+
+def test_compressed_binary_batches(looper, stacks):
+    a, b = stacks
+    b_payloads = sent_payloads(b)
+    send_msgs(a, b, 2)
+    send_msgs(b, a, 2)
+    exchange(looper, a, b)
+    received_msgs(a)
+    received_msgs(b)
+
+    send_large_msg(b, a)
+    send_msgs(b, a, 2)
+    exchange(looper, b)
+    exchange(looper, a)
+    assert is_compressed(b_payloads[-1])
+    assert is_binary_batch(decompress(b_payloads[-1], a.config.MSG_LEN_LIMIT))
+    assert len(received_msgs(a)) == 3
+
+
+def test_ping_stops_compression(looper, stacks):
+    a, b = stacks
+    send_msgs(a, b, 2)
+    exchange(looper, a, b)
+    assert a.name in b._compressing_remotes
+
+    a.sendPingPong(b.name)
+    exchange(looper, a)
+    exchange(looper, b)
+    assert a.name not in b._compressing_remotes
+
+
+def test_no_compression_for_remote_not_supporting_it(looper, stacks):
+    a, b = stacks
+    a.compression_enabled = False
+    b_payloads = sent_payloads(b)
+
+    send_msgs(a, b, 2)
+    exchange(looper, a, b)
+    send_large_msg(b, a)
+    exchange(looper, a, b)
+
+    assert not any(is_compressed(p) for p in b_payloads)
+    assert len(received_msgs(a)) == 1
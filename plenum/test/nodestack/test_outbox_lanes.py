@@ -0,0 +1,34 @@
+from plenum.common.constants import OP_FIELD_NAME, PREPARE, CATCHUP_REP, \
+    PROPAGATE
+from plenum.test.nodestack.helper import exchange, received_msgs
+
+
+def test_consensus_messages_are_sent_first(looper, stacks):
+    a, b = stacks
+    a.send({OP_FIELD_NAME: CATCHUP_REP, 'data': 1}, b.name)
+    a.send({OP_FIELD_NAME: PROPAGATE, 'data': 2}, b.name)
+    a.send({OP_FIELD_NAME: PREPARE, 'data': 3}, b.name)
+    exchange(looper, a)
+    exchange(looper, b)
+
+    assert [m['data'] for m in received_msgs(b)] == [3, 2, 1]
+
+
+def test_catchup_messages_are_limited_by_flush_size(looper, stacks):
+    a, b = stacks
+    a.outbox_flush_size = 10 * 1024
+    for i in range(10):
+        a.send({OP_FIELD_NAME: CATCHUP_REP, 'data': str(i) * 2048}, b.name)
+    a.send({OP_FIELD_NAME: PREPARE, 'data': 'p'}, b.name)
+
+    exchange(looper, a)
+    exchange(looper, b)
+    msgs = received_msgs(b)
+    assert msgs[0][OP_FIELD_NAME] == PREPARE
+    assert 1 < len(msgs) < 11
+
+    for _ in range(10):
+        exchange(looper, a)
+        exchange(looper, b)
+    msgs += received_msgs(b)
+    assert [m['data'][0] for m in msgs[1:]] == [str(i) for i in range(10)]
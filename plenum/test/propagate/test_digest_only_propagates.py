@@ -0,0 +1,52 @@
+import pytest
+
+from plenum.common.constants import PROPAGATE
+from plenum.common.messages.node_messages import PropagateDigest, MessageReq
+from plenum.common.types import f
+from plenum.test.helper import sdk_send_random_and_check
+from plenum.test.propagate.helper import sentPropagate
+from plenum.test.spy_helpers import getAllArgs, get_count
+from plenum.test.test_node import TestNode
+
+nodeCount = 4
+delaySec = 3
+
+
+@pytest.fixture(scope="module")
+def tconf(tconf):
+    old = tconf.DIGEST_ONLY_PROPAGATES
+    tconf.DIGEST_ONLY_PROPAGATES = True
+    yield tconf
+    tconf.DIGEST_ONLY_PROPAGATES = old
+
+
+def sent_propagate_digests(node: TestNode):
+    params = getAllArgs(node, TestNode.send)
+    return [p for p in params if isinstance(p['msg'], PropagateDigest)]
+
+
+def test_requests_ordered_with_digest_only_propagates(looper, txnPoolNodeSet,
+                                                      sdk_pool_handle,
+                                                      sdk_wallet_client):
+    A = txnPoolNodeSet[0]
+    # A gets PROPAGATEs before the request, so the nodes which sent them
+    # get a digest from A
+    A.clientIbStasher.delay(lambda x: delaySec)
+
+    sdk_send_random_and_check(looper, txnPoolNodeSet, sdk_pool_handle,
+                              sdk_wallet_client, 1)
+
+    assert len(sentPropagate(A)) == 1
+    assert len(sent_propagate_digests(A)) == 1
+    auth_obj = A.authNr(0).core_authenticator
+    assert get_count(auth_obj, auth_obj.authenticate) == 1
+
+
+def test_node_requests_unknown_request_from_digest_sender(txnPoolNodeSet):
+    A, B = txnPoolNodeSet[:2]
+
+    B.process_propagate_digest(PropagateDigest('unknown', None), A.name)
+
+    requested = [p['msg'] for p in getAllArgs(B, TestNode.send)
+                 if isinstance(p['msg'], MessageReq)]
+    assert MessageReq(PROPAGATE, {f.DIGEST.nm: 'unknown'}) in requested
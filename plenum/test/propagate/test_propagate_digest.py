@@ -0,0 +1,66 @@
+import pytest
+
+from plenum.common.constants import CURRENT_PROTOCOL_VERSION
+from plenum.common.messages.node_messages import Propagate, PropagateDigest
+from plenum.common.request import Request
+from plenum.server.propagator import Propagator
+from plenum.test.helper import randomOperation
+
+NODE_NAMES = ['Alpha', 'Beta', 'Gamma', 'Delta']
+
+
+class FakePropagatorNode(Propagator):
+    def __init__(self, config):
+        super().__init__()
+        self.name = 'Alpha'
+        self.nodeReg = {name: None for name in NODE_NAMES}
+        self.config = config
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append((msg, set(NODE_NAMES) - {self.name}))
+
+    def sendToNodes(self, msg, names):
+        self.sent.append((msg, set(names)))
+
+
+@pytest.fixture(params=[True, False], ids=['digest-only', 'full'])
+def node(tconf, request):
+    old = tconf.DIGEST_ONLY_PROPAGATES
+    tconf.DIGEST_ONLY_PROPAGATES = request.param
+    yield FakePropagatorNode(tconf)
+    tconf.DIGEST_ONLY_PROPAGATES = old
+
+
+@pytest.fixture
+def request_():
+    return Request(identifier='4QxzWk3ajdnEA37NdNU5Kt',
+                   reqId=1,
+                   operation=randomOperation(),
+                   protocolVersion=CURRENT_PROTOCOL_VERSION)
+
+
+def test_request_is_propagated_to_nodes_without_it(node, request_):
+    node.propagate(request_, 'client')
+
+    (msg, names), = node.sent
+    assert isinstance(msg, Propagate)
+    assert names == {'Beta', 'Gamma', 'Delta'}
+
+
+def test_digest_is_propagated_to_nodes_having_request(node, request_):
+    node.requests.add_propagate(request_, 'Beta')
+    node.requests.add_propagate(request_, 'Gamma')
+    node.propagate(request_, 'client')
+
+    if not node.config.DIGEST_ONLY_PROPAGATES:
+        (msg, names), = node.sent
+        assert isinstance(msg, Propagate)
+        assert names == {'Beta', 'Gamma', 'Delta'}
+        return
+
+    (digest, digest_names), (msg, names) = node.sent
+    assert digest == PropagateDigest(request_.digest, 'client')
+    assert digest_names == {'Beta', 'Gamma'}
+    assert isinstance(msg, Propagate)
+    assert names == {'Delta'}
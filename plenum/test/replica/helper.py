@@ -1,7 +1,13 @@
 import time
 
 from plenum.common.constants import CURRENT_PROTOCOL_VERSION, DOMAIN_LEDGER_ID
-from plenum.test.helper import sdk_random_request_objects
+from plenum.common.request import Request
+from plenum.server.propagator import Requests
+from plenum.server.quorums import Quorums
+from plenum.test.helper import sdk_random_request_objects, randomOperation
+from plenum.test.testing_utils import FakeSomething
+
+NODE_NAMES = ('Alpha', 'Beta', 'Gamma', 'Delta')
 
 
 def emulate_catchup(replica, ppSeqNo=100):
@@ -25,3 +31,45 @@ def create_preprepare(replica, sdk_wallet_steward, req_count):
     replica.last_accepted_pre_prepare_time = int(time.time())
     pp = replica.create_3pc_batch(DOMAIN_LEDGER_ID)
     return reqs, pp
+
+
+def fake_node(name):
+    node = FakeSomething(
+        name=name,
+        viewNo=0,
+        f=1,
+        quorums=Quorums(len(NODE_NAMES)),
+        ledger_ids=[DOMAIN_LEDGER_ID],
+        isParticipating=True,
+        is_synced=True,
+        view_change_in_progress=False,
+        nodestack=FakeSomething(connecteds=set(NODE_NAMES) - {name}),
+        master_replica=FakeSomething(last_ordered_3pc=(0, 0)),
+        requests=Requests(),
+        seqNoDB=FakeSomething(get=lambda key: (None, None)),
+        ledger_id_for_request=lambda request: DOMAIN_LEDGER_ID,
+        ledger_to_req_handler={DOMAIN_LEDGER_ID: FakeSomething(ts_store=None)},
+        utc_epoch=lambda *args: int(time.time()),
+        sent_pp_seq_nos=[],
+        calls=[],
+    )
+    node.last_sent_pp_store_helper = FakeSomething(
+        store_last_sent_pp_seq_no=lambda inst_id, pp_seq_no:
+        node.sent_pp_seq_nos.append((inst_id, pp_seq_no)))
+    node.request_propagates = lambda keys: node.calls.append(('request_propagates', keys))
+    node.request_msg = lambda *args: node.calls.append(('request_msg', args))
+    node.reportSuspiciousNode = lambda *args: node.calls.append(('suspicious', args))
+    node.reportSuspiciousNodeEx = lambda ex: node.calls.append(('suspicious', ex.code))
+    return node
+
+
+def add_request(node, request=None):
+    if request is None:
+        request = Request(identifier='4QxzWk3ajdnEA37NdNU5Kt',
+                          reqId=int(time.time() * 10 ** 6),
+                          operation=randomOperation(),
+                          protocolVersion=CURRENT_PROTOCOL_VERSION)
+    node.requests.add(request)
+    node.requests.set_finalised(request)
+    node.requests.mark_as_forwarded(request, 1)
+    return request
@@ -0,0 +1,160 @@
+import pytest
+
+from plenum.bls.bls_bft_replica_null import BlsBftReplicaNull
+from plenum.common.constants import DOMAIN_LEDGER_ID
+from plenum.common.messages.node_messages import PrePrepare, Prepare, \
+    Commit, Ordered, AggregatedPrepare, AggregatedCommit, ThreePhaseKey, \
+    Checkpoint
+from plenum.common.request import ReqKey
+from plenum.common.types import f
+from plenum.server.replica import Replica
+from plenum.test.replica.helper import fake_node, add_request
+
+BATCHES = 3
+
+
+@pytest.fixture
+def aggregating_tconf(tconf):
+    old = tconf.AGGREGATE_3PC_VOTES
+    tconf.AGGREGATE_3PC_VOTES = True
+    yield tconf
+    tconf.AGGREGATE_3PC_VOTES = old
+
+
+def new_replica(name, tconf):
+    return Replica(fake_node(name), 1, config=tconf,
+                   bls_bft_replica=BlsBftReplicaNull())
+
+
+def sent(replica, msg_type):
+    return [msg for msg in replica.outBox if isinstance(msg, msg_type)]
+
+
+@pytest.fixture
+def batches(aggregating_tconf):
+    primary = new_replica('Alpha', aggregating_tconf)
+    primary.primaryName = primary.name
+    requests = []
+    for _ in range(BATCHES):
+        request = add_request(primary.node)
+        requests.append(request)
+        primary.readyFor3PC(ReqKey(request.key))
+        primary._do_send_3pc_batch(DOMAIN_LEDGER_ID)
+    return primary, requests
+
+
+@pytest.fixture
+def replica(batches, aggregating_tconf):
+    primary, requests = batches
+    replica = new_replica('Delta', aggregating_tconf)
+    replica.primaryName = primary.name
+    for request in requests:
+        add_request(replica.node, request)
+        replica.inBox.append(ReqKey(request.key))
+    for pre_prepare in sent(primary, PrePrepare):
+        replica.inBox.append((pre_prepare, primary.name))
+    replica.serviceQueues()
+    return replica
+
+
+def test_aggregated_prepare_has_fields_of_prepares(batches, replica):
+    primary, _ = batches
+    pre_prepares = sent(primary, PrePrepare)
+
+    assert not sent(replica, Prepare)
+    prepare, = sent(replica, AggregatedPrepare)
+    assert prepare.ppSeqNo == 1
+    assert prepare.digests == [pp.digest for pp in pre_prepares]
+    assert prepare.ppTimes == [pp.ppTime for pp in pre_prepares]
+    assert prepare.stateRootHashes == [pp.stateRootHash for pp in pre_prepares]
+    assert prepare.txnRootHashes == [pp.txnRootHash for pp in pre_prepares]
+    for pp_seq_no in range(1, BATCHES + 1):
+        assert replica.prepares.hasPrepareFrom(ThreePhaseKey(0, pp_seq_no), replica.name)
+
+
+def test_replica_orders_batches_with_aggregated_votes(replica):
+    prepare, = sent(replica, AggregatedPrepare)
+    replica.outBox.clear()
+    for sender in ('Beta', 'Gamma'):
+        replica.inBox.append((AggregatedPrepare(*prepare.values()), sender))
+    replica.serviceQueues()
+
+    commit, = sent(replica, AggregatedCommit)
+    assert commit.ppSeqNo == 1
+    assert commit.digests == prepare.digests
+    assert f.BLS_SIGS.nm not in commit
+    replica.outBox.clear()
+    for sender in ('Alpha', 'Beta'):
+        replica.inBox.append((AggregatedCommit(*commit.values()), sender))
+    replica.serviceQueues()
+
+    assert [o.ppSeqNo for o in sent(replica, Ordered)] == list(range(1, BATCHES + 1))
+    assert replica.last_ordered_3pc == (0, BATCHES)
+
+
+def test_commit_for_other_digest_is_dropped(replica):
+    prepare, = sent(replica, AggregatedPrepare)
+    digests = list(prepare.digests)
+    digests[1] = 'other'
+
+    replica.inBox.append((AggregatedCommit(1, 0, 1, digests), 'Beta'))
+    replica.serviceQueues()
+
+    assert replica.commits.hasCommitFrom(ThreePhaseKey(0, 1), 'Beta:1')
+    assert not replica.commits.hasCommitFrom(ThreePhaseKey(0, 2), 'Beta:1')
+    assert replica.commits.hasCommitFrom(ThreePhaseKey(0, 3), 'Beta:1')
+
+
+def prepare(pp_seq_no):
+    return Prepare(1, 0, pp_seq_no, 1499906903, 'digest{}'.format(pp_seq_no),
+                   None, None)
+
+
+def test_votes_out_of_sequence_are_not_aggregated(tconf):
+    replica = new_replica('Delta', tconf)
+    prepares = [prepare(pp_seq_no) for pp_seq_no in (1, 2, 4)]
+    replica.outBox.extend(prepares)
+
+    replica._aggregate_3pc_votes()
+
+    aggregated, msg = replica.outBox
+    assert isinstance(aggregated, AggregatedPrepare)
+    assert aggregated.digests == ['digest1', 'digest2']
+    assert msg == prepares[2]
+
+
+@pytest.mark.parametrize('msg', [
+    Checkpoint(1, 0, 1, 100, 'digest'),
+    # There is no PRE-PREPARE to take digest of the COMMIT from
+    Commit(1, 0, 1),
+])
+def test_votes_are_not_moved_ahead_of_other_messages(tconf, msg):
+    replica = new_replica('Delta', tconf)
+    prepares = [prepare(pp_seq_no) for pp_seq_no in (5, 6, 7)]
+    replica.outBox.extend([prepares[0], msg, prepares[1], prepares[2]])
+
+    replica._aggregate_3pc_votes()
+
+    first, other, aggregated = replica.outBox
+    assert first == prepares[0]
+    assert other == msg
+    assert isinstance(aggregated, AggregatedPrepare)
+    assert aggregated.ppSeqNo == 6
+    assert aggregated.digests == ['digest6', 'digest7']
+
+
+@pytest.mark.parametrize('fields', [
+    dict(ppTimes=[1499906903], digests=['d1', 'd2'],
+         stateRootHashes=[None, None], txnRootHashes=[None, None]),
+    dict(ppTimes=[], digests=[],
+         stateRootHashes=[], txnRootHashes=[]),
+])
+def test_aggregated_prepare_with_wrong_number_of_items_is_invalid(fields):
+    with pytest.raises(TypeError):
+        AggregatedPrepare(instId=1, viewNo=0, ppSeqNo=1, **fields)
+
+
+def test_aggregated_commit_needs_signature_of_each_batch():
+    AggregatedCommit(1, 0, 1, ['d1', 'd2'], [None, None])
+    with pytest.raises(TypeError):
+        AggregatedCommit(1, 0, 1, ['d1', 'd2'], [None])
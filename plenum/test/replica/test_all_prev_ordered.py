@@ -0,0 +1,55 @@
+from plenum.test.helper import create_commit_no_bls_sig
+
+
+def add_commit(replica, key):
+    commit = create_commit_no_bls_sig(key, inst_id=replica.instId)
+    replica.commits.addVote(commit, 'Alpha')
+    replica._add_unordered_3pc_key(key)
+    return commit
+
+
+def test_all_prev_ordered_for_next_commit(replica):
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 1)
+    add_commit(replica, (view_no, 3))
+    assert replica.all_prev_ordered(add_commit(replica, (view_no, 2)))
+
+
+def test_not_all_prev_ordered_with_lower_unordered_commits(replica):
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 0)
+    add_commit(replica, (view_no, 1))
+    add_commit(replica, (view_no, 2))
+    commit = add_commit(replica, (view_no, 3))
+    assert not replica.all_prev_ordered(commit)
+
+    replica.addToOrdered(view_no, 1)
+    assert not replica.all_prev_ordered(commit)
+
+    replica.addToOrdered(view_no, 2)
+    assert replica.all_prev_ordered(commit)
+    assert replica._lowest_unordered_3pc_key() == (view_no, 3)
+
+
+def test_not_all_prev_ordered_with_unordered_commits_from_previous_view(replica):
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 0)
+    add_commit(replica, (view_no + 1, 1))
+    add_commit(replica, (view_no, 5))
+    commit = add_commit(replica, (view_no + 1, 2))
+    assert not replica.all_prev_ordered(commit)
+
+    replica.addToOrdered(view_no, 5)
+    assert not replica.all_prev_ordered(commit)
+
+
+def test_all_prev_ordered_after_lower_commits_are_cleaned(replica):
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 0)
+    add_commit(replica, (view_no, 1))
+    commit = add_commit(replica, (view_no, 3))
+    assert not replica.all_prev_ordered(commit)
+
+    replica.commits.pop((view_no, 1))
+    assert replica.all_prev_ordered(commit)
+    assert (view_no, 1) not in replica._unordered_3pc_keys
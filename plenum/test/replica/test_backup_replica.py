@@ -0,0 +1,101 @@
+import pytest
+
+from plenum.bls.bls_bft_replica_null import BlsBftReplicaNull
+from plenum.common.constants import DOMAIN_LEDGER_ID
+from plenum.common.messages.node_messages import PrePrepare, Prepare, \
+    Commit, Ordered
+from plenum.common.request import ReqKey
+from plenum.common.util import updateNamedTuple
+from plenum.server.backup_replica import BackupReplica, BatchRecord
+from plenum.server.replica import Replica
+from plenum.server.suspicion_codes import Suspicions
+from plenum.test.replica.helper import fake_node, add_request
+
+
+@pytest.fixture(params=['digest-only', 'plain'])
+def backup_replica_of(tconf, request):
+    def create(node):
+        if request.param == 'plain':
+            return Replica(node, 1, config=tconf,
+                           bls_bft_replica=BlsBftReplicaNull())
+        return BackupReplica(node, 1, config=tconf)
+
+    return create
+
+
+@pytest.fixture
+def batch(tconf):
+    primary = BackupReplica(fake_node('Alpha'), 1, config=tconf)
+    primary.primaryName = primary.name
+    requests = [add_request(primary.node) for _ in range(3)]
+    for request in requests:
+        primary.readyFor3PC(ReqKey(request.key))
+    primary._do_send_3pc_batch(DOMAIN_LEDGER_ID)
+    return primary, requests
+
+
+def sent(replica, msg_type):
+    return [msg for msg in replica.outBox if isinstance(msg, msg_type)]
+
+
+def test_primary_keeps_batch_record(batch):
+    primary, requests = batch
+    pre_prepare, = sent(primary, PrePrepare)
+
+    assert pre_prepare.reqIdr == [r.key for r in requests]
+    assert pre_prepare.digest == Replica.batchDigest(requests)
+    record = primary.sentPrePrepares[(0, 1)]
+    assert isinstance(record, BatchRecord)
+    assert not hasattr(record, '__dict__')
+    assert primary.get_sent_pre_prepare(0, 1) == pre_prepare
+    assert not primary.batches
+
+
+def test_backup_replica_orders_as_plain_replica(batch, backup_replica_of):
+    primary, requests = batch
+    pre_prepare, = sent(primary, PrePrepare)
+    replica = backup_replica_of(fake_node('Delta'))
+    replica.primaryName = primary.name
+    for request in requests:
+        add_request(replica.node, request)
+        replica.inBox.append(ReqKey(request.key))
+
+    replica.inBox.append((pre_prepare, primary.name))
+    replica.serviceQueues()
+    prepare, = sent(replica, Prepare)
+    for sender in ('Beta:1', 'Gamma:1'):
+        replica.inBox.append((Prepare(*prepare.values()), sender))
+    replica.serviceQueues()
+    commit, = sent(replica, Commit)
+    for sender in ('Alpha:1', 'Beta:1'):
+        replica.inBox.append((Commit(*commit.values()), sender))
+    replica.serviceQueues()
+    ordered, = sent(replica, Ordered)
+
+    assert ordered.valid_reqIdr == [r.key for r in requests]
+    assert replica.last_ordered_3pc == (0, 1)
+    assert replica.get_sent_prepare(0, 1) == prepare
+    assert replica.get_sent_commit(0, 1) == commit
+    assert all(replica.requests[r.key].unordered_by_replicas_num == 0
+               for r in requests)
+    if isinstance(replica, BackupReplica):
+        assert isinstance(replica.prePrepares[(0, 1)], BatchRecord)
+        assert replica.prepares[(0, 1)].msg is None
+        assert replica.commits[(0, 1)].msg is None
+
+
+def test_backup_replica_rejects_pre_prepare_with_wrong_digest(batch, backup_replica_of):
+    primary, requests = batch
+    pre_prepare, = sent(primary, PrePrepare)
+    pre_prepare = updateNamedTuple(pre_prepare, digest='wrong')
+    replica = backup_replica_of(fake_node('Delta'))
+    replica.primaryName = primary.name
+    for request in requests:
+        add_request(replica.node, request)
+
+    replica.inBox.append((pre_prepare, primary.name))
+    replica.serviceQueues()
+
+    assert not sent(replica, Prepare)
+    assert (0, 1) not in replica.prePrepares
+    assert replica.node.calls == [('suspicious', Suspicions.PPR_DIGEST_WRONG.code)]
@@ -1,4 +1,4 @@
-from random import randint
+from random import randint, Random
 
 import pytest
 from plenum.server.replica import IntervalList, OrderedTracker
@@ -14,6 +14,19 @@ def other_intervals():
     return IntervalList()
 
 
+def intervals_of(items):
+    """
+    Reference splitting of set of integers into sorted intervals
+    """
+    result = []
+    for item in sorted(items):
+        if result and result[-1][1] == item - 1:
+            result[-1][1] = item
+        else:
+            result.append([item, item])
+    return result
+
+
 @pytest.fixture
 def tracker():
     return OrderedTracker()
@@ -129,6 +142,37 @@ def test_interval_list_handles_arbitrary_insertion_order(intervals: IntervalList
             assert n not in intervals
 
 
+@pytest.mark.parametrize('seed', range(20))
+def test_interval_list_matches_set_after_each_add(intervals: IntervalList, seed):
+    rnd = Random(seed)
+    max_item = rnd.choice([5, 20, 100])
+    test_set = set()
+    for _ in range(3 * max_item):
+        n = rnd.randint(0, max_item)
+        test_set.add(n)
+        intervals.add(n)
+
+        assert len(intervals) == len(test_set)
+        assert [list(i) for i in zip(intervals._starts, intervals._ends)] == \
+            intervals_of(test_set)
+        for m in range(-1, max_item + 2):
+            assert (m in intervals) == (m in test_set)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_interval_list_does_not_depend_on_insertion_order(seed):
+    rnd = Random(seed)
+    items = [rnd.randint(0, 50) for _ in range(60)]
+    lists = []
+    for order in (items, sorted(items), sorted(items, reverse=True)):
+        il = IntervalList()
+        for n in order:
+            il.add(n)
+        lists.append(il)
+
+    assert lists[0] == lists[1] == lists[2]
+
+
 def test_ordered_tracker_has_contains_accessor(tracker: OrderedTracker):
     assert len(tracker) == 0
     assert not (0, 1) in tracker
@@ -172,6 +216,16 @@ def test_ordered_tracker_behaves_like_a_set(tracker: OrderedTracker):
             assert (v, n) not in tracker
 
 
+def test_ordered_tracker_lookup_does_not_change_it(tracker: OrderedTracker,
+                                                   other_tracker: OrderedTracker):
+    tracker.add(0, 1)
+    other_tracker.add(0, 1)
+
+    assert (5, 1) not in tracker
+    assert tracker == other_tracker
+    assert len(tracker) == 1
+
+
 def test_ordered_tracker_can_clean_old_views(tracker: OrderedTracker):
     test_set = set()
     for _ in range(1000):
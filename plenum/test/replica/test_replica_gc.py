@@ -0,0 +1,77 @@
+import pytest
+
+from plenum.common.messages.node_messages import PrePrepare
+from plenum.server.propagator import Requests
+from plenum.test.helper import create_pre_prepare_params, \
+    create_commit_no_bls_sig, create_prepare, generate_state_root
+
+
+@pytest.fixture(scope='function')
+def gc_replica(replica):
+    replica.node.requests = Requests()
+    return replica
+
+
+def ledger_id(replica):
+    return next(iter(replica.requestQueues))
+
+
+def add_batch(replica, key):
+    view_no, pp_seq_no = key
+    pp = PrePrepare(*create_pre_prepare_params(generate_state_root(),
+                                               ledger_id=ledger_id(replica),
+                                               view_no=view_no,
+                                               pp_seq_no=pp_seq_no,
+                                               inst_id=replica.instId))
+    replica.prePrepares[key] = pp
+    replica.prepares.addVote(create_prepare(key, generate_state_root(),
+                                            inst_id=replica.instId), 'Beta')
+    replica.commits.addVote(create_commit_no_bls_sig(key, inst_id=replica.instId),
+                            'Beta')
+    replica.batches[key] = (0, 0, 0, None, None)
+    replica.requested_prepares[key] = None
+    replica.requestQueues[ledger_id(replica)].add(pp.reqIdr[0])
+    return pp
+
+
+def test_gc_cleans_only_3pc_keys_till_checkpoint(gc_replica):
+    replica = gc_replica
+    view_no = replica.viewNo
+    for pp_seq_no in range(1, 6):
+        add_batch(replica, (view_no, pp_seq_no))
+    # All batches share the request key which is freed by the first one
+    replica.requestQueues[ledger_id(replica)].discard("random request digest")
+
+    replica._gc((view_no, 3))
+
+    left = [(view_no, 4), (view_no, 5)]
+    assert list(replica.prePrepares.keys()) == left
+    assert sorted(replica.prepares.keys()) == left
+    assert sorted(replica.commits.keys()) == left
+    assert sorted(replica.batches.keys()) == left
+    assert sorted(replica.requested_prepares.keys()) == left
+
+
+def test_gc_discards_requests_from_ledger_queue(gc_replica):
+    replica = gc_replica
+    view_no = replica.viewNo
+    pp = add_batch(replica, (view_no, 1))
+    req_key = pp.reqIdr[0]
+    assert req_key in replica.requestQueues[ledger_id(replica)]
+
+    replica._gc((view_no, 1))
+
+    assert not replica.prePrepares
+    assert req_key not in replica.requestQueues[ledger_id(replica)]
+
+
+def test_gc_of_previous_view(gc_replica):
+    replica = gc_replica
+    view_no = replica.viewNo
+    add_batch(replica, (view_no, 10))
+    add_batch(replica, (view_no + 1, 1))
+
+    replica._gc((view_no, 10))
+
+    assert list(replica.prePrepares.keys()) == [(view_no + 1, 1)]
+    assert list(replica.commits.keys()) == [(view_no + 1, 1)]
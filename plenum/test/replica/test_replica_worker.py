@@ -0,0 +1,197 @@
+import time
+
+import pytest
+
+from plenum.common.messages.node_messages import PrePrepare, Prepare, \
+    Commit, Ordered
+from plenum.common.request import ReqKey
+from plenum.server.replica_worker import RemoteReplica
+from plenum.server.replicas import Replicas
+from plenum.test.replica.helper import fake_node, add_request
+from plenum.test.testing_utils import FakeSomething
+
+whitelist = ['worker process .* exited with code',
+             'worker process failed']
+
+
+@pytest.fixture
+def remote_replicas(tconf):
+    replicas = []
+
+    def create(node_name):
+        replica = RemoteReplica(fake_node(node_name), 1, tconf)
+        replicas.append(replica)
+        return replica
+
+    yield create
+
+    for replica in replicas:
+        replica.stop()
+
+
+def wait_for_messages(replica, msg_type, count=1, timeout=30):
+    messages = []
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        replica.serviceQueues()
+        while replica.outBox:
+            msg = replica.outBox.popleft()
+            if isinstance(msg, msg_type):
+                messages.append(msg)
+        if len(messages) >= count:
+            return messages
+        time.sleep(0.05)
+    pytest.fail('{} did not send {} {}'.format(replica, count, msg_type.__name__))
+
+
+def test_backup_primary_in_worker_creates_pre_prepare(remote_replicas):
+    primary = remote_replicas('Alpha')
+    primary.primaryName = primary.name
+    request = add_request(primary.node)
+    primary.inBox.append(ReqKey(request.key))
+
+    pre_prepare, = wait_for_messages(primary, PrePrepare)
+
+    assert pre_prepare.instId == 1
+    assert pre_prepare.reqIdr == [request.key]
+    assert primary.node.sent_pp_seq_nos == [(1, 1)]
+    assert primary.isPrimary
+
+
+def commit_batch_in_worker(remote_replicas):
+    primary = remote_replicas('Alpha')
+    primary.primaryName = primary.name
+    request = add_request(primary.node)
+    primary.inBox.append(ReqKey(request.key))
+    pre_prepare, = wait_for_messages(primary, PrePrepare)
+
+    replica = remote_replicas('Delta')
+    replica.primaryName = primary.name
+    add_request(replica.node, request)
+    replica.inBox.append(ReqKey(request.key))
+    replica.inBox.append((pre_prepare, primary.name))
+    prepare, = wait_for_messages(replica, Prepare)
+
+    for sender in ('Beta', 'Gamma'):
+        replica.inBox.append((Prepare(*prepare.values()), '{}:1'.format(sender)))
+    commit, = wait_for_messages(replica, Commit)
+    return replica, request, commit
+
+
+def test_backup_in_worker_orders_batch(remote_replicas):
+    replica, request, commit = commit_batch_in_worker(remote_replicas)
+    node = replica.node
+
+    for sender in ('Alpha', 'Beta'):
+        replica.inBox.append((Commit(*commit.values()), '{}:1'.format(sender)))
+    ordered, = wait_for_messages(replica, Ordered)
+
+    assert (ordered.instId, ordered.viewNo, ordered.ppSeqNo) == (1, 0, 1)
+    assert ordered.valid_reqIdr == [request.key]
+    assert replica.last_ordered_3pc == (0, 1)
+    # The only replica request was forwarded to ordered it
+    assert node.requests[request.key].unordered_by_replicas_num == 0
+
+
+def test_state_of_backup_in_worker_is_updated_while_messages_arrive(remote_replicas):
+    replica, _, commit = commit_batch_in_worker(remote_replicas)
+
+    for sender in ('Alpha', 'Beta'):
+        replica.inBox.append((Commit(*commit.values()), '{}:1'.format(sender)))
+    replica.serviceQueues()
+    deadline = time.perf_counter() + 30
+    while replica._from_worker.empty() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+
+    # Late COMMIT is sent to the worker before the state it took after
+    # ordering the batch is received
+    replica.inBox.append((Commit(*commit.values()), 'Gamma:1'))
+    wait_for_messages(replica, Ordered)
+
+    assert replica.last_ordered_3pc == (0, 1)
+    assert replica.h == 0
+
+
+def test_state_set_by_node_is_not_overwritten_by_older_worker_state(remote_replicas):
+    replica = remote_replicas('Delta')
+    replica._update_state(0, {'last_ordered_3pc': (0, 0),
+                              'lastPrePrepareSeqNo': 0, 'h': 0, 'H': 300})
+    replica.last_ordered_3pc = (0, 5)
+    replica._update_state(replica._command_no - 1,
+                          {'last_ordered_3pc': (0, 0),
+                           'lastPrePrepareSeqNo': 0, 'h': 0, 'H': 300})
+
+    assert replica.last_ordered_3pc == (0, 5)
+    assert replica.H == 300
+
+
+def test_stopped_worker_returns_requests_it_did_not_free(remote_replicas):
+    replica = remote_replicas('Delta')
+    request = add_request(replica.node)
+    replica.inBox.append(ReqKey(request.key))
+    replica.serviceQueues()
+
+    assert replica.stop() == {request.key}
+    assert not replica._process.is_alive()
+
+
+def wait_for_failure(replica, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        replica.serviceQueues()
+        if replica.failed:
+            return
+        time.sleep(0.05)
+    pytest.fail('{} did not fail'.format(replica))
+
+
+def test_killed_worker_is_not_given_more_work(remote_replicas):
+    replica = remote_replicas('Delta')
+    replica._process.terminate()
+    replica._process.join()
+    commands_sent = replica._to_worker.qsize()
+
+    replica.inBox.append(ReqKey(add_request(replica.node).key))
+    assert replica.serviceQueues() == 0
+    replica.primaryName = 'Alpha:1'
+
+    assert replica.failed
+    assert not replica.inBox
+    assert replica._to_worker.qsize() == commands_sent
+
+
+def test_worker_stops_on_error_in_replica(remote_replicas):
+    replica = remote_replicas('Delta')
+    replica._call('no_such_method')
+
+    wait_for_failure(replica)
+    assert replica._process.exitcode == 0
+
+
+@pytest.fixture
+def replicas_in_processes(tconf):
+    old = tconf.BACKUP_REPLICAS_IN_PROCESSES
+    tconf.BACKUP_REPLICAS_IN_PROCESSES = True
+    monitor = FakeSomething(unordered_requests_handlers=[],
+                            addInstance=lambda inst_id: None,
+                            removeInstance=lambda inst_id: None)
+    replicas = Replicas(fake_node('Delta'), monitor, config=tconf)
+    yield replicas
+    replicas.stop_remote_replicas()
+    tconf.BACKUP_REPLICAS_IN_PROCESSES = old
+
+
+def test_replica_with_killed_worker_is_removed(replicas_in_processes):
+    replicas_in_processes.add_replica(1)
+    replica = replicas_in_processes[1]
+    request = add_request(replica.node)
+    replica.inBox.append(ReqKey(request.key))
+    replicas_in_processes.service_inboxes()
+
+    replica._process.terminate()
+    replica._process.join()
+    replicas_in_processes.service_inboxes()
+
+    assert 1 not in replicas_in_processes.keys()
+    # Requests forwarded to the replica are freed
+    assert replica.node.requests[request.key].forwardedTo == 0
@@ -0,0 +1,122 @@
+import pytest
+
+from plenum.common.messages.node_messages import CheckpointState
+from plenum.test.helper import create_commit_no_bls_sig
+
+
+@pytest.fixture(scope='function')
+def ordering_replica(replica):
+    ordered = []
+
+    def order(commit):
+        key = (commit.viewNo, commit.ppSeqNo)
+        ordered.append(key)
+        replica.addToOrdered(*key)
+
+    replica.doOrder = order
+    replica.ordered_keys = ordered
+    return replica
+
+
+def start_batches(replica, count):
+    # Replica sent own COMMITs for batches, so lower unordered batches stop
+    # COMMITs from being ordered out of order
+    for pp_seq_no in range(1, count + 1):
+        key = (replica.viewNo, pp_seq_no)
+        replica.commits.addVote(create_commit_no_bls_sig(key, inst_id=replica.instId),
+                                replica.name)
+        replica._add_unordered_3pc_key(key)
+
+
+def receive_commit(replica, key):
+    commit = create_commit_no_bls_sig(key, inst_id=replica.instId)
+    for sender in ('Alpha', 'Beta'):
+        replica.commits.addVote(commit, sender)
+    replica._add_unordered_3pc_key(key)
+    return replica.tryOrder(commit)
+
+
+def test_stashed_commits_are_ordered_when_last_ordered_changes(ordering_replica):
+    replica = ordering_replica
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 0)
+    start_batches(replica, 4)
+    for pp_seq_no in (4, 2, 3):
+        assert not receive_commit(replica, (view_no, pp_seq_no))
+    assert replica._stashed_out_of_order_commit_keys[0] == (view_no, 2)
+
+    # Nothing can be ordered until the first commit arrives
+    replica.process_stashed_out_of_order_commits()
+    assert replica.ordered_keys == []
+    assert not replica._last_ordered_changed
+
+    assert receive_commit(replica, (view_no, 1))
+    assert replica._last_ordered_changed
+    replica.process_stashed_out_of_order_commits()
+
+    assert replica.ordered_keys == [(view_no, p) for p in range(1, 5)]
+    assert not replica.stashed_out_of_order_commits
+    assert not replica._stashed_out_of_order_commit_keys
+
+
+def test_processing_stops_at_gap_in_stashed_commits(ordering_replica):
+    replica = ordering_replica
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 0)
+    start_batches(replica, 5)
+    for pp_seq_no in (2, 4, 5):
+        receive_commit(replica, (view_no, pp_seq_no))
+
+    receive_commit(replica, (view_no, 1))
+    replica.process_stashed_out_of_order_commits()
+
+    assert replica.ordered_keys == [(view_no, 1), (view_no, 2)]
+    assert replica.stashed_out_of_order_commits == {
+        view_no: {p: create_commit_no_bls_sig((view_no, p), inst_id=replica.instId)
+                  for p in (4, 5)}}
+
+
+def test_stashed_commits_of_previous_views_are_dropped(ordering_replica):
+    replica = ordering_replica
+    view_no = replica.viewNo
+    replica.last_ordered_3pc = (view_no, 0)
+    start_batches(replica, 3)
+    receive_commit(replica, (view_no, 3))
+    replica.last_ordered_3pc = (view_no + 1, 0)
+
+    replica.process_stashed_out_of_order_commits()
+
+    assert replica.ordered_keys == []
+    assert not replica.stashed_out_of_order_commits
+    assert not replica._stashed_out_of_order_commit_keys
+
+
+def test_checkpoint_is_found_by_its_end(replica):
+    chk_freq = replica.config.CHK_FREQ
+    replica.checkpoints[1, chk_freq] = CheckpointState(1, ['d1'], None, {}, False)
+    replica.checkpoints[chk_freq + 1, 2 * chk_freq] = \
+        CheckpointState(chk_freq + 1, ['d{}'.format(chk_freq + 1)], None, {}, False)
+
+    replica.addToCheckpoint(2, 'd2', None, replica.viewNo)
+    replica.addToCheckpoint(chk_freq + 2, 'd{}'.format(chk_freq + 2), None,
+                            replica.viewNo)
+
+    assert replica.checkpoints[1, chk_freq].digests == ['d1', 'd2']
+    assert replica.checkpoints[1, chk_freq].seqNo == 2
+    assert replica.checkpoints[chk_freq + 1, 2 * chk_freq].seqNo == chk_freq + 2
+    assert len(replica.checkpoints) == 2
+
+
+def test_stable_checkpoint_removes_previous_ones(replica):
+    chk_freq = replica.config.CHK_FREQ
+    for i in range(3):
+        s, e = i * chk_freq + 1, (i + 1) * chk_freq
+        replica.checkpoints[s, e] = CheckpointState(e, [], 'digest', {}, False)
+
+    replica.markCheckPointStable(2 * chk_freq)
+
+    assert list(replica.checkpoints.keys()) == [(chk_freq + 1, 2 * chk_freq),
+                                                (2 * chk_freq + 1, 3 * chk_freq)]
+    assert replica.checkpoints[chk_freq + 1, 2 * chk_freq].isStable
+    assert not replica.checkpoints[2 * chk_freq + 1, 3 * chk_freq].isStable
+    assert replica.h == 2 * chk_freq
@@ -99,3 +99,52 @@ def test_get_value_old_head_hash(domain_req_handler, is_committed, with_proof, w
 
     assert expected_value == result[0]
     assert result[1] if has_proof else result[1] is None
+
+
+def test_get_value_with_proof_is_cached_for_committed_root(domain_req_handler, i):
+    path = "333key{}".format(i).encode()
+    value = "333value{}".format(i).encode()
+    domain_req_handler.state.set(path, value)
+    domain_req_handler.state.commit()
+    root_hash = domain_req_handler.state.committedHeadHash
+    add_bls_multi_sig(domain_req_handler, root_hash)
+
+    result = domain_req_handler.get_value_from_state(path, with_proof=True)
+    cached = domain_req_handler.state_proof_cache.get(bytes(root_hash), path)
+    assert cached is not None
+    assert (cached.value, cached.proof) == result
+
+    assert domain_req_handler.get_value_from_state(path, with_proof=True) == result
+
+
+def test_state_proof_cache_invalidated_on_new_committed_root(domain_req_handler, i):
+    path = "444key{}".format(i).encode()
+    domain_req_handler.state.set(path, "444value{}".format(i).encode())
+    domain_req_handler.state.commit()
+    add_bls_multi_sig(domain_req_handler, domain_req_handler.state.committedHeadHash)
+    domain_req_handler.get_value_from_state(path, with_proof=True)
+
+    new_value = "444new_value{}".format(i).encode()
+    domain_req_handler.state.set(path, new_value)
+    domain_req_handler.state.commit()
+    add_bls_multi_sig(domain_req_handler, domain_req_handler.state.committedHeadHash)
+
+    result = domain_req_handler.get_value_from_state(path, with_proof=True)
+    assert result[0] == new_value
+    assert domain_req_handler.state_proof_cache.root_hash == bytes(domain_req_handler.state.committedHeadHash)
+
+
+def test_changing_result_does_not_change_cached_value_and_proof(domain_req_handler, i):
+    path = "555key{}".format(i).encode()
+    domain_req_handler.state.set(path, "555value{}".format(i).encode())
+    domain_req_handler.state.commit()
+    add_bls_multi_sig(domain_req_handler, domain_req_handler.state.committedHeadHash)
+
+    first = domain_req_handler.get_value_from_state(path, with_proof=True)
+    expected_proof = dict(first[1])
+    first[1].clear()
+    second = domain_req_handler.get_value_from_state(path, with_proof=True)
+    assert second[1] == expected_proof
+    second[1].clear()
+
+    assert domain_req_handler.get_value_from_state(path, with_proof=True)[1] == expected_proof
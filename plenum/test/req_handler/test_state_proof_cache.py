@@ -0,0 +1,49 @@
+from plenum.server.state_proof_cache import StateProofCache, StateProofCacheEntry
+
+
+def entry(value):
+    return StateProofCacheEntry(value=value, proof={'value': value}, multi_sig=None)
+
+
+def test_get_returns_put_entry():
+    cache = StateProofCache(10)
+    cache.put(b'root', b'key', entry(b'value'))
+
+    assert cache.get(b'root', b'key') == entry(b'value')
+    assert cache.get(b'root', b'other_key') is None
+
+
+def test_entries_are_dropped_when_root_changes():
+    cache = StateProofCache(10)
+    cache.put(b'root1', b'key1', entry(b'value1'))
+    cache.put(b'root1', b'key2', entry(b'value2'))
+    assert len(cache) == 2
+
+    assert cache.get(b'root2', b'key1') is None
+    cache.put(b'root2', b'key1', entry(b'value3'))
+
+    assert len(cache) == 1
+    assert cache.root_hash == b'root2'
+    assert cache.get(b'root1', b'key1') is None
+    assert cache.get(b'root2', b'key1') == entry(b'value3')
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = StateProofCache(2)
+    cache.put(b'root', b'key1', entry(b'value1'))
+    cache.put(b'root', b'key2', entry(b'value2'))
+    cache.get(b'root', b'key1')
+    cache.put(b'root', b'key3', entry(b'value3'))
+
+    assert len(cache) == 2
+    assert cache.get(b'root', b'key2') is None
+    assert cache.get(b'root', b'key1') == entry(b'value1')
+    assert cache.get(b'root', b'key3') == entry(b'value3')
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = StateProofCache(0)
+    cache.put(b'root', b'key', entry(b'value'))
+
+    assert len(cache) == 0
+    assert cache.get(b'root', b'key') is None
@@ -5,6 +5,7 @@ import pytest
 
 from plenum.common.request import Request
 from plenum.server.propagator import Requests
+from plenum.server.quorums import Quorum
 
 
 @pytest.fixture(scope="function")
@@ -36,3 +37,39 @@ def test_unordered_by_replicas_num(requests):
     for i in range(1, replicas_num + 1):
         _requests.ordered_by_replica(req_key)
         assert req_state.unordered_by_replicas_num == replicas_num - i
+
+
+def test_quorum_of_propagates_is_counted_per_digest(requests):
+    _requests, req_key = requests
+    req_state = _requests[req_key]
+    req = req_state.request
+    other_req = Request("2")
+    quorum = Quorum(2)
+
+    req_state.add_propagate(req, 'Alpha')
+    # Repeated PROPAGATE is not counted twice
+    req_state.add_propagate(req, 'Alpha')
+    req_state.add_propagate(other_req, 'Beta')
+    assert req_state.digest_votes == {req.digest: 1, other_req.digest: 1}
+    assert req_state.req_with_acceptable_quorum(quorum) is None
+
+    # Sender changing the request moves its vote
+    req_state.add_propagate(req, 'Beta')
+    assert req_state.digest_votes == {req.digest: 2, other_req.digest: 0}
+    assert req_state.req_with_acceptable_quorum(quorum) is req
+
+
+def test_propagates_from_non_str_senders_are_not_counted(requests):
+    _requests, req_key = requests
+    req_state = _requests[req_key]
+
+    _requests.add_propagate(req_state.request, b'Alpha')
+
+    assert _requests.votes(req_state.request) == 1
+    assert req_state.digest_votes == {}
+
+
+def test_req_state_has_no_dict(requests):
+    _requests, req_key = requests
+
+    assert not hasattr(_requests[req_key], '__dict__')
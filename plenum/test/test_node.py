@@ -285,7 +285,8 @@ class TestNodeCore(StackedTester):
                                         self.states[DOMAIN_LEDGER_ID],
                                         self.config, self.reqProcessors,
                                         self.bls_bft.bls_store,
-                                        self.getStateTsDbStorage())
+                                        self.getStateTsDbStorage(),
+                                        metrics=self.metrics)
 
     def init_core_authenticator(self):
         state = self.getState(DOMAIN_LEDGER_ID)
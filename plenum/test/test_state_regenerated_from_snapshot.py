@@ -0,0 +1,117 @@
+import os
+import shutil
+
+from plenum.common.constants import DOMAIN_LEDGER_ID, \
+    STATE_SNAPSHOT_LEDGER_SIZE, STATE_SNAPSHOT_TXN_ROOT_HASH
+from plenum.test.helper import send_reqs_batches_and_get_suff_replies
+from plenum.test.node_catchup.helper import ensure_all_nodes_have_same_data, \
+    waitNodeDataEquality
+from plenum.test.test_node import checkNodesConnected, TestNode
+from plenum.common.config_helper import PNodeConfigHelper
+from state.pruning_state import PruningState
+from state.snapshot import export_state_snapshot
+from storage.kv_in_memory import KeyValueStorageInMemory
+from stp_core.types import HA
+
+TestRunningTimeLimitSec = 200
+
+
+def test_state_regenerated_from_snapshot(
+        looper,
+        txnPoolNodeSet,
+        sdk_pool_handle,
+        sdk_wallet_client,
+        tdir,
+        tconf,
+        allPluginsPath):
+    """
+    Node loses its state database but recreates it from state snapshot
+    and txns added to ledger after the snapshot was made
+    """
+    sent_batches = 5
+    send_reqs_batches_and_get_suff_replies(looper, txnPoolNodeSet,
+                                           sdk_pool_handle,
+                                           sdk_wallet_client,
+                                           5 * sent_batches,
+                                           sent_batches)
+    ensure_all_nodes_have_same_data(looper, txnPoolNodeSet)
+    node_to_stop = txnPoolNodeSet[-1]
+    node_to_stop.export_state_snapshot(DOMAIN_LEDGER_ID)
+
+    send_reqs_batches_and_get_suff_replies(looper, txnPoolNodeSet,
+                                           sdk_pool_handle,
+                                           sdk_wallet_client,
+                                           5 * sent_batches,
+                                           sent_batches)
+    ensure_all_nodes_have_same_data(looper, txnPoolNodeSet)
+    state_root = bytes(node_to_stop.states[DOMAIN_LEDGER_ID].committedHeadHash)
+    restarted_node = restart_without_state(looper, txnPoolNodeSet, tdir,
+                                           tconf, allPluginsPath)
+    assert bytes(restarted_node.states[DOMAIN_LEDGER_ID].committedHeadHash) == state_root
+
+    looper.run(checkNodesConnected(txnPoolNodeSet))
+    waitNodeDataEquality(looper, restarted_node, *txnPoolNodeSet[:-1])
+
+
+def test_state_not_signed_by_pool_is_not_regenerated_from_snapshot(
+        looper,
+        txnPoolNodeSet,
+        sdk_pool_handle,
+        sdk_wallet_client,
+        tdir,
+        tconf,
+        allPluginsPath):
+    """
+    Node loses its state database and has a snapshot of the state with
+    an entry which is not in the ledger, the snapshot is not loaded since
+    the pool has not signed its state, so the state is replayed from ledger
+    """
+    send_reqs_batches_and_get_suff_replies(looper, txnPoolNodeSet,
+                                           sdk_pool_handle,
+                                           sdk_wallet_client,
+                                           5, 1)
+    ensure_all_nodes_have_same_data(looper, txnPoolNodeSet)
+    node_to_stop = txnPoolNodeSet[-1]
+    node_state = node_to_stop.states[DOMAIN_LEDGER_ID]
+    ledger = node_to_stop.getLedger(DOMAIN_LEDGER_ID)
+    state_root = bytes(node_state.committedHeadHash)
+
+    forged_state = PruningState(KeyValueStorageInMemory())
+    for key, value in node_state.iter_leaves_for_root_hash(state_root):
+        forged_state.set(key, value)
+    forged_state.set(b'forged', b'value')
+    forged_state.commit(forged_state.headHash)
+    snapshot_path = node_to_stop._state_snapshot_path(DOMAIN_LEDGER_ID)
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    with open(snapshot_path, 'wb') as f:
+        export_state_snapshot(forged_state, f,
+                              meta={STATE_SNAPSHOT_LEDGER_SIZE: ledger.size,
+                                    STATE_SNAPSHOT_TXN_ROOT_HASH: ledger.root_hash})
+
+    restarted_node = restart_without_state(looper, txnPoolNodeSet, tdir,
+                                           tconf, allPluginsPath)
+    assert bytes(restarted_node.states[DOMAIN_LEDGER_ID].committedHeadHash) == state_root
+
+    looper.run(checkNodesConnected(txnPoolNodeSet))
+    waitNodeDataEquality(looper, restarted_node, *txnPoolNodeSet[:-1])
+
+
+def restart_without_state(looper, txnPoolNodeSet, tdir, tconf, allPluginsPath):
+    node_to_stop = txnPoolNodeSet[-1]
+    state_db_path = node_to_stop.states[DOMAIN_LEDGER_ID]._kv.db_path
+    nodeHa, nodeCHa = HA(*node_to_stop.nodestack.ha), \
+        HA(*node_to_stop.clientstack.ha)
+
+    node_to_stop.stop()
+    looper.removeProdable(node_to_stop)
+
+    shutil.rmtree(state_db_path)
+
+    config_helper = PNodeConfigHelper(node_to_stop.name, tconf, chroot=tdir)
+    restarted_node = TestNode(node_to_stop.name,
+                              config_helper=config_helper,
+                              config=tconf, ha=nodeHa, cliha=nodeCHa,
+                              pluginPaths=allPluginsPath)
+    looper.add(restarted_node)
+    txnPoolNodeSet[-1] = restarted_node
+    return restarted_node
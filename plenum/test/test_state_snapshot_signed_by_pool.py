@@ -0,0 +1,106 @@
+import os
+
+import base58
+import pytest
+
+from common.serializers.serialization import ledger_txn_serializer, \
+    ledger_hash_serializer, state_roots_serializer
+from crypto.bls.bls_multi_signature import MultiSignature, MultiSignatureValue
+from ledger.test.helper import create_ledger_leveldb_storage, random_txn
+from plenum.bls.bls_store import BlsStore
+from plenum.common.constants import DOMAIN_LEDGER_ID, KeyValueStorageType, \
+    STATE_SNAPSHOT_LEDGER_SIZE, STATE_SNAPSHOT_TXN_ROOT_HASH
+from plenum.common.util import get_utc_epoch
+from plenum.server.node import Node
+from plenum.test.testing_utils import FakeSomething
+from state.pruning_state import PruningState
+from state.snapshot import export_state_snapshot
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+LEDGER_SIZE = 5
+KEYS_NUM = 10
+
+
+@pytest.fixture(scope="function")
+def ledger(tdir_for_func):
+    ledger = create_ledger_leveldb_storage(ledger_txn_serializer,
+                                           ledger_hash_serializer,
+                                           tdir_for_func)
+    for i in range(LEDGER_SIZE):
+        ledger.add(random_txn(i))
+    yield ledger
+    ledger.stop()
+
+
+@pytest.fixture(scope="function")
+def bls_store(tdir_for_func):
+    bls_store = BlsStore(KeyValueStorageType.Leveldb, tdir_for_func,
+                         'state_signature')
+    yield bls_store
+    bls_store.close()
+
+
+@pytest.fixture(scope="function")
+def snapshot(tdir_for_func, ledger):
+    state = PruningState(KeyValueStorageInMemory())
+    for i in range(KEYS_NUM):
+        state.set('k{}'.format(i).encode(), 'v{}'.format(i).encode())
+    state.commit(state.headHash)
+    snapshot_path = os.path.join(tdir_for_func, 'domain.snapshot')
+    meta = {STATE_SNAPSHOT_LEDGER_SIZE: ledger.size,
+            STATE_SNAPSHOT_TXN_ROOT_HASH: ledger.root_hash}
+    with open(snapshot_path, 'wb') as f:
+        export_state_snapshot(state, f, meta=meta)
+    return snapshot_path, bytes(state.committedHeadHash)
+
+
+def sign(bls_store, state_root, txn_root_hash):
+    value = MultiSignatureValue(ledger_id=DOMAIN_LEDGER_ID,
+                                state_root_hash=state_roots_serializer.serialize(state_root),
+                                pool_state_root_hash=base58.b58encode(b"somefakepoolroothash").decode(),
+                                txn_root_hash=txn_root_hash,
+                                timestamp=get_utc_epoch())
+    bls_store.put(MultiSignature("1q" * 16, ["q" * 32, "w" * 32, "e" * 32], value))
+
+
+def load_snapshot(ledger, snapshot_path, bls_store):
+    state = PruningState(KeyValueStorageInMemory())
+    loaded_size = Node._load_state_snapshot(FakeSomething(), state, ledger,
+                                            snapshot_path, bls_store)
+    return state, loaded_size
+
+
+def test_snapshot_signed_by_pool_is_loaded(ledger, bls_store, snapshot):
+    snapshot_path, state_root = snapshot
+    sign(bls_store, state_root, ledger.root_hash)
+
+    state, loaded_size = load_snapshot(ledger, snapshot_path, bls_store)
+    assert loaded_size == LEDGER_SIZE
+    assert bytes(state.committedHeadHash) == state_root
+
+
+def test_snapshot_not_signed_by_pool_is_not_loaded(ledger, bls_store, snapshot):
+    snapshot_path, _ = snapshot
+
+    state, loaded_size = load_snapshot(ledger, snapshot_path, bls_store)
+    assert loaded_size == 0
+    assert state.isEmpty
+
+
+def test_snapshot_signed_for_other_txns_is_not_loaded(ledger, bls_store, snapshot):
+    snapshot_path, state_root = snapshot
+    sign(bls_store, state_root,
+         ledger.hashToStr(ledger.tree.merkle_tree_hash(0, LEDGER_SIZE - 1)))
+
+    state, loaded_size = load_snapshot(ledger, snapshot_path, bls_store)
+    assert loaded_size == 0
+    assert state.isEmpty
+
+
+def test_snapshot_is_not_loaded_without_multi_signatures(ledger, bls_store, snapshot):
+    snapshot_path, state_root = snapshot
+    sign(bls_store, state_root, ledger.root_hash)
+
+    state, loaded_size = load_snapshot(ledger, snapshot_path, None)
+    assert loaded_size == 0
+    assert state.isEmpty
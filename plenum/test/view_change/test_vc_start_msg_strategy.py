@@ -6,7 +6,7 @@ import pytest
 
 from plenum.common.constants import PreVCStrategies
 from plenum.common.messages.node_messages import ViewChangeStartMessage, ViewChangeContinueMessage, Prepare, \
-    InstanceChange
+    InstanceChange, AggregatedPrepare, AggregatedCommit
 from plenum.common.util import get_utc_epoch
 from plenum.server.node import Node
 from plenum.server.router import Router
@@ -137,6 +137,30 @@ def test_stash_not_3PC_msgs(pre_vc_strategy, looper):
     assert pre_vc_strategy.stashedNodeInBox.popleft() == m2
 
 
+def test_process_aggregated_3PC_msgs_before_vc_continued(pre_vc_strategy, looper):
+    node = pre_vc_strategy.node
+    node.instances = FakeSomething(masterId=0)
+    processed = []
+
+    async def process_one_node_message(m):
+        processed.append(m)
+
+    node.process_one_node_message = process_one_node_message
+    pre_vc_strategy.view_changer.view_no = 0
+    prepare = (AggregatedPrepare(0, 0, 1, [get_utc_epoch()] * 2, ['d1', 'd2'],
+                                 [None, None], [None, None]), "Beta")
+    commit = (AggregatedCommit(0, 0, 1, ['d1', 'd2']), "Gamma")
+    inst_change = (InstanceChange(3, 25), "Beta")
+    node.nodeInBox.extend([prepare, inst_change, commit])
+
+    looper.run(pre_vc_strategy.on_view_change_started(node,
+                                                      ViewChangeStartMessage(1),
+                                                      "some_node"))
+
+    assert processed == [prepare, commit]
+    assert list(pre_vc_strategy.stashedNodeInBox) == [inst_change]
+
+
 def test_the_same_order_as_in_NodeInBox_after_vc_continued(pre_vc_strategy):
     replica = pre_vc_strategy.replica
     pre_vc_strategy.view_changer.view_no = 1
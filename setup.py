@@ -66,6 +66,7 @@ setup(
              'scripts/udp_sender', 'scripts/udp_receiver', 'scripts/filter_log',
              'scripts/log_stats',
              'scripts/init_bls_keys',
+             'scripts/export_state_snapshot',
              'scripts/process_logs/process_logs',
              'scripts/process_logs/process_logs.yml']
 )
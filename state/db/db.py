@@ -7,6 +7,10 @@ class BaseDB:
     def inc_refcount(self, key, value):
         raise NotImplementedError
 
+    def inc_refcounts(self, nodes):
+        for key, value in nodes:
+            self.inc_refcount(key, value)
+
     @abstractmethod
     def dec_refcount(self, key):
         raise NotImplementedError
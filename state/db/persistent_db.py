@@ -26,5 +26,8 @@ class PersistentDB(BaseDB):
     def inc_refcount(self, key, value):
         self._keyValueStorage.put(key, value)
 
+    def inc_refcounts(self, nodes):
+        self._keyValueStorage.setBatch(nodes)
+
     def dec_refcount(self, key):
         pass
@@ -0,0 +1,387 @@
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable, Iterable, Dict
+
+import rlp
+from common.exceptions import PlenumValueError
+from state.db.persistent_db import PersistentDB
+from state.trie.pruning_trie import BLANK_ROOT, Trie, NODE_TYPE_BRANCH, \
+    NODE_TYPE_EXTENSION
+from state.util.utils import encode_int, decode_int
+from storage.kv_store import KeyValueStorage
+
+REFCOUNT_KEY_PREFIX = b'pruning:rc:'
+ROOTS_RANGE_KEY = b'pruning:roots'
+ROOT_KEY_PREFIX = b'pruning:root:'
+DEATH_ROW_RANGE_KEY = b'pruning:death_row'
+DEATH_ROW_KEY_PREFIX = b'pruning:death_row:'
+MIGRATION_KEY = b'pruning:migration'
+
+MIGRATION_MARK = 1
+MIGRATION_SWEEP = 2
+
+
+class PruningPersistentDB(PersistentDB):
+    """
+    Persistent storage of trie nodes which keeps reference counts for the
+    nodes reachable from the last committed roots and removes the nodes
+    which are not reachable from any of them anymore.
+
+    Reference counts are maintained over committed roots only, the trie's own
+    `inc_refcount`/`dec_refcount` calls (which are also made for uncommitted
+    intermediate nodes) just store nodes. A node reference count is the
+    number of references to it from alive parent nodes plus the number of
+    retained roots equal to it, so a node becomes dead exactly when it is
+    unreachable from every retained root.
+
+    The last `keep_roots` committed roots are retained, and if `keep_time`
+    is set a root is also retained until it is at least `keep_time` seconds
+    old, so that reads against roots from the timestamp store keep working
+    within this window.
+
+    Nodes written for uncommitted changes which did not become reachable
+    from a committed root within `keep_roots` commits are garbage too (either
+    intermediate nodes or nodes of reverted changes), so `keep_roots` must not
+    be less than the maximum number of uncommitted batches. Nodes written
+    before a restart and never committed are not tracked.
+
+    Dead nodes are put on a death row and removed in batches by
+    `collect_garbage`, which is supposed to be called periodically.
+
+    When pruning is turned on over a database which already has trie nodes,
+    their reference counts are unknown, so `collect_garbage` migrates the
+    database first, a batch at a time: it marks the nodes reachable from the
+    roots committed since then and afterwards sweeps the unmarked ones onto
+    the death row. Commits only record their roots until marking is done.
+    """
+
+    def __init__(self, keyValueStorage: KeyValueStorage, keep_roots: int,
+                 keep_time: int = 0, get_time: Callable = time.time):
+        if keep_roots < 1:
+            raise PlenumValueError('keep_roots', keep_roots, '>= 1')
+        super().__init__(keyValueStorage)
+        self.keep_roots = keep_roots
+        self.keep_time = keep_time
+        self._get_time = get_time
+        # Nodes written for uncommitted changes which are not reachable
+        # from any committed root yet, with number of the commit after which
+        # they were written last time, and the same grouped by commit number
+        self._commits = 0
+        self._pending = {}  # type: Dict[bytes, int]
+        self._pending_by_commit = OrderedDict()  # type: Dict[int, set]
+        # Reference counts read or changed during the current operation
+        self._refcounts = {}
+        self._changed = set()
+        self._roots_start, self._roots_end = self._load_range(ROOTS_RANGE_KEY)
+        self._death_row_start, self._death_row_end = \
+            self._load_range(DEATH_ROW_RANGE_KEY)
+        self._load_migration()
+
+    def inc_refcount(self, key, value):
+        super().inc_refcount(key, value)
+        self._discard_pending(key)
+        self._pending[key] = self._commits
+        self._pending_by_commit.setdefault(self._commits, set()).add(key)
+
+    def get_refcount(self, key: bytes) -> int:
+        try:
+            return decode_int(self._keyValueStorage.get(REFCOUNT_KEY_PREFIX + key))
+        except KeyError:
+            return 0
+
+    @property
+    def retained_roots(self):
+        return [self._get_root(i)[0]
+                for i in range(self._roots_start, self._roots_end)]
+
+    @property
+    def death_row_size(self):
+        size = 0
+        for i in range(self._death_row_start, self._death_row_end):
+            size += len(self._get_death_row_chunk(i))
+        return size
+
+    @property
+    def is_migrating(self):
+        return self._migration_phase is not None
+
+    def on_commit(self, root_hash: bytes):
+        """
+        Retains the newly committed root, releases roots which are out of
+        the retention window and puts the nodes which became dead
+        on the death row.
+        """
+        self._commits += 1
+        dead = []
+        if root_hash != BLANK_ROOT:
+            # Until migration marks the existing nodes the root is
+            # not counted, it is counted once marking is done
+            if not self._is_marking:
+                self._inc_node(root_hash)
+            self._set_root(self._roots_end, root_hash, int(self._get_time()))
+            self._roots_end += 1
+
+        now = self._get_time()
+        ops = []
+        while not self._is_marking and \
+                self._roots_end - self._roots_start > self.keep_roots:
+            old_root, committed_at = self._get_root(self._roots_start)
+            if self.keep_time and now - committed_at < self.keep_time:
+                break
+            self._dec_node(old_root, dead)
+            ops.append((KeyValueStorage.REMOVE_OP,
+                        self._root_key(self._roots_start), None))
+            self._roots_start += 1
+
+        expired = self._take_expired_pending()
+        if not self._is_marking:
+            # Expired nodes which are not reachable are swept otherwise
+            dead.extend(expired)
+        self._flush(dead, ops)
+
+    def collect_garbage(self, batch_size: int) -> int:
+        """
+        Removes up to `batch_size` dead nodes from storage in a single batch,
+        if the database is being migrated, makes a migration step of up
+        to `batch_size` nodes first
+
+        :return: number of removed nodes
+        """
+        if self._migration_phase == MIGRATION_MARK:
+            self._mark(batch_size)
+        elif self._migration_phase == MIGRATION_SWEEP:
+            self._sweep(batch_size)
+
+        ops = []
+        removed = set()
+        while len(removed) < batch_size and \
+                self._death_row_start < self._death_row_end:
+            chunk = self._get_death_row_chunk(self._death_row_start)
+            to_remove, rest = chunk[:batch_size - len(removed)], \
+                chunk[batch_size - len(removed):]
+            for key in to_remove:
+                # A dead node could have been written again or have become
+                # reachable since it was put on the death row, it also could
+                # have been put on the death row more than once
+                if key in self._pending or key in removed or \
+                        self.get_refcount(key) > 0 or \
+                        key not in self._keyValueStorage:
+                    continue
+                ops.append((KeyValueStorage.REMOVE_OP, key, None))
+                removed.add(key)
+            if rest:
+                ops.append((KeyValueStorage.WRITE_OP,
+                            self._death_row_key(self._death_row_start),
+                            rlp.encode(rest)))
+                break
+            ops.append((KeyValueStorage.REMOVE_OP,
+                        self._death_row_key(self._death_row_start), None))
+            self._death_row_start += 1
+        ops.append(self._range_op(DEATH_ROW_RANGE_KEY,
+                                  self._death_row_start, self._death_row_end))
+        self._keyValueStorage.do_ops_in_batch(ops)
+        return len(removed)
+
+    def _inc_node(self, key: bytes):
+        self._inc_nodes([key])
+
+    def _inc_nodes(self, stack: list, limit: int = None):
+        """
+        Counts references to the nodes on the stack and, if it is the first
+        reference, to their children, stops after `limit` nodes leaving the
+        rest of them on the stack
+        """
+        while stack and (limit is None or limit > 0):
+            key = stack.pop()
+            refcount = self._get_cached_refcount(key)
+            self._set_cached_refcount(key, refcount + 1)
+            self._discard_pending(key)
+            if refcount == 0:
+                # The node has just become alive, so do its children
+                stack.extend(self._child_refs(self._get_node(key)))
+            if limit is not None:
+                limit -= 1
+
+    @property
+    def _is_marking(self):
+        return self._migration_phase == MIGRATION_MARK
+
+    def _mark(self, batch_size: int):
+        if self._marked_roots_end == 0:
+            if self._roots_end == self._roots_start:
+                # Nothing is committed since pruning was turned on, marking
+                # starts from the roots committed after that
+                return
+            self._marked_roots_end = self._roots_end
+            self._mark_stack = [self._get_root(i)[0] for i in
+                                range(self._roots_start, self._roots_end)]
+
+        self._inc_nodes(self._mark_stack, batch_size)
+        if not self._mark_stack:
+            # Roots committed while marking share most of the nodes with
+            # the marked ones, so counting them is as cheap as a commit
+            for i in range(self._marked_roots_end, self._roots_end):
+                self._inc_node(self._get_root(i)[0])
+            self._migration_phase = MIGRATION_SWEEP
+        self._flush([], [self._migration_op()])
+
+    def _sweep(self, batch_size: int):
+        dead = []
+        keys = islice(self._keyValueStorage.iterator(
+            start=self._sweep_cursor or None, include_value=False),
+            batch_size + 1)
+        for key in keys:
+            key = bytes(key)
+            if key == self._sweep_cursor:
+                continue
+            self._sweep_cursor = key
+            if len(key) == 32 and key not in self._pending and \
+                    self.get_refcount(key) == 0:
+                dead.append(key)
+            batch_size -= 1
+            if batch_size == 0:
+                break
+        else:
+            self._migration_phase = None
+        self._flush(dead, [self._migration_op()])
+
+    def _dec_node(self, key: bytes, dead: list):
+        stack = [key]
+        while stack:
+            key = stack.pop()
+            refcount = self._get_cached_refcount(key)
+            if refcount == 0:
+                continue
+            self._set_cached_refcount(key, refcount - 1)
+            if refcount == 1:
+                dead.append(key)
+                stack.extend(self._child_refs(self._get_node(key)))
+
+    def _take_expired_pending(self) -> list:
+        expired = []
+        while self._pending_by_commit:
+            commit, keys = next(iter(self._pending_by_commit.items()))
+            if self._commits - commit <= self.keep_roots:
+                break
+            self._pending_by_commit.popitem(last=False)
+            for key in keys:
+                del self._pending[key]
+                if self._get_cached_refcount(key) == 0:
+                    expired.append(key)
+        return expired
+
+    def _discard_pending(self, key: bytes):
+        commit = self._pending.pop(key, None)
+        if commit is not None:
+            self._pending_by_commit[commit].discard(key)
+
+    def _child_refs(self, node) -> Iterable[bytes]:
+        node_type = Trie._get_node_type(node)
+        if node_type == NODE_TYPE_BRANCH:
+            items = node[:16]
+        elif node_type == NODE_TYPE_EXTENSION:
+            items = [node[1]]
+        else:
+            items = []
+        for item in items:
+            if isinstance(item, list):
+                # Nodes shorter than 32 bytes are embedded into their parents
+                yield from self._child_refs(item)
+            elif len(item) == 32:
+                yield item
+
+    def _get_node(self, key: bytes):
+        return rlp.decode(self._keyValueStorage.get(key))
+
+    def _get_cached_refcount(self, key: bytes) -> int:
+        if key not in self._refcounts:
+            self._refcounts[key] = self.get_refcount(key)
+        return self._refcounts[key]
+
+    def _set_cached_refcount(self, key: bytes, refcount: int):
+        self._refcounts[key] = refcount
+        self._changed.add(key)
+
+    def _flush(self, dead: list, ops: list):
+        for key in self._changed:
+            refcount = self._refcounts[key]
+            if refcount > 0:
+                ops.append((KeyValueStorage.WRITE_OP,
+                            REFCOUNT_KEY_PREFIX + key, encode_int(refcount)))
+            else:
+                ops.append((KeyValueStorage.REMOVE_OP,
+                            REFCOUNT_KEY_PREFIX + key, None))
+        if dead:
+            ops.append((KeyValueStorage.WRITE_OP,
+                        self._death_row_key(self._death_row_end),
+                        rlp.encode(dead)))
+            self._death_row_end += 1
+        ops.append(self._range_op(ROOTS_RANGE_KEY,
+                                  self._roots_start, self._roots_end))
+        ops.append(self._range_op(DEATH_ROW_RANGE_KEY,
+                                  self._death_row_start, self._death_row_end))
+        self._keyValueStorage.do_ops_in_batch(ops)
+        self._refcounts.clear()
+        self._changed.clear()
+
+    def _load_migration(self):
+        self._migration_phase = None
+        self._marked_roots_end = 0
+        self._mark_stack = []
+        self._sweep_cursor = b''
+        if MIGRATION_KEY in self._keyValueStorage:
+            phase, marked_roots_end, self._mark_stack, self._sweep_cursor = \
+                rlp.decode(self._keyValueStorage.get(MIGRATION_KEY))
+            self._migration_phase = decode_int(phase)
+            self._marked_roots_end = decode_int(marked_roots_end)
+        elif ROOTS_RANGE_KEY not in self._keyValueStorage and \
+                any(len(key) == 32 for key in self._keyValueStorage.iterator(
+                    include_value=False)):
+            # There are nodes written while pruning was turned off
+            self._migration_phase = MIGRATION_MARK
+            self._keyValueStorage.do_ops_in_batch([self._migration_op()])
+
+    def _migration_op(self):
+        if self._migration_phase is None:
+            return KeyValueStorage.REMOVE_OP, MIGRATION_KEY, None
+        return KeyValueStorage.WRITE_OP, MIGRATION_KEY, rlp.encode(
+            [encode_int(self._migration_phase),
+             encode_int(self._marked_roots_end),
+             self._mark_stack, self._sweep_cursor])
+
+    def _load_range(self, key: bytes):
+        try:
+            start, end = rlp.decode(self._keyValueStorage.get(key))
+            return decode_int(start), decode_int(end)
+        except KeyError:
+            return 0, 0
+
+    @staticmethod
+    def _range_op(key: bytes, start: int, end: int):
+        return KeyValueStorage.WRITE_OP, key, \
+            rlp.encode([encode_int(start), encode_int(end)])
+
+    @staticmethod
+    def _root_key(i: int) -> bytes:
+        return ROOT_KEY_PREFIX + str(i).encode()
+
+    @staticmethod
+    def _death_row_key(i: int) -> bytes:
+        return DEATH_ROW_KEY_PREFIX + str(i).encode()
+
+    def _get_root(self, i: int):
+        root_hash, committed_at = rlp.decode(
+            self._keyValueStorage.get(self._root_key(i)))
+        return root_hash, decode_int(committed_at)
+
+    def _set_root(self, i: int, root_hash: bytes, committed_at: int):
+        self._keyValueStorage.put(
+            self._root_key(i),
+            rlp.encode([root_hash, encode_int(committed_at)]))
+
+    def _get_death_row_chunk(self, i: int) -> list:
+        try:
+            return rlp.decode(self._keyValueStorage.get(self._death_row_key(i)))
+        except KeyError:
+            return []
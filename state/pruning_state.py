@@ -1,10 +1,13 @@
 from binascii import unhexlify
-from typing import Optional
+from typing import Optional, Iterable, Tuple
 
+from common.exceptions import LogicError
 from state.db.persistent_db import PersistentDB
+from state.db.pruning_db import PruningPersistentDB
 from state.state import State
 from state.trie.pruning_trie import BLANK_ROOT, Trie, BLANK_NODE, \
     bin_to_nibbles
+from state.trie.sorted_trie_builder import SortedTrieBuilder
 from state.util.fast_rlp import encode_optimized as rlp_encode, \
     decode_optimized as rlp_decode
 from state.util.utils import to_string, isHex
@@ -25,17 +28,33 @@ class PruningState(State):
     # SOME KEY THAT DOES NOT COLLIDE WITH ANY STATE VARIABLE'S NAME
     rootHashKey = b'\x88\xc8\x88 \x9a\xa7\x89\x1b'
 
-    def __init__(self, keyValueStorage: KeyValueStorage):
+    def __init__(self, keyValueStorage: KeyValueStorage,
+                 keep_roots: int = 0, keep_time: int = 0):
+        """
+        :param keep_roots: if positive, enables pruning of trie nodes which
+        are not reachable from the last `keep_roots` committed roots, it must
+        not be less than the maximum number of uncommitted batches
+        :param keep_time: if pruning is enabled, committed roots are also
+        kept for at least `keep_time` seconds
+        """
         self._kv = keyValueStorage
         if self.rootHashKey in self._kv:
             rootHash = bytes(self._kv.get(self.rootHashKey))
         else:
             rootHash = BLANK_ROOT
             self._kv.put(self.rootHashKey, BLANK_ROOT)
+        if keep_roots > 0:
+            self._db = PruningPersistentDB(self._kv, keep_roots, keep_time)
+        else:
+            self._db = PersistentDB(self._kv)
         self._trie = Trie(
-            PersistentDB(self._kv),
+            self._db,
             rootHash)
 
+    @property
+    def is_pruning(self):
+        return isinstance(self._db, PruningPersistentDB)
+
     @property
     def head(self):
         # The current head of the state, if the state is a merkle tree then
@@ -78,8 +97,31 @@ class PruningState(State):
 
     def get_all_leaves_for_root_hash(self, root_hash):
         node = self._hash_to_node(root_hash)
-        leaves = self._trie.to_dict(node)
-        return leaves
+        return dict(self._trie.iter_leaves(node))
+
+    def iter_leaves_for_root_hash(self, root_hash, prefix: bytes = b'',
+                                  start: bytes = None, end: bytes = None):
+        """
+        Lazily yields decoded (key, value) pairs of the trie with the given
+        root in key order, only keys with the given `prefix` and
+        in range [`start`, `end`) are yielded
+        """
+        node = self._hash_to_node(root_hash)
+        for key, value in self._trie.iter_leaves(node, prefix, start, end):
+            yield key, self.get_decoded(value)
+
+    def set_sorted(self, items: Iterable[Tuple[bytes, bytes]],
+                   batch_size: int = 1000):
+        """
+        Sets all (key, value) pairs, sorted by key with no duplicates, in the
+        empty uncommitted head at once. It is much faster than setting them
+        one by one since each trie node is written only once.
+        """
+        if self.headHash != BLANK_ROOT:
+            raise LogicError('sorted items can be set in empty state only')
+        builder = SortedTrieBuilder(self._db, batch_size)
+        self._trie.root_node = builder.build(
+            (key, rlp_encode([value])) for key, value in items)
 
     def remove(self, key: bytes):
         self._trie.delete(key)
@@ -96,11 +138,24 @@ class PruningState(State):
         else:
             rootHash = self.headHash
         self._kv.put(self.rootHashKey, rootHash)
+        if self.is_pruning:
+            self._db.on_commit(bytes(rootHash))
 
     def revertToHead(self, headHash=None):
         head = self._hash_to_node(headHash)
         self._trie.replace_root_hash(self._trie.root_node, head)
 
+    def collect_garbage(self, batch_size: int) -> int:
+        """
+        Removes up to `batch_size` trie nodes which are not reachable
+        from the retained committed roots anymore
+
+        :return: number of removed nodes
+        """
+        if not self.is_pruning:
+            return 0
+        return self._db.collect_garbage(batch_size)
+
     # Proofs are always generated over committed state
     def generate_state_proof(self, key: bytes, root=None, serialize=False, get_value=False):
         return self._trie.generate_state_proof(key, root, serialize, get_value=get_value)
@@ -129,8 +184,7 @@ class PruningState(State):
 
     @property
     def as_dict(self):
-        d = self._trie.to_dict()
-        return {k: self.get_decoded(v) for k, v in d.items()}
+        return {k: self.get_decoded(v) for k, v in self._trie.iter_leaves()}
 
     @property
     def headHash(self):
@@ -0,0 +1,182 @@
+import hashlib
+import struct
+from typing import NamedTuple, Optional, Dict, Any
+
+import rlp
+from common.exceptions import PlenumValueError
+from common.serializers.json_serializer import JsonSerializer
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import BLANK_ROOT
+from state.util.utils import encode_int, decode_int
+
+SNAPSHOT_MAGIC = b'plenum-state-snapshot'
+SNAPSHOT_VERSION = 1
+
+RECORD_HEADER = b'H'
+RECORD_CHUNK = b'C'
+RECORD_END = b'E'
+
+# Each record is a length prefixed rlp encoded payload followed by
+# sha256 checksum of the payload
+RECORD_LEN_FORMAT = '>I'
+RECORD_LEN_SIZE = struct.calcsize(RECORD_LEN_FORMAT)
+CHECKSUM_SIZE = 32
+
+StateSnapshotHeader = NamedTuple("StateSnapshotHeader", [
+    ("root_hash", bytes),
+    ("meta", Dict[str, Any])])
+
+
+class StateSnapshotError(Exception):
+    pass
+
+
+def export_state_snapshot(state: PruningState, stream, root_hash=None,
+                          meta: Dict[str, Any] = None,
+                          chunk_size: int = 1000) -> int:
+    """
+    Writes all leaves of the state trie for the given root (committed root
+    by default) to the binary `stream` as a snapshot which can be loaded into
+    an empty state with `import_state_snapshot`.
+
+    The snapshot is a header with the root hash and arbitrary `meta`
+    information, leaves split into chunks of up to `chunk_size` leaves and
+    a trailer with the total number of leaves and chunks. Every record
+    has its own checksum.
+
+    :return: number of exported leaves
+    """
+    if chunk_size < 1:
+        raise PlenumValueError('chunk_size', chunk_size, '>= 1')
+    root_hash = bytes(root_hash or state.committedHeadHash)
+    _write_record(stream, [RECORD_HEADER,
+                           SNAPSHOT_MAGIC,
+                           encode_int(SNAPSHOT_VERSION),
+                           root_hash,
+                           JsonSerializer.dumps(meta or {})])
+    leaves_count = chunks_count = 0
+    chunk = []
+    leaves = state.iter_leaves_for_root_hash(root_hash) \
+        if root_hash != BLANK_ROOT else []
+    for key, value in leaves:
+        chunk.append([key, value])
+        if len(chunk) == chunk_size:
+            _write_record(stream, [RECORD_CHUNK, chunk])
+            leaves_count += len(chunk)
+            chunks_count += 1
+            chunk = []
+    if chunk:
+        _write_record(stream, [RECORD_CHUNK, chunk])
+        leaves_count += len(chunk)
+        chunks_count += 1
+    _write_record(stream, [RECORD_END,
+                           encode_int(leaves_count),
+                           encode_int(chunks_count)])
+    return leaves_count
+
+
+def read_state_snapshot_header(stream) -> StateSnapshotHeader:
+    record = _read_record(stream)
+    if record is None or record[0] != RECORD_HEADER or len(record) != 5:
+        raise StateSnapshotError('snapshot header is missing')
+    _, magic, version, root_hash, meta = record
+    if magic != SNAPSHOT_MAGIC:
+        raise StateSnapshotError('not a state snapshot')
+    if decode_int(version) != SNAPSHOT_VERSION:
+        raise StateSnapshotError('unsupported snapshot version {}'
+                                 .format(decode_int(version)))
+    return StateSnapshotHeader(root_hash, JsonSerializer.loads(meta))
+
+
+def import_state_snapshot(state: PruningState, stream,
+                          expected_root: Optional[bytes] = None,
+                          header: Optional[StateSnapshotHeader] = None) \
+        -> StateSnapshotHeader:
+    """
+    Loads a snapshot written by `export_state_snapshot` into an empty state
+    and commits it if the resulting root matches the root in the snapshot
+    header and `expected_root` if it is given. If the snapshot is corrupted
+    or the roots don't match, uncommitted changes are reverted and
+    `StateSnapshotError` is raised.
+
+    :param header: header of the snapshot if it was already read
+    from the stream by `read_state_snapshot_header`
+    """
+    if not state.isEmpty:
+        raise StateSnapshotError('state is not empty')
+    if header is None:
+        header = read_state_snapshot_header(stream)
+    if expected_root is not None and bytes(expected_root) != header.root_hash:
+        raise StateSnapshotError('snapshot root {} is not the expected one {}'
+                                 .format(header.root_hash, expected_root))
+    try:
+        try:
+            state.set_sorted(_iter_leaves(stream))
+        except PlenumValueError as ex:
+            raise StateSnapshotError('snapshot leaves are not sorted') from ex
+        if bytes(state.headHash) != header.root_hash:
+            raise StateSnapshotError('resulting root {} does not match snapshot '
+                                     'root {}'.format(state.headHash,
+                                                      header.root_hash))
+    except Exception:
+        state.revertToHead(state.committedHeadHash)
+        raise
+    state.commit(rootHash=header.root_hash)
+    return header
+
+
+def _iter_leaves(stream):
+    leaves_count = chunks_count = 0
+    while True:
+        record = _read_record(stream)
+        if record is None:
+            raise StateSnapshotError('snapshot is truncated')
+        if record[0] == RECORD_CHUNK and len(record) == 2:
+            for leaf in record[1]:
+                if not isinstance(leaf, list) or len(leaf) != 2 or \
+                        not all(isinstance(item, bytes) for item in leaf):
+                    raise StateSnapshotError('malformed snapshot leaf')
+                yield leaf[0], leaf[1]
+            leaves_count += len(record[1])
+            chunks_count += 1
+        elif record[0] == RECORD_END and len(record) == 3:
+            if (decode_int(record[1]), decode_int(record[2])) != \
+                    (leaves_count, chunks_count):
+                raise StateSnapshotError('snapshot has {} leaves in {} chunks '
+                                         'instead of {} in {}'
+                                         .format(leaves_count, chunks_count,
+                                                 decode_int(record[1]),
+                                                 decode_int(record[2])))
+            return
+        else:
+            raise StateSnapshotError('unexpected snapshot record {}'
+                                     .format(record[0]))
+
+
+def _write_record(stream, payload: list):
+    data = rlp.encode(payload)
+    stream.write(struct.pack(RECORD_LEN_FORMAT, len(data)))
+    stream.write(data)
+    stream.write(hashlib.sha256(data).digest())
+
+
+def _read_record(stream) -> Optional[list]:
+    size = stream.read(RECORD_LEN_SIZE)
+    if not size:
+        return None
+    if len(size) != RECORD_LEN_SIZE:
+        raise StateSnapshotError('snapshot is truncated')
+    size, = struct.unpack(RECORD_LEN_FORMAT, size)
+    data = stream.read(size)
+    checksum = stream.read(CHECKSUM_SIZE)
+    if len(data) != size or len(checksum) != CHECKSUM_SIZE:
+        raise StateSnapshotError('snapshot is truncated')
+    if hashlib.sha256(data).digest() != checksum:
+        raise StateSnapshotError('snapshot record checksum mismatch')
+    try:
+        record = rlp.decode(data)
+    except rlp.DecodingError as ex:
+        raise StateSnapshotError('malformed snapshot record') from ex
+    if not isinstance(record, list) or not record:
+        raise StateSnapshotError('malformed snapshot record')
+    return record
@@ -1 +1,306 @@
-# TODO: Benchmark CRUD over the Trie.
+#! /usr/bin/env python3
+"""
+Benchmarks of state trie operations over different key-value storages.
+
+Every case is run `--repeat` times on a freshly filled state with the same
+pseudo random keys and values (defined by `--seed`), results are printed and,
+if `--out` is given, written as JSON so they can be compared between runs:
+
+    python -m state.test.bench --keys 10000 --out bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from hashlib import sha256
+from typing import List, Tuple, Callable, Dict, Any
+
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+from storage.kv_store_leveldb import KeyValueStorageLeveldb
+from storage.kv_store_rocksdb import KeyValueStorageRocksdb
+
+BACKENDS = ('memory', 'leveldb', 'rocksdb')
+KEYS_PER_PREFIX = 16
+
+# A case gets the state filled with `items` and a factory of empty states
+# with the same storage, and returns a function doing the measured
+# operations and returning the number of operations made
+Case = Callable[[PruningState, List[Tuple[bytes, bytes]], random.Random,
+                 Callable[[], PruningState]],
+                Callable[[], int]]
+
+
+def make_items(count: int, seed: int, sequential: bool) -> List[Tuple[bytes, bytes]]:
+    rnd = random.Random(seed)
+    items = []
+    for i in range(count):
+        if sequential:
+            # Keys with common prefixes, like keys of related entities
+            key = 'key:{:08}:{:02}'.format(i // KEYS_PER_PREFIX,
+                                           i % KEYS_PER_PREFIX).encode()
+        else:
+            key = sha256('{}:{}'.format(seed, i).encode()).digest()
+        items.append((key, bytes(rnd.getrandbits(8) for _ in range(64))))
+    return items
+
+
+def fill(state: PruningState, items, commit=True):
+    for key, value in items:
+        state.set(key, value)
+    if commit:
+        state.commit(state.headHash)
+
+
+def case_set(state, items, rnd, new_state):
+    new_items = [(key, value[::-1]) for key, value in items]
+    rnd.shuffle(new_items)
+
+    def run():
+        fill(state, new_items, commit=False)
+        return len(new_items)
+    return run
+
+
+def case_set_sequential(state, items, rnd, new_state):
+    new_items = sorted((key, value[::-1]) for key, value in items)
+
+    def run():
+        fill(state, new_items, commit=False)
+        return len(new_items)
+    return run
+
+
+def case_get_committed(state, items, rnd, new_state):
+    keys = [key for key, _ in items]
+    rnd.shuffle(keys)
+
+    def run():
+        for key in keys:
+            state.get(key, isCommitted=True)
+        return len(keys)
+    return run
+
+
+def case_get_uncommitted(state, items, rnd, new_state):
+    keys = [key for key, _ in items]
+    rnd.shuffle(keys)
+    # Make uncommitted head differ from the committed one
+    fill(state, items[:len(items) // 10 + 1], commit=False)
+    state.set(keys[0], b'uncommitted')
+
+    def run():
+        for key in keys:
+            state.get(key, isCommitted=False)
+        return len(keys)
+    return run
+
+
+def case_revert_to_head(state, items, rnd, new_state):
+    batches = [items[i:i + 10] for i in range(0, len(items), 10)]
+    batches = [[(key, value[::-1]) for key, value in batch] for batch in batches]
+
+    def run():
+        for batch in batches:
+            fill(state, batch, commit=False)
+            state.revertToHead(state.committedHeadHash)
+        return len(batches)
+    return run
+
+
+def case_proof(state, items, rnd, new_state):
+    keys = [key for key, _ in rnd.sample(items, min(len(items), 1000))]
+
+    def run():
+        for key in keys:
+            state.generate_state_proof(key, serialize=True)
+        return len(keys)
+    return run
+
+
+def case_proof_verification(state, items, rnd, new_state):
+    root = bytes(state.committedHeadHash)
+    proofs = [(key, value, state.generate_state_proof(key, serialize=True))
+              for key, value in rnd.sample(items, min(len(items), 1000))]
+
+    def run():
+        for key, value, proof in proofs:
+            assert PruningState.verify_state_proof(root, key, value, proof,
+                                                   serialized=True)
+        return len(proofs)
+    return run
+
+
+def _prefixes(items, rnd):
+    # For sequential keys every prefix matches KEYS_PER_PREFIX keys,
+    # for random keys a 1 byte prefix matches 1/256 of all keys
+    prefixes = {key[:len(key) - 3] if key.startswith(b'key:') else key[:1]
+                for key, _ in items}
+    return rnd.sample(sorted(prefixes), min(len(prefixes), 100))
+
+
+def case_multi_proof(state, items, rnd, new_state):
+    prefixes = _prefixes(items, rnd)
+
+    def run():
+        for prefix in prefixes:
+            state.generate_state_proof_for_keys_with_prefix(prefix,
+                                                            serialize=True)
+        return len(prefixes)
+    return run
+
+
+def case_multi_proof_verification(state, items, rnd, new_state):
+    root = bytes(state.committedHeadHash)
+    proofs = []
+    for prefix in _prefixes(items, rnd):
+        proof, values = state.generate_state_proof_for_keys_with_prefix(
+            prefix, serialize=True, get_value=True)
+        values = {k: state.get_decoded(v) for k, v in values.items()}
+        proofs.append((values, proof))
+
+    def run():
+        for values, proof in proofs:
+            assert PruningState.verify_state_proof_multi(root, values, proof,
+                                                         serialized=True)
+        return len(proofs)
+    return run
+
+
+def case_rebuild(state, items, rnd, new_state):
+    sorted_items = sorted(items)
+
+    def run():
+        rebuilt = new_state()
+        fill(rebuilt, sorted_items)
+        return len(sorted_items)
+    return run
+
+
+def case_rebuild_sorted(state, items, rnd, new_state):
+    sorted_items = sorted(items)
+
+    def run():
+        rebuilt = new_state()
+        rebuilt.set_sorted(sorted_items)
+        rebuilt.commit()
+        return len(sorted_items)
+    return run
+
+
+CASES = {
+    'set': case_set,
+    'set_sequential': case_set_sequential,
+    'get_committed': case_get_committed,
+    'get_uncommitted': case_get_uncommitted,
+    'revert_to_head': case_revert_to_head,
+    'proof': case_proof,
+    'proof_verification': case_proof_verification,
+    'multi_proof': case_multi_proof,
+    'multi_proof_verification': case_multi_proof_verification,
+    'rebuild': case_rebuild,
+    'rebuild_sorted': case_rebuild_sorted,
+}  # type: Dict[str, Case]
+
+
+def create_storage(backend: str, db_dir: str, db_name: str):
+    if backend == 'memory':
+        return KeyValueStorageInMemory()
+    if backend == 'leveldb':
+        return KeyValueStorageLeveldb(db_dir, db_name)
+    if backend == 'rocksdb':
+        return KeyValueStorageRocksdb(db_dir, db_name)
+    raise ValueError('Unknown backend {}'.format(backend))
+
+
+def run_case(backend: str, case: Case, items, seed: int, repeat: int):
+    timings = []
+    ops = 0
+    for i in range(repeat):
+        db_dir = tempfile.mkdtemp()
+        states = []
+
+        def new_state():
+            states.append(PruningState(create_storage(
+                backend, db_dir, 'bench_state_{}'.format(len(states)))))
+            return states[-1]
+
+        try:
+            state = new_state()
+            fill(state, items)
+            run = case(state, items, random.Random(seed + i), new_state)
+            start = time.perf_counter()
+            ops = run()
+            timings.append(time.perf_counter() - start)
+        finally:
+            for state in states:
+                state.close()
+            shutil.rmtree(db_dir, ignore_errors=True)
+    best = min(timings)
+    return {
+        'ops': ops,
+        'best_sec': best,
+        'median_sec': statistics.median(timings),
+        'ops_per_sec': ops / best if best else None,
+    }
+
+
+def run_benchmarks(backends, cases, keys: int, seed: int, repeat: int,
+                   log=print) -> Dict[str, Any]:
+    results = []
+    for key_kind in ('random', 'sequential'):
+        items = make_items(keys, seed, sequential=key_kind == 'sequential')
+        for backend in backends:
+            for name in cases:
+                try:
+                    result = run_case(backend, CASES[name], items, seed, repeat)
+                except RuntimeError as ex:
+                    # Backend is not available
+                    log('{} skipped: {}'.format(backend, ex))
+                    break
+                result.update(backend=backend, case=name, keys=key_kind)
+                log('{keys:>10} {backend:>8} {case:>25}: {ops:>7} ops, '
+                    '{best_sec:.4f} sec, {ops_per_sec:,.0f} ops/sec'
+                    .format(**result))
+                results.append(result)
+    return {
+        'params': {'keys': keys, 'seed': seed, 'repeat': repeat},
+        'env': {'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()},
+        'results': results,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='State trie benchmarks')
+    parser.add_argument('--keys', type=int, default=10000,
+                        help='number of keys in state')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of runs of every case, '
+                             'the best one is reported')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS,
+                        default=list(BACKENDS))
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES),
+                        default=list(CASES))
+    parser.add_argument('--out', help='file to write results as JSON')
+    args = parser.parse_args(args)
+
+    report = run_benchmarks(args.backends, args.cases, args.keys, args.seed,
+                            args.repeat)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+import pytest
+
+from state.db.pruning_db import MIGRATION_SWEEP
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import BLANK_ROOT
+from storage.kv_in_memory import KeyValueStorageInMemory
+from storage.kv_store_leveldb import KeyValueStorageLeveldb
+
+KEYS_NUM = 50
+
+
+@pytest.fixture(scope="function", params=['leveldb', 'in_memory'])
+def kv(request, tempdir):
+    if request.param == 'leveldb':
+        kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    else:
+        kv = KeyValueStorageInMemory()
+    yield kv
+    kv.close()
+
+
+def node_keys(kv):
+    return {bytes(k) for k in kv.iterator(include_value=False) if len(k) == 32}
+
+
+def reachable_node_keys(state, root_hashes):
+    db = state._db
+    reachable = set()
+    stack = [root for root in root_hashes if root != BLANK_ROOT]
+    while stack:
+        key = stack.pop()
+        if key in reachable:
+            continue
+        reachable.add(key)
+        stack.extend(db._child_refs(db._get_node(key)))
+    return reachable
+
+
+def collect_all_garbage(state):
+    while state._db.death_row_size > 0:
+        state.collect_garbage(10)
+
+
+def make_batches(state, batches, commit=True, start=0):
+    roots = []
+    for b in range(start, start + batches):
+        for k in range(KEYS_NUM):
+            state.set('k{}'.format(k).encode(), 'v{}_{}'.format(k, b).encode())
+        if commit:
+            state.commit(state.headHash)
+        roots.append(state.headHash)
+    return roots
+
+
+def test_unpruned_state_keeps_all_nodes(kv):
+    state = PruningState(kv)
+    make_batches(state, 5)
+    nodes_before_gc = node_keys(kv)
+
+    assert state.collect_garbage(1000) == 0
+    assert node_keys(kv) == nodes_before_gc
+
+
+def test_pruned_state_keeps_only_retained_roots(kv):
+    state = PruningState(kv, keep_roots=2)
+    roots = make_batches(state, 5)
+    collect_all_garbage(state)
+
+    assert state._db.retained_roots == roots[-2:]
+    for root in roots[-2:]:
+        for k in range(KEYS_NUM):
+            assert state.get_for_root_hash(root, 'k{}'.format(k).encode()) is not None
+    with pytest.raises(KeyError):
+        state.get_for_root_hash(roots[0], b'k0')
+
+    unpruned_kv = KeyValueStorageInMemory()
+    unpruned = PruningState(unpruned_kv)
+    make_batches(unpruned, 5)
+    assert len(node_keys(kv)) < len(node_keys(unpruned_kv))
+
+    # Intermediate nodes of the last batches are collected
+    # after `keep_roots` commits
+    state.commit(roots[-1])
+    state.commit(roots[-1])
+    collect_all_garbage(state)
+    assert node_keys(kv) == reachable_node_keys(state, [roots[-1]])
+
+
+def test_pruned_state_removes_reverted_nodes(kv):
+    state = PruningState(kv, keep_roots=1)
+    make_batches(state, 1)
+
+    make_batches(state, 3, commit=False, start=1)
+    state.revertToHead(state.committedHeadHash)
+    # Nodes of uncommitted changes are collected after `keep_roots` commits
+    committed_root = bytes(state.committedHeadHash)
+    state.commit(committed_root)
+    state.commit(committed_root)
+    collect_all_garbage(state)
+
+    assert node_keys(kv) == reachable_node_keys(state, [committed_root])
+
+
+def test_pruned_state_keeps_uncommitted_batches(kv):
+    state = PruningState(kv, keep_roots=3)
+    make_batches(state, 1)
+
+    # Commit batches one by one while there are more uncommitted ones,
+    # the last batch returns the state to the first batch root
+    uncommitted_roots = make_batches(state, 2, commit=False, start=1)
+    uncommitted_roots.extend(make_batches(state, 1, commit=False, start=0))
+    for i, root in enumerate(uncommitted_roots):
+        state.commit(root)
+        collect_all_garbage(state)
+        for root in uncommitted_roots[i:]:
+            assert state.get_for_root_hash(root, b'k0') is not None
+        for k in range(KEYS_NUM):
+            assert state.get('k{}'.format(k).encode(), isCommitted=False) == \
+                'v{}_{}'.format(k, 0).encode()
+
+
+def test_same_nodes_written_again_are_not_removed(kv):
+    state = PruningState(kv, keep_roots=1)
+    state.set(b'k1', b'v1')
+    state.commit(state.headHash)
+    first_root = state.headHash
+
+    state.set(b'k1', b'v2')
+    state.commit(state.headHash)
+
+    # Nodes of the first root are on the death row now, bring them back
+    state.set(b'k1', b'v1')
+    state.commit(state.headHash)
+    collect_all_garbage(state)
+
+    assert state.headHash == first_root
+    assert state.get(b'k1') == b'v1'
+
+
+def test_roots_are_kept_for_keep_time(kv):
+    now = 1000
+    state = PruningState(kv, keep_roots=1, keep_time=10)
+    state._db._get_time = lambda: now
+    roots = make_batches(state, 3)
+    collect_all_garbage(state)
+    assert state._db.retained_roots == roots
+
+    now += 10
+    make_batches(state, 1, start=3)
+    collect_all_garbage(state)
+    assert len(state._db.retained_roots) == 1
+    with pytest.raises(KeyError):
+        state.get_for_root_hash(roots[0], b'k0')
+
+
+def test_pruning_survives_restart(tempdir):
+    kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    state = PruningState(kv, keep_roots=2)
+    roots = make_batches(state, 3)
+    state.close()
+
+    kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    state = PruningState(kv, keep_roots=2)
+    roots.extend(make_batches(state, 2, start=3))
+    collect_all_garbage(state)
+
+    assert state._db.retained_roots == roots[-2:]
+    assert state._db.death_row_size == 0
+    for k in range(KEYS_NUM):
+        assert state.get('k{}'.format(k).encode()) == 'v{}_{}'.format(k, 4).encode()
+    state.close()
+
+
+def migrate(state, batch_size=10):
+    while state._db.is_migrating:
+        state.collect_garbage(batch_size)
+
+
+def test_pruning_not_migrating_new_db(kv):
+    state = PruningState(kv, keep_roots=2)
+    make_batches(state, 1)
+
+    assert not state._db.is_migrating
+
+
+def test_pruning_turned_on_over_existing_db(kv):
+    unpruned = PruningState(kv)
+    make_batches(unpruned, 5)
+    nodes_before_pruning = node_keys(kv)
+
+    state = PruningState(kv, keep_roots=2)
+    assert state._db.is_migrating
+    # Existing nodes are not walked on commit
+    roots = make_batches(state, 1, start=5)
+    assert state._db.get_refcount(roots[0]) == 0
+
+    state.collect_garbage(10)
+    # Roots committed while marking are counted when it is done
+    roots.extend(make_batches(state, 2, start=6))
+    migrate(state)
+    state.commit(roots[-1])
+    state.commit(roots[-1])
+    collect_all_garbage(state)
+
+    assert state._db.retained_roots == [roots[-1], roots[-1]]
+    assert node_keys(kv) == reachable_node_keys(state, [roots[-1]])
+    assert len(node_keys(kv)) < len(nodes_before_pruning)
+    for k in range(KEYS_NUM):
+        assert state.get('k{}'.format(k).encode()) == 'v{}_{}'.format(k, 7).encode()
+
+
+def test_migration_survives_restart(tempdir):
+    kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    unpruned = PruningState(kv)
+    make_batches(unpruned, 5)
+    unpruned.close()
+
+    kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    state = PruningState(kv, keep_roots=2)
+    make_batches(state, 1, start=5)
+    # Stop in the middle of marking and then of sweeping
+    state.collect_garbage(10)
+    state.close()
+    kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    state = PruningState(kv, keep_roots=2)
+    assert state._db.is_migrating
+    while state._db._migration_phase != MIGRATION_SWEEP:
+        state.collect_garbage(10)
+    state.collect_garbage(10)
+    state.close()
+
+    kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    state = PruningState(kv, keep_roots=2)
+    assert state._db.is_migrating
+    roots = make_batches(state, 2, start=6)
+    migrate(state)
+    state.commit(roots[-1])
+    state.commit(roots[-1])
+    collect_all_garbage(state)
+
+    assert state._db.retained_roots == [roots[-1], roots[-1]]
+    assert node_keys(kv) == reachable_node_keys(state, [roots[-1]])
+    for k in range(KEYS_NUM):
+        assert state.get('k{}'.format(k).encode()) == 'v{}_{}'.format(k, 7).encode()
+    state.close()
@@ -0,0 +1,19 @@
+import json
+
+from state.test.bench import main, CASES
+
+
+def test_bench_runs(tmpdir):
+    out = tmpdir.join('bench.json').strpath
+    main(['--keys', '50', '--repeat', '1', '--backends', 'memory', 'leveldb',
+          '--out', out])
+
+    with open(out) as f:
+        report = json.load(f)
+    assert report['params'] == {'keys': 50, 'seed': 0, 'repeat': 1}
+    assert {(r['keys'], r['backend'], r['case']) for r in report['results']} == \
+        {(keys, backend, case)
+         for keys in ('random', 'sequential')
+         for backend in ('memory', 'leveldb')
+         for case in CASES}
+    assert all(r['ops'] > 0 for r in report['results'])
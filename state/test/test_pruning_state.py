@@ -1,4 +1,5 @@
 import copy
+import random
 
 import pytest
 from storage.kv_store import KeyValueStorage
@@ -320,3 +321,42 @@ def test_get_all_leaves_for_root_hash_commited(state):
 def get_decoded_dict_values(state, head_hash):
     encoded_values = state.get_all_leaves_for_root_hash(head_hash)
     return {k: state.get_decoded(v) for k, v in encoded_values.items()}
+
+
+def test_iter_leaves_for_root_hash(state):
+    state.set(b'k1', b'v1')
+    state.set(b'k2', b'v2')
+    head_hash1 = state.headHash
+    state.set(b'k1', b'v111')
+    state.set(b'k3', b'v3')
+
+    assert list(state.iter_leaves_for_root_hash(head_hash1)) == \
+        [(b'k1', b'v1'), (b'k2', b'v2')]
+    assert list(state.iter_leaves_for_root_hash(state.headHash)) == \
+        [(b'k1', b'v111'), (b'k2', b'v2'), (b'k3', b'v3')]
+    assert list(state.iter_leaves_for_root_hash(BLANK_ROOT)) == []
+
+
+def test_iter_leaves_for_root_hash_with_bounds(state):
+    rnd = random.Random(0)
+    items = {}
+    for _ in range(500):
+        key = bytes(rnd.randrange(4) for _ in range(rnd.randint(1, 5)))
+        items[key] = str(rnd.random()).encode()
+        state.set(key, items[key])
+    root = state.headHash
+    all_keys = sorted(items)
+
+    assert [k for k, _ in state.iter_leaves_for_root_hash(root)] == all_keys
+    for bound in [b'', b'\x00', b'\x01', b'\x01\x02', b'\x03\x03\x03', b'\x04']:
+        assert [k for k, _ in state.iter_leaves_for_root_hash(root, prefix=bound)] == \
+            [k for k in all_keys if k.startswith(bound)]
+        assert [k for k, _ in state.iter_leaves_for_root_hash(root, start=bound)] == \
+            [k for k in all_keys if k >= bound]
+        assert [k for k, _ in state.iter_leaves_for_root_hash(root, end=bound)] == \
+            [k for k in all_keys if k < bound]
+        assert [k for k, _ in state.iter_leaves_for_root_hash(
+            root, prefix=b'\x01', start=bound, end=b'\x01\x02\x01')] == \
+            [k for k in all_keys
+             if k.startswith(b'\x01') and bound <= k < b'\x01\x02\x01']
+    assert dict(state.iter_leaves_for_root_hash(root)) == items
@@ -0,0 +1,112 @@
+from io import BytesIO
+
+import pytest
+
+from state.pruning_state import PruningState
+from state.snapshot import export_state_snapshot, import_state_snapshot, \
+    read_state_snapshot_header, StateSnapshotError
+from state.trie.pruning_trie import BLANK_ROOT
+from storage.kv_in_memory import KeyValueStorageInMemory
+from storage.kv_store_leveldb import KeyValueStorageLeveldb
+
+KEYS_NUM = 100
+
+
+@pytest.fixture(scope="function", params=['leveldb', 'in_memory'])
+def kv(request, tempdir):
+    if request.param == 'leveldb':
+        kv = KeyValueStorageLeveldb(tempdir, 'kv')
+    else:
+        kv = KeyValueStorageInMemory()
+    yield kv
+    kv.close()
+
+
+@pytest.fixture(scope="function")
+def state():
+    state = PruningState(KeyValueStorageInMemory())
+    for i in range(KEYS_NUM):
+        state.set('k{}'.format(i).encode(), 'v{}'.format(i).encode())
+    state.commit(state.headHash)
+    yield state
+    state.close()
+
+
+def export(state, **kwargs):
+    stream = BytesIO()
+    export_state_snapshot(state, stream, **kwargs)
+    stream.seek(0)
+    return stream
+
+
+def test_snapshot_export_import(state, kv):
+    stream = export(state, meta={'ledger_size': 10}, chunk_size=7)
+    imported = PruningState(kv)
+
+    header = import_state_snapshot(imported, stream,
+                                   expected_root=state.committedHeadHash)
+
+    assert header.root_hash == bytes(state.committedHeadHash)
+    assert header.meta == {'ledger_size': 10}
+    assert bytes(imported.committedHeadHash) == bytes(state.committedHeadHash)
+    assert imported.as_dict == state.as_dict
+
+
+def test_snapshot_for_old_root(state):
+    old_root = bytes(state.committedHeadHash)
+    state.set(b'k0', b'new')
+    state.commit(state.headHash)
+
+    imported = PruningState(KeyValueStorageInMemory())
+    import_state_snapshot(imported, export(state, root_hash=old_root))
+
+    assert bytes(imported.committedHeadHash) == old_root
+    assert imported.get(b'k0') == b'v0'
+
+
+def test_snapshot_of_empty_state():
+    stream = export(PruningState(KeyValueStorageInMemory()))
+    imported = PruningState(KeyValueStorageInMemory())
+    import_state_snapshot(imported, stream)
+    assert imported.committedHeadHash == BLANK_ROOT
+
+
+def test_snapshot_header_can_be_read_before_import(state):
+    stream = export(state)
+    header = read_state_snapshot_header(stream)
+    imported = PruningState(KeyValueStorageInMemory())
+    assert import_state_snapshot(imported, stream, header=header) == header
+    assert imported.as_dict == state.as_dict
+
+
+def test_corrupted_snapshot_is_not_imported(state):
+    data = bytearray(export(state, chunk_size=10).getvalue())
+    data[len(data) // 2] ^= 0xff
+    imported = PruningState(KeyValueStorageInMemory())
+
+    with pytest.raises(StateSnapshotError):
+        import_state_snapshot(imported, BytesIO(data))
+    assert imported.isEmpty
+    assert imported.headHash == BLANK_ROOT
+
+
+def test_truncated_snapshot_is_not_imported(state):
+    data = export(state, chunk_size=10).getvalue()
+    imported = PruningState(KeyValueStorageInMemory())
+
+    with pytest.raises(StateSnapshotError):
+        import_state_snapshot(imported, BytesIO(data[:len(data) // 2]))
+    assert imported.isEmpty
+    assert imported.headHash == BLANK_ROOT
+
+
+def test_snapshot_with_unexpected_root_is_not_imported(state):
+    imported = PruningState(KeyValueStorageInMemory())
+    with pytest.raises(StateSnapshotError):
+        import_state_snapshot(imported, export(state), expected_root=b'\x01' * 32)
+    assert imported.isEmpty
+
+
+def test_snapshot_is_not_imported_into_non_empty_state(state):
+    with pytest.raises(StateSnapshotError):
+        import_state_snapshot(state, export(state))
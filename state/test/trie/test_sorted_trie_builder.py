@@ -0,0 +1,95 @@
+import random
+from hashlib import sha256
+
+import pytest
+
+from common.exceptions import PlenumValueError
+from state.db.persistent_db import PersistentDB
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import Trie, BLANK_ROOT
+from state.trie.sorted_trie_builder import SortedTrieBuilder
+from state.util.fast_rlp import encode_optimized as rlp_encode
+from state.util.utils import sha3
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+def build_incrementally(items):
+    kv = KeyValueStorageInMemory()
+    trie = Trie(PersistentDB(kv))
+    for key, value in items:
+        trie.update(key, value)
+    return trie.root_hash, kv
+
+
+def build_sorted(items, batch_size=1000):
+    kv = KeyValueStorageInMemory()
+    db = PersistentDB(kv)
+    root = SortedTrieBuilder(db, batch_size).build(sorted(items))
+    trie = Trie(db)
+    trie.root_node = root
+    return trie, kv
+
+
+def random_items(count, seed, max_key_len=8):
+    rnd = random.Random(seed)
+    items = {}
+    while len(items) < count:
+        key = bytes(rnd.randrange(4) for _ in range(rnd.randint(1, max_key_len)))
+        items[key] = rlp_encode([str(rnd.random()).encode()])
+    return list(items.items())
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 17, 100, 1000])
+@pytest.mark.parametrize('seed', range(5))
+def test_sorted_build_gives_same_trie(count, seed):
+    # Keys of few distinct bytes and different lengths make a lot of shared
+    # prefixes, keys which are prefixes of other keys and embedded nodes
+    items = random_items(count, seed)
+    root_hash, kv = build_incrementally(items)
+
+    trie, sorted_kv = build_sorted(items, batch_size=7)
+
+    assert trie.root_hash == root_hash
+    for key, value in items:
+        assert trie.get(key) == value
+    # Only nodes reachable from the root are written
+    assert set(sorted_kv.iterator(include_value=False)) == \
+        {sha3(rlp_encode(node)) for node in trie.all_nodes()}
+
+
+def test_sorted_build_of_hashed_keys():
+    items = [(sha256(str(i).encode()).digest(), rlp_encode([str(i).encode()]))
+             for i in range(500)]
+    root_hash, _ = build_incrementally(items)
+    trie, _ = build_sorted(items)
+    assert trie.root_hash == root_hash
+
+
+def test_sorted_build_of_no_items():
+    db = PersistentDB(KeyValueStorageInMemory())
+    trie = Trie(db)
+    trie.root_node = SortedTrieBuilder(db).build([])
+    assert trie.root_hash == BLANK_ROOT
+
+
+@pytest.mark.parametrize('keys', [[b'b', b'a'], [b'a', b'a'], [b'ab', b'a']])
+def test_sorted_build_fails_for_unsorted_keys(keys):
+    builder = SortedTrieBuilder(PersistentDB(KeyValueStorageInMemory()))
+    with pytest.raises(PlenumValueError):
+        builder.build((key, b'v') for key in keys)
+
+
+def test_state_set_sorted():
+    items = random_items(300, 42)
+    state = PruningState(KeyValueStorageInMemory())
+    for key, value in items:
+        state.set(key, value)
+
+    sorted_state = PruningState(KeyValueStorageInMemory())
+    sorted_state.set_sorted(sorted(items))
+    assert sorted_state.headHash == state.headHash
+    assert sorted_state.committedHeadHash == BLANK_ROOT
+
+    sorted_state.commit()
+    for key, value in items:
+        assert sorted_state.get(key) == value
@@ -943,8 +943,61 @@ class Trie:
             res[key] = value
         return res
 
-    def iter_branch(self):
-        for key_str, value in self._iter_branch(self.root_node):
+    def iter_leaves(self, node=None, prefix: bytes = b'',
+                    start: bytes = None, end: bytes = None):
+        """
+        Lazily yields (key, value) pairs of the trie with the given root node
+        in key order. Only keys with the given `prefix` and in range
+        [`start`, `end`) are yielded, subtrees which can't have such keys
+        are not visited. Memory used does not depend on the size of the trie.
+        """
+        node = self.root_node if node is None else node
+        prefix_nibbles = bin_to_nibbles(to_string(prefix))
+        start_nibbles = bin_to_nibbles(to_string(start)) \
+            if start is not None else None
+        end_nibbles = bin_to_nibbles(to_string(end)) \
+            if end is not None else None
+
+        def can_have_keys(path):
+            # All keys in the subtree start with `path`
+            size = min(len(path), len(prefix_nibbles))
+            if path[:size] != prefix_nibbles[:size]:
+                return False
+            if start_nibbles is not None and \
+                    path < start_nibbles[:len(path)]:
+                return False
+            if end_nibbles is not None and path >= end_nibbles:
+                return False
+            return True
+
+        # Children are pushed in reverse order to pop them in key order
+        stack = [(node, [])]
+        while stack:
+            encoded, path = stack.pop()
+            if encoded == BLANK_NODE or not can_have_keys(path):
+                continue
+            node = self._decode_to_node(encoded)
+            node_type = self._get_node_type(node)
+            if node_type == NODE_TYPE_BRANCH:
+                for i in range(15, -1, -1):
+                    stack.append((node[i], path + [i]))
+                if node[16]:
+                    # Value of a branch goes before its children
+                    stack.append(([pack_nibbles([NIBBLE_TERMINATOR]), node[16]],
+                                  path))
+            elif node_type == NODE_TYPE_EXTENSION:
+                stack.append((node[1],
+                              path + key_nibbles_from_key_value_node(node)))
+            elif node_type == NODE_TYPE_LEAF:
+                key = nibbles_to_bin(path + key_nibbles_from_key_value_node(node))
+                if end is not None and key >= end:
+                    return
+                if key.startswith(prefix) and (start is None or key >= start):
+                    yield key, node[1]
+
+    def iter_branch(self, node=None):
+        node = self.root_node if node is None else node
+        for key_str, value in self._iter_branch(node):
             key = self.nibble_key_str_to_bin(key_str)
             yield key, value
 
@@ -956,7 +1009,7 @@ class Trie:
             Here key is in full form, rather than key of the individual node
         """
         if node == BLANK_NODE:
-            raise StopIteration
+            return
 
         node_type = self._get_node_type(node)
 
@@ -974,14 +1027,15 @@ class Trie:
                 yield (full_key, sub_value)
 
         elif node_type == NODE_TYPE_BRANCH:
+            # The value of a branch goes first to keep keys sorted
+            if node[16]:
+                yield (to_string(NIBBLE_TERMINATOR), node[-1])
             for i in range(16):
                 sub_tree = self._iter_branch(self._decode_to_node(node[i]))
                 for sub_key, sub_value in sub_tree:
                     full_key = (str_to_bytes(str(i)) +
                                 b'+' + sub_key).strip(b'+')
                     yield (full_key, sub_value)
-            if node[16]:
-                yield (to_string(NIBBLE_TERMINATOR), node[-1])
 
     def get(self, key):
         return self._get(self.root_node, bin_to_nibbles(to_string(key)))
@@ -0,0 +1,153 @@
+from typing import Iterable, Tuple, Optional, List
+
+from common.exceptions import PlenumValueError
+from state.db.db import BaseDB
+from state.trie.pruning_trie import BLANK_NODE, bin_to_nibbles, \
+    pack_nibbles, with_terminator, rlp_encode
+from state.util.utils import sha3
+
+
+class _Leaf:
+    __slots__ = ('key', 'value')
+
+    def __init__(self, key: List[int], value: bytes):
+        self.key = key
+        self.value = value
+
+
+class _Branch:
+    # Branch node at `depth` nibbles, `key` is the key of any item below it.
+    # The last added child can still grow, so it is encoded only when the
+    # next child is added or the branch is complete
+    __slots__ = ('depth', 'key', 'node', 'last')
+
+    def __init__(self, depth: int, key: List[int]):
+        self.depth = depth
+        self.key = key
+        self.node = [BLANK_NODE] * 17
+        self.last = None
+
+
+class SortedTrieBuilder:
+    """
+    Builds a trie bottom-up from a stream of (key, value) pairs sorted by key,
+    encoding, hashing and writing every node exactly once in batches of
+    `batch_size` nodes, as opposed to `Trie.update` which rewrites all nodes
+    on the path to the root for every key.
+
+    The resulting trie is the same as if the keys were inserted with
+    `Trie.update` one by one. Values are stored as they are, so they should
+    be encoded the way the trie user expects them.
+    """
+
+    def __init__(self, db: BaseDB, batch_size: int = 1000):
+        if batch_size < 1:
+            raise PlenumValueError('batch_size', batch_size, '>= 1')
+        self._db = db
+        self._batch_size = batch_size
+        self._batch = []
+
+    def build(self, items: Iterable[Tuple[bytes, bytes]]):
+        """
+        :param items: (key, value) pairs with strictly increasing keys
+        :return: root node of the built trie
+        """
+        stack = []  # type: List[_Branch]
+        first = None  # type: Optional[_Leaf]
+        prev_key = None
+        for key, value in items:
+            if not value:
+                raise PlenumValueError('value', value, 'not empty')
+            if prev_key is not None and key <= prev_key:
+                raise PlenumValueError('key', key,
+                                       'greater than {}'.format(prev_key))
+            leaf = _Leaf(bin_to_nibbles(key), value)
+            if prev_key is None:
+                first = leaf
+            else:
+                self._add(stack, first, leaf, self._common_prefix(prev_key, key))
+            prev_key = key
+
+        if prev_key is None:
+            return BLANK_NODE
+        while len(stack) > 1:
+            self._close(stack.pop())
+        if stack:
+            self._close(stack[0])
+        root = self._subtree_node(stack[0] if stack else first, 0)
+        self._encode(root, is_root=True)
+        self._flush()
+        return root
+
+    def _add(self, stack: List[_Branch], first: _Leaf, leaf: _Leaf, depth: int):
+        # Everything deeper than the common prefix with the previous key is
+        # complete now
+        closed = None
+        while stack and stack[-1].depth > depth:
+            closed = stack.pop()
+            self._close(closed)
+        if stack and stack[-1].depth == depth:
+            branch = stack[-1]
+            self._place_last(branch)
+            branch.last = leaf
+            return
+
+        # The previous key and the new one diverge at a nibble where there
+        # is no branch yet, so insert it between the top branch and
+        # its last child
+        if closed is None:
+            closed = stack[-1].last if stack else first
+        branch = _Branch(depth, leaf.key)
+        branch.last = closed
+        self._place_last(branch)
+        branch.last = leaf
+        if stack:
+            stack[-1].last = branch
+        stack.append(branch)
+
+    def _close(self, branch: _Branch):
+        self._place_last(branch)
+        branch.last = None
+
+    def _place_last(self, branch: _Branch):
+        child = branch.last
+        if isinstance(child, _Leaf) and len(child.key) == branch.depth:
+            branch.node[16] = child.value
+            return
+        nibble = child.key[branch.depth]
+        branch.node[nibble] = self._encode(
+            self._subtree_node(child, branch.depth + 1))
+
+    def _subtree_node(self, child, depth: int):
+        if isinstance(child, _Leaf):
+            return [pack_nibbles(with_terminator(child.key[depth:])), child.value]
+        if child.depth == depth:
+            return child.node
+        return [pack_nibbles(child.key[depth:child.depth]),
+                self._encode(child.node)]
+
+    def _encode(self, node, is_root=False):
+        rlpnode = rlp_encode(node)
+        if len(rlpnode) < 32 and not is_root:
+            return node
+        hashkey = sha3(rlpnode)
+        self._batch.append((hashkey, rlpnode))
+        if len(self._batch) >= self._batch_size:
+            self._flush()
+        return hashkey
+
+    def _flush(self):
+        if self._batch:
+            self._db.inc_refcounts(self._batch)
+            self._batch = []
+
+    @staticmethod
+    def _common_prefix(key1: bytes, key2: bytes) -> int:
+        # Length of the common prefix in nibbles
+        i = 0
+        size = min(len(key1), len(key2))
+        while i < size and key1[i] == key2[i]:
+            i += 1
+        if i < size and key1[i] >> 4 == key2[i] >> 4:
+            return 2 * i + 1
+        return 2 * i
@@ -74,9 +74,10 @@ class KeyValueStorageInMemory(KeyValueStorage):
                 return {k: v for k, v in self._dict.items() if filter(k, start, end)}
             return self._dict.items()
         if include_key:
+            # Keys are iterated in order like in the other storages
             if start or end:
-                return (k for k in self._dict.keys() if filter(k, start, end))
-            return self._dict.keys()
+                return (k for k in sorted(self._dict.keys()) if filter(k, start, end))
+            return sorted(self._dict.keys())
         if include_value:
             if start or end:
                 return (v for k, v in self._dict.items() if filter(k, start, end))
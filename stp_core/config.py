@@ -30,6 +30,15 @@ NODE_TO_NODE_STACK_QUOTA = 100
 CLIENT_TO_NODE_STACK_QUOTA = 100
 NODE_TO_NODE_STACK_SIZE = 1024 * 1024
 CLIENT_TO_NODE_STACK_SIZE = 1024 * 1024
+# Scale quotas above between min and max ratio of them to keep time between
+# looper runs within the budget (seconds), node quota is decreased only when
+# replicas have more messages to process than the limit. Takes precedence
+# over ENABLE_DYNAMIC_QUOTAS
+ENABLE_ADAPTIVE_QUOTAS = False
+ADAPTIVE_QUOTA_LATENCY_BUDGET = 0.1
+ADAPTIVE_QUOTA_MAX_REPLICA_INBOX_SIZE = 10000
+ADAPTIVE_QUOTA_MIN_RATIO = 0.1
+ADAPTIVE_QUOTA_MAX_RATIO = 4.0
 
 # Zeromq configuration
 DEFAULT_LISTENER_SIZE = 20 * 1024
@@ -44,6 +53,32 @@ HEARTBEAT_FREQ = 5      # seconds
 ZMQ_CLIENT_QUEUE_SIZE = 100  # messages (0 - no limit)
 ZMQ_NODE_QUEUE_SIZE = 20000  # messages (0 - no limit)
 ZMQ_STASH_TO_NOT_CONNECTED_QUEUE_SIZE = 10000
+# Send batches of node messages in binary frames to nodes supporting them
+# instead of JSON with every message escaped as a string
+ENABLE_BINARY_BATCHES = True
+# Parse received messages right from ZMQ frames without copying them to
+# bytes first. Receiving a frame costs more than receiving a copy of a small
+# message, so this pays off with large messages like catchup replies
+ZMQ_ZERO_COPY_RECEIVE = False
+# Receive, validate and deserialize messages of node stacks in a separate
+# thread in parallel with processing of them. Messages received this way
+# are not recorded by the stack recorder (STACK_COMPANION = 1)
+ZMQ_LISTENER_THREAD = False
+# Listener thread stops receiving when this number of received messages
+# are not taken by the stack yet
+ZMQ_LISTENER_THREAD_QUEUE_SIZE = 10000
+# Compress messages longer than the threshold (bytes) sent to nodes
+# supporting compression. Level 1 takes about a millisecond per 100KB and
+# still shrinks JSON of catchup replies several times
+ENABLE_MSG_COMPRESSION = True
+MSG_COMPRESSION_THRESHOLD = 4 * 1024
+MSG_COMPRESSION_LEVEL = 1
+# Messages to a node are sent in lanes: consensus, view change, propagate
+# and catchup. When messages waiting for a node take more than
+# OUTBOX_FLUSH_SIZE bytes, each lane gets a share of it proportional to its
+# weight and the rest stays for next flushes (None - no limit)
+OUTBOX_FLUSH_SIZE = 1024 * 1024
+OUTBOX_LANE_WEIGHTS = (8, 4, 2, 1)
 
 # All messages exceeding the limit will be rejected without processing
 MSG_LEN_LIMIT = 128 * 1024
@@ -7,6 +7,8 @@ import time
 from asyncio.coroutines import CoroWrapper
 from typing import List, Optional
 
+import zmq
+
 # import uvloop
 from stp_core.common.log import getlogger
 from stp_core.common.util import lxor
@@ -60,6 +62,13 @@ class Prodable:
         raise NotImplementedError("subclass {} should implement this method"
                                   .format(self))
 
+    def sockets_to_poll(self) -> List[zmq.Socket]:
+        """
+        ZMQ sockets receiving messages for this Prodable. When nothing is
+        happening the looper waits for any of them to become readable.
+        """
+        return []
+
 
 class Looper:
     """
@@ -210,12 +219,32 @@ class Looper:
         msgsProcessed = await self.prodAllOnce()
         if msgsProcessed == 0:
             # if no let other stuff run
-            await asyncio.sleep(0.01, loop=self.loop)
+            await self.wait_idle(0.01)
         dur = time.perf_counter() - start
         if dur >= 15:
             logger.info("it took {:.3f} seconds to run once nicely".
                         format(dur), extra={"cli": False})
 
+    async def wait_idle(self, timeout):
+        """
+        Waits for `timeout` seconds or until some of Prodables gets a
+        message, whichever happens first.
+        """
+        sockets = []
+        for prodable in self.prodables:
+            sockets_to_poll = getattr(prodable, 'sockets_to_poll', None)
+            if sockets_to_poll is not None:
+                sockets.extend(sockets_to_poll())
+        if not sockets:
+            await asyncio.sleep(timeout, loop=self.loop)
+            return
+        # Let other stuff run first since the loop is blocked while polling
+        await asyncio.sleep(0, loop=self.loop)
+        poller = zmq.Poller()
+        for sock in sockets:
+            poller.register(sock, zmq.POLLIN)
+        poller.poll(timeout * 1000)
+
     def runFor(self, timeout):
         self.run(asyncio.sleep(timeout))
 
@@ -76,6 +76,9 @@ class SMotor(Motor):
             self.stack.serviceLifecycle()
         return c
 
+    def sockets_to_poll(self):
+        return self.stack.sockets_to_poll()
+
     def start(self, loop):
         self.stack.start()
 
@@ -1,5 +1,8 @@
+import time
+
 import pytest
 import asyncio
+import zmq
 
 from stp_core.loop.looper import Looper, Prodable
 
@@ -9,3 +12,45 @@ def test_hasProdable():
     with pytest.raises(ValueError):
         Looper().hasProdable(Prodable(), 'prodable')
     looper.shutdownSync()
+
+
+class SocketProdable(Prodable):
+    def __init__(self, sock):
+        self.name = 'SocketProdable'
+        self.sock = sock
+
+    async def prod(self, limit=None):
+        return 0
+
+    def start(self, loop):
+        pass
+
+    def stop(self):
+        pass
+
+    def sockets_to_poll(self):
+        return [self.sock]
+
+
+def test_wait_idle_returns_when_socket_is_readable():
+    ctx = zmq.Context.instance()
+    receiver = ctx.socket(zmq.PAIR)
+    receiver.bind('inproc://test_wait_idle')
+    sender = ctx.socket(zmq.PAIR)
+    sender.connect('inproc://test_wait_idle')
+
+    looper = Looper(autoStart=False)
+    looper.add(SocketProdable(receiver))
+    try:
+        start = time.perf_counter()
+        looper.run(looper.wait_idle(0.2))
+        assert time.perf_counter() - start >= 0.2
+
+        sender.send(b'message')
+        start = time.perf_counter()
+        looper.run(looper.wait_idle(10))
+        assert time.perf_counter() - start < 5
+    finally:
+        looper.shutdownSync()
+        sender.close(linger=0)
+        receiver.close(linger=0)
@@ -0,0 +1,49 @@
+"""
+Compression of messages sent between stacks.
+
+A compressed message is `COMPRESSED_PREFIX` followed by the message
+compressed with zlib. Serialized messages, ping/pong messages and binary
+batches never start with it, so a compressed message is told apart from
+them by the first bytes only. Messages are compressed only for remotes
+which advertised `COMPRESSION_FEATURE` or sent compressed messages
+themselves.
+"""
+
+import zlib
+from typing import Union
+
+from plenum.common.exceptions import InvalidCompressedMessageException
+
+COMPRESSED_PREFIX = b'\x00ZL1'
+COMPRESSION_FEATURE = 'zlib'
+
+_PREFIX_LEN = len(COMPRESSED_PREFIX)
+
+
+def is_compressed(data: Union[bytes, memoryview]) -> bool:
+    return data[:_PREFIX_LEN] == COMPRESSED_PREFIX
+
+
+def compress(data: bytes, level: int) -> bytes:
+    return COMPRESSED_PREFIX + zlib.compress(data, level)
+
+
+def decompress(data: Union[bytes, memoryview], max_len: int) -> bytes:
+    """
+    Fails instead of decompressing more than `max_len` bytes, so a small
+    message can not make the stack allocate a lot of memory
+    """
+    if not is_compressed(data):
+        raise InvalidCompressedMessageException('no compression prefix')
+    decompressor = zlib.decompressobj()
+    try:
+        result = decompressor.decompress(data[_PREFIX_LEN:], max_len + 1)
+    except zlib.error as ex:
+        raise InvalidCompressedMessageException(
+            'cannot decompress: {}'.format(ex)) from ex
+    if len(result) > max_len:
+        raise InvalidCompressedMessageException(
+            'decompressed message exceeds {} bytes'.format(max_len))
+    if not decompressor.eof:
+        raise InvalidCompressedMessageException('truncated compressed data')
+    return result
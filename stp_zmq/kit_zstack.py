@@ -38,7 +38,8 @@ class KITZStack(simple_zstack_class, KITNetworkInterface):
                  msgRejectHandler=None,
                  metrics=NullMetricsCollector(),
                  mt_incoming_size=None,
-                 mt_outgoing_size=None):
+                 mt_outgoing_size=None,
+                 mt_outgoing_compression_ratio=None):
 
         KITNetworkInterface.__init__(self, registry=registry)
 
@@ -47,7 +48,8 @@ class KITZStack(simple_zstack_class, KITNetworkInterface):
                                      msgRejectHandler=msgRejectHandler,
                                      metrics=metrics,
                                      mt_incoming_size=mt_incoming_size,
-                                     mt_outgoing_size=mt_outgoing_size)
+                                     mt_outgoing_size=mt_outgoing_size,
+                                     mt_outgoing_compression_ratio=mt_outgoing_compression_ratio)
 
         self._retry_connect = {}
 
@@ -0,0 +1,70 @@
+from collections import deque
+from threading import Thread, Event
+
+import zmq
+
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+
+class ListenerThread(Thread):
+    """
+    Receives messages from the listener socket of a stack and validates,
+    decodes and deserializes them, so that the thread running the stack
+    only takes ready messages from `received` while network input is
+    handled in parallel. pyzmq releases the GIL while waiting for and
+    receiving messages.
+
+    The listener socket must not be used by other threads while this one
+    is running.
+    """
+
+    def __init__(self, stack, queue_size: int, poll_timeout: float = 0.1):
+        super().__init__(name='{}-listener'.format(stack.name), daemon=True)
+        self._stack = stack
+        self._socket = stack.listener
+        self._queue_size = queue_size
+        self._poll_timeout = poll_timeout
+        self._stopped = Event()
+        # Tuples of (message or list of them, ident, length, error),
+        # appending to and popping from deque are thread safe
+        self.received = deque()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def run(self):
+        poller = zmq.Poller()
+        poller.register(self._socket, zmq.POLLIN)
+        poll_timeout_ms = int(self._poll_timeout * 1000)
+        copy = not self._stack.zero_copy_receive
+        try:
+            while not self._stopped.is_set():
+                if len(self.received) >= self._queue_size:
+                    # Stack is not keeping up, leave messages in the socket
+                    # queue where they are limited by its high water mark
+                    self._stopped.wait(self._poll_timeout)
+                    continue
+                if poller.poll(poll_timeout_ms):
+                    self._receive(copy)
+        except Exception as ex:
+            logger.error('{} stopped receiving messages due to {}'
+                         .format(self._stack, ex))
+        finally:
+            poller.unregister(self._socket)
+
+    def _receive(self, copy):
+        while len(self.received) < self._queue_size:
+            try:
+                ident, msg = self._socket.recv_multipart(flags=zmq.NOBLOCK,
+                                                         copy=copy)
+            except zmq.Again:
+                return
+            if not copy:
+                ident, msg = ident.bytes, msg.buffer
+            if not msg:
+                # Router probing sends empty message on connection
+                continue
+            self.received.append(self._stack._prepareReceived(msg, ident))
@@ -0,0 +1,48 @@
+import zlib
+
+import pytest
+
+from plenum.common.exceptions import InvalidCompressedMessageException
+from stp_zmq.compression import compress, decompress, is_compressed, \
+    COMPRESSED_PREFIX
+from stp_zmq.zstack import ZStack
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'{"op": "CATCHUP_REP"}',
+    ZStack.serializeMsg({'op': 'CATCHUP_REP', 'txns': ['a' * 100] * 1000}),
+])
+def test_compress_decompress(data):
+    compressed = compress(data, 1)
+    assert is_compressed(compressed)
+    assert decompress(compressed, len(data)) == data
+    assert decompress(memoryview(compressed), len(data)) == data
+
+
+@pytest.mark.parametrize('msg', [
+    ZStack.serializeMsg({'op': 'PREPARE'}),
+    ZStack.pingMessage.encode(),
+    b'\x00PB1',
+    b'',
+])
+def test_other_messages_are_not_compressed(msg):
+    assert not is_compressed(msg)
+
+
+@pytest.mark.parametrize('data', [
+    b'{"op": "CATCHUP_REP"}',
+    COMPRESSED_PREFIX + b'not zlib data',
+    compress(b'a' * 1000, 1)[:-4],
+    # Too long when decompressed
+    compress(b'a' * 1001, 1),
+])
+def test_decompress_malformed_message(data):
+    with pytest.raises(InvalidCompressedMessageException):
+        decompress(data, 1000)
+
+
+def test_decompress_does_not_inflate_over_limit():
+    bomb = COMPRESSED_PREFIX + zlib.compress(b'\x00' * 100 * 1024 * 1024)
+    with pytest.raises(InvalidCompressedMessageException):
+        decompress(bomb, 128 * 1024)
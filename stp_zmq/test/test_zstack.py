@@ -339,3 +339,79 @@ def test_queue_size_limit_set(tdir, tconf):
     stack.start()
     assert stack.listener.get_hwm() == queue_size
     stack.stop()
+
+
+def test_zstack_zero_copy_receive(set_info_log_level, tdir, looper, tconf):
+    names = ['Alpha', 'Beta']
+    genKeys(tdir, names)
+    config = adict(**tconf.__dict__)
+    config.ZMQ_ZERO_COPY_RECEIVE = True
+
+    received = []
+    rejected = []
+    alpha = ZStack(names[0], ha=genHa(), basedirpath=tdir, msgHandler=received.append,
+                   restricted=True, config=config,
+                   msgRejectHandler=lambda reason, frm: rejected.append(reason))
+    beta = ZStack(names[1], ha=genHa(), basedirpath=tdir, msgHandler=received.append,
+                  restricted=True, config=config,
+                  msgRejectHandler=lambda reason, frm: rejected.append(reason))
+    prepStacks(looper, *(alpha, beta), connect=True, useKeys=True)
+
+    def check_len(msgs, count):
+        assert len(msgs) == count
+
+    huge_msg = {'k': 'v' * (tconf.MSG_LEN_LIMIT - len("{'k':''}"))}
+    assert alpha.send({'greetings': 'hi'}, beta.name)[0]
+    assert alpha.send(huge_msg, beta.name)[0]
+    looper.run(eventually(check_len, received, 2))
+    assert received == [({'greetings': 'hi'}, alpha.name),
+                        (huge_msg, alpha.name)]
+
+    # Size is validated on the frame, non utf-8 messages are discarded
+    over_limit = alpha.serializeMsg({'k': 'v' * tconf.MSG_LEN_LIMIT})
+    alpha._remotes['Beta'].socket.send(over_limit)
+    alpha._remotes['Beta'].socket.send(b'{"k2": "v2\x9c"}')
+    looper.run(eventually(check_len, rejected, 2))
+    assert 'exceeded allowed limit' in rejected[0]
+
+    # Stack is functional after discarding messages
+    assert beta.send({'greetings': 'hello'}, alpha.name)[0]
+    looper.run(eventually(check_len, received, 3))
+    assert received[2] == ({'greetings': 'hello'}, beta.name)
+
+
+def test_zstack_listener_thread(set_info_log_level, tdir, looper, tconf):
+    names = ['Alpha', 'Beta']
+    genKeys(tdir, names)
+    config = adict(**tconf.__dict__)
+    config.ZMQ_LISTENER_THREAD = True
+
+    received = []
+    rejected = []
+    alpha = ZStack(names[0], ha=genHa(), basedirpath=tdir, msgHandler=received.append,
+                   restricted=True, config=config,
+                   msgRejectHandler=lambda reason, frm: rejected.append((reason, frm)))
+    beta = ZStack(names[1], ha=genHa(), basedirpath=tdir, msgHandler=received.append,
+                  restricted=True, config=config,
+                  msgRejectHandler=lambda reason, frm: rejected.append((reason, frm)))
+    prepStacks(looper, *(alpha, beta), connect=True, useKeys=True)
+    listener_thread = beta._listener_thread
+    assert listener_thread.is_alive()
+
+    def check_len(msgs, count):
+        assert len(msgs) == count
+
+    msgs = [{'greetings': 'hi {}'.format(i)} for i in range(100)]
+    for msg in msgs:
+        assert alpha.send(msg, beta.name)[0]
+    looper.run(eventually(check_len, received, len(msgs)))
+    assert received == [(msg, alpha.name) for msg in msgs]
+
+    over_limit = alpha.serializeMsg({'k': 'v' * tconf.MSG_LEN_LIMIT})
+    alpha._remotes['Beta'].socket.send(over_limit)
+    looper.run(eventually(check_len, rejected, 1))
+    assert rejected[0][1] == alpha.name
+
+    beta.stop()
+    assert beta._listener_thread is None
+    assert not listener_thread.is_alive()
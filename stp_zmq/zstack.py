@@ -16,7 +16,8 @@ import sys
 import time
 from binascii import hexlify, unhexlify
 from collections import deque
-from typing import Mapping, Tuple, Any, Union, Optional, NamedTuple
+from typing import Mapping, Tuple, Any, Union, Optional, NamedTuple, List, \
+    Set
 
 from common.exceptions import PlenumTypeError, PlenumValueError
 
@@ -26,6 +27,8 @@ from stp_core.crypto.nacl_wrappers import Signer, Verifier
 from stp_core.crypto.util import isHex, ed25519PkToCurve25519
 from stp_core.network.exceptions import PublicKeyNotFoundOnDisk, VerKeyNotFoundOnDisk
 from stp_zmq.authenticator import MultiZapAuthenticator
+from stp_zmq.compression import is_compressed, compress, decompress
+from stp_zmq.listener_thread import ListenerThread
 from zmq.utils import z85
 from zmq.utils.monitor import recv_monitor_message
 
@@ -35,7 +38,8 @@ from stp_core.network.network_interface import NetworkInterface
 from stp_zmq.util import createEncAndSigKeys, \
     moveKeyFilesToCorrectLocations, createCertsFromKeys
 from stp_zmq.remote import Remote, set_keepalive, set_zmq_internal_queue_size
-from plenum.common.exceptions import InvalidMessageExceedingSizeException
+from plenum.common.exceptions import InvalidMessageExceedingSizeException, \
+    InvalidMessageException, InvalidCompressedMessageException
 from stp_core.validators.message_length_validator import MessageLenValidator
 
 logger = getlogger()
@@ -68,7 +72,8 @@ class ZStack(NetworkInterface):
     def __init__(self, name, ha, basedirpath, msgHandler, restricted=True,
                  seed=None, onlyListener=False, config=None, msgRejectHandler=None, queue_size=0,
                  create_listener_monitor=False, metrics=NullMetricsCollector(),
-                 mt_incoming_size=None, mt_outgoing_size=None):
+                 mt_incoming_size=None, mt_outgoing_size=None,
+                 mt_outgoing_compression_ratio=None):
         self._name = name
         self.ha = ha
         self.basedirpath = basedirpath
@@ -81,11 +86,24 @@ class ZStack(NetworkInterface):
         self.metrics = metrics
         self.mt_incoming_size = mt_incoming_size
         self.mt_outgoing_size = mt_outgoing_size
+        self.mt_outgoing_compression_ratio = mt_outgoing_compression_ratio
 
         self.listenerQuota = self.config.DEFAULT_LISTENER_QUOTA
         self.listenerSize = self.config.DEFAULT_LISTENER_SIZE
         self.senderQuota = self.config.DEFAULT_SENDER_QUOTA
         self.msgLenVal = MessageLenValidator(self.config.MSG_LEN_LIMIT)
+        # Received messages are memoryviews of ZMQ frames instead of bytes
+        # copied out of them
+        self.zero_copy_receive = self.config.ZMQ_ZERO_COPY_RECEIVE
+        # Messages are compressed only for remotes which advertised support
+        # of compression or sent compressed messages themselves
+        self.compression_enabled = self.config.ENABLE_MSG_COMPRESSION
+        self.compression_threshold = self.config.MSG_COMPRESSION_THRESHOLD
+        self.compression_level = self.config.MSG_COMPRESSION_LEVEL
+        self._compressing_remotes = set()
+        # The last compressed message and the result, the same message is
+        # sent to many remotes when it is broadcast
+        self._last_compressed = (None, None)
 
         self.homeDir = None
         # As of now there would be only one file in secretKeysDir and sigKeyDir
@@ -107,6 +125,10 @@ class ZStack(NetworkInterface):
 
         self.ctx = None  # type: Context
         self.listener = None
+        self._listener_thread = None  # type: Optional[ListenerThread]
+        # Poller of sockets to receive from, recreated when they change
+        self._poller = zmq.Poller()
+        self._polled_sockets = []
         self.create_listener_monitor = create_listener_monitor
         self.listener_monitor = None
         self.auth = None
@@ -383,8 +405,16 @@ class ZStack(NetworkInterface):
                 if bind_retries == 50:
                     raise zmq_err
                 time.sleep(0.2)
+        # Stack sending through listener cannot give it to another thread
+        if self.config.ZMQ_LISTENER_THREAD and not self.onlyListener:
+            self._listener_thread = ListenerThread(
+                self, self.config.ZMQ_LISTENER_THREAD_QUEUE_SIZE)
+            self._listener_thread.start()
 
     def close(self):
+        if self._listener_thread:
+            self._listener_thread.stop()
+            self._listener_thread = None
         if self.listener_monitor is not None:
             self.listener.disable_monitor()
             self.listener_monitor = None
@@ -465,16 +495,94 @@ class ZStack(NetworkInterface):
         try:
             self.metrics.add_event(self.mt_incoming_size, len(msg))
             self.msgLenVal.validate(msg)
-            decoded = msg.decode()
-        except (UnicodeDecodeError, InvalidMessageExceedingSizeException) as ex:
-            errstr = 'Message will be discarded due to {}'.format(ex)
-            frm = self.remotesByKeys[ident].name if ident in self.remotesByKeys else ident
-            logger.error("Got from {} {}".format(z85_to_friendly(frm), errstr))
-            self.msgRejectHandler(errstr, frm)
+            decoded = self._decodeReceived(msg, ident)
+        except (UnicodeDecodeError, InvalidMessageException) as ex:
+            self._rejectReceived(ex, ident)
             return False
-        self.rxMsgs.append((decoded, ident))
+        self._appendReceived(decoded, ident)
         return True
 
+    def _appendReceived(self, decoded, ident):
+        if isinstance(decoded, list):
+            self.rxMsgs.extend((m, ident) for m in decoded)
+        else:
+            self.rxMsgs.append((decoded, ident))
+
+    def _rejectReceived(self, ex, ident):
+        errstr = 'Message will be discarded due to {}'.format(ex)
+        remote = self.remotesByKeys.get(ident)
+        frm = remote.name if remote else ident
+        logger.error("Got from {} {}".format(z85_to_friendly(frm), errstr))
+        self.msgRejectHandler(errstr, frm)
+
+    def _prepareReceived(self, msg, ident):
+        """
+        Does the same as `_verifyAndAppend` except appending the message and
+        reporting, and also deserializes it. Called by the listener thread.
+
+        :return: tuple of the message or list of them, ident, length of the
+        received message and error if it is to be discarded
+        """
+        try:
+            self.msgLenVal.validate(msg)
+            decoded = self._decodeReceived(msg, ident)
+        except (UnicodeDecodeError, InvalidMessageException) as ex:
+            return None, ident, len(msg), ex
+        if isinstance(decoded, list):
+            decoded = [self._deserializeReceived(m) for m in decoded]
+        else:
+            decoded = self._deserializeReceived(decoded)
+        return decoded, ident, len(msg), None
+
+    def _deserializeReceived(self, msg):
+        # Messages failed to be deserialized are left as they are to be
+        # reported by `processReceived`
+        if msg in (self.pingMessage, self.pongMessage):
+            return msg
+        try:
+            deserialized = self.deserializeMsg(msg)
+        except Exception:
+            return msg
+        return deserialized if isinstance(deserialized, dict) else msg
+
+    def _decodeReceived(self, msg: Union[bytes, memoryview], ident):
+        """
+        Turns a received message into a message to be processed or a list
+        of them
+        """
+        if is_compressed(msg):
+            msg = decompress(msg, self.config.MSG_LEN_LIMIT)
+            if is_compressed(msg):
+                raise InvalidCompressedMessageException(
+                    'compressed message is compressed again')
+            remote = self.remotesByKeys.get(ident)
+            self._update_compression_support(
+                remote.name if remote else ident, True)
+            return self._decodeReceived(msg, ident)
+        return str(msg, 'utf-8')
+
+    def _update_compression_support(self, frm, supported):
+        if supported and self.compression_enabled:
+            if frm not in self._compressing_remotes:
+                logger.debug("{} switching to compressed messages for {}"
+                             .format(self, z85_to_friendly(frm)))
+                self._compressing_remotes.add(frm)
+        else:
+            self._compressing_remotes.discard(frm)
+
+    def _compressToSend(self, msg: bytes, uid) -> bytes:
+        if uid not in self._compressing_remotes or \
+                len(msg) < self.compression_threshold:
+            return msg
+        last_msg, compressed = self._last_compressed
+        if msg is not last_msg:
+            compressed = compress(msg, self.compression_level)
+            if self.mt_outgoing_compression_ratio is not None:
+                self.metrics.add_event(self.mt_outgoing_compression_ratio,
+                                       len(compressed) / len(msg))
+            self._last_compressed = (msg, compressed)
+        return compressed if len(compressed) < len(msg) else msg
+
     def _receiveFromListener(self, quota: Quota) -> int:
         """
         Receives messages from listener
@@ -483,9 +591,13 @@ class ZStack(NetworkInterface):
         """
         i = 0
         incoming_size = 0
+        copy = not self.zero_copy_receive
         while i < quota.count and incoming_size < quota.size:
             try:
-                ident, msg = self.listener.recv_multipart(flags=zmq.NOBLOCK)
+                ident, msg = self.listener.recv_multipart(flags=zmq.NOBLOCK,
+                                                          copy=copy)
+                if not copy:
+                    ident, msg = ident.bytes, msg.buffer
                 if not msg:
                     # Router probing sends empty message on connection
                     continue
@@ -499,23 +611,53 @@ class ZStack(NetworkInterface):
                          format(self, i))
         return i
 
-    def _receiveFromRemotes(self, quotaPerRemote) -> int:
+    def _receiveFromListenerThread(self, quota: Quota) -> int:
+        """
+        Takes messages received by the listener thread
+        :param quota: number of messages to take
+        :return: number of taken messages
+        """
+        i = 0
+        incoming_size = 0
+        received = self._listener_thread.received
+        while received and i < quota.count and incoming_size < quota.size:
+            decoded, ident, msg_len, ex = received.popleft()
+            incoming_size += msg_len
+            i += 1
+            self.metrics.add_event(self.mt_incoming_size, msg_len)
+            if ex is None:
+                self._appendReceived(decoded, ident)
+            else:
+                self._rejectReceived(ex, ident)
+        if i > 0:
+            logger.trace('{} got {} messages through listener thread'.
+                         format(self, i))
+        return i
+
+    def _receiveFromRemotes(self, quotaPerRemote, readable=None) -> int:
         """
         Receives messages from remotes
         :param quotaPerRemote: number of messages to receive from one remote
+        :param readable: sockets having messages to receive, all sockets
+        are tried if None
         :return: number of received messages
         """
 
         assert quotaPerRemote
         totalReceived = 0
+        copy = not self.zero_copy_receive
         for ident, remote in self.remotesByKeys.items():
             if not remote.socket:
                 continue
+            if readable is not None and remote.socket not in readable:
+                continue
             i = 0
             sock = remote.socket
             while i < quotaPerRemote:
                 try:
-                    msg, = sock.recv_multipart(flags=zmq.NOBLOCK)
+                    msg, = sock.recv_multipart(flags=zmq.NOBLOCK, copy=copy)
+                    if not copy:
+                        msg = msg.buffer
                     if not msg:
                         # Router probing sends empty message on connection
                         continue
@@ -543,10 +685,38 @@ class ZStack(NetworkInterface):
         if quota is None:
             quota = Quota(count=self.listenerQuota, size=self.listenerSize)
 
-        self._receiveFromListener(quota)
-        self._receiveFromRemotes(quotaPerRemote=self.senderQuota)
+        readable = self._pollReadable()
+        if self._listener_thread:
+            self._receiveFromListenerThread(quota)
+        elif self.listener in readable:
+            self._receiveFromListener(quota)
+        self._receiveFromRemotes(quotaPerRemote=self.senderQuota,
+                                 readable=readable)
         return len(self.rxMsgs)
 
+    def sockets_to_poll(self) -> List[zmq.Socket]:
+        """
+        Sockets which have to be polled for incoming messages
+        """
+        sockets = [self.listener] \
+            if self.listener and not self._listener_thread else []
+        sockets.extend(remote.socket for remote in self.remotesByKeys.values()
+                       if remote.socket)
+        return sockets
+
+    def _pollReadable(self) -> Set[zmq.Socket]:
+        """
+        Returns sockets having messages to receive, so that idle ones
+        are not tried one by one
+        """
+        sockets = self.sockets_to_poll()
+        if sockets != self._polled_sockets:
+            self._poller = zmq.Poller()
+            for sock in sockets:
+                self._poller.register(sock, zmq.POLLIN)
+            self._polled_sockets = sockets
+        return {sock for sock, _ in self._poller.poll(0)}
+
     def processReceived(self, limit):
         if limit <= 0:
             return 0
@@ -567,12 +737,14 @@ class ZStack(NetworkInterface):
                                .format(self, z85_to_friendly(ident)))
                 continue
 
-            try:
-                msg = self.deserializeMsg(msg)
-            except Exception as e:
-                logger.error('Error {} while converting message {} '
-                             'to JSON from {}'.format(e, msg, z85_to_friendly(ident)))
-                continue
+            if not isinstance(msg, dict):
+                # Listener thread has deserialized messages already
+                try:
+                    msg = self.deserializeMsg(msg)
+                except Exception as e:
+                    logger.error('Error {} while converting message {} '
+                                 'to JSON from {}'.format(e, msg, z85_to_friendly(ident)))
+                    continue
             msg = self.doProcessReceived(msg, frm, ident)
             if msg:
                 self.msgHandler((msg, frm))
@@ -705,6 +877,9 @@ class ZStack(NetworkInterface):
         if msg in (self.pingMessage, self.pongMessage):
             if msg == self.pingMessage:
                 logger.trace('{} got ping from {}'.format(self, z85_to_friendly(frm)))
+                # Remote might have been restarted with different version,
+                # so do not compress until it advertises compression again
+                self._update_compression_support(frm, False)
                 self.sendPingPong(frm, is_ping=False)
             if msg == self.pongMessage:
                 if ident in self.remotesByKeys:
@@ -781,10 +956,11 @@ class ZStack(NetworkInterface):
 
             logger.trace('{} transmitting message {} to {} by socket {} {}'
                          .format(self, msg, z85_to_friendly(uid), socket.FD, socket.underlying))
-            socket.send(msg, flags=zmq.NOBLOCK)
+            payload = self._compressToSend(msg, uid)
+            socket.send(payload, flags=zmq.NOBLOCK)
 
             if remote.isConnected or msg in self.healthMessages:
-                self.metrics.add_event(self.mt_outgoing_size, len(msg))
+                self.metrics.add_event(self.mt_outgoing_size, len(payload))
             else:
                 logger.warning('Remote {} is not connected - message will not be sent immediately.'
                                'If this problem does not resolve itself - check your firewall settings'
@@ -837,8 +1013,10 @@ class ZStack(NetworkInterface):
 
     @staticmethod
     def deserializeMsg(msg):
-        if isinstance(msg, bytes):
-            msg = msg.decode()
+        # Both json and ujson parse UTF-8 encoded bytes as they are,
+        # but not buffers
+        if isinstance(msg, memoryview):
+            msg = str(msg, 'utf-8')
         msg = json.loads(msg)
         return msg
 